@@ -1,15 +1,18 @@
+import functools
 import os
 import requests
 from requests.auth import HTTPBasicAuth
 
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.tools import FunctionTool
+from gemini_utils.lazy import lazy_module_attributes
+from gemini_utils.tool_cache import cached_tool
 
 # Get credentials from environment
 NETRIVALS_USERNAME = os.getenv("NETRIVALS_USERNAME", "")
 NETRIVALS_PASSWORD = os.getenv("NETRIVALS_PASSWORD", "")
 
+# The agent re-reads the same pages while comparing stores; a page is kept for 5 minutes
+# (failed requests are not cached and are retried on the next call)
+@cached_tool(ttl=300, maxsize=256)
 def get_store_products(store_id: int, page: int = 1, limit: int = 100) -> dict:
     """
     Get products for a specific store from the Netrivals API.
@@ -50,20 +53,32 @@ def get_store_products(store_id: int, page: int = 1, limit: int = 100) -> dict:
             "message": str(e)
         }
 
-# Create function tool from the get_store_products function
-netrivals_tool = FunctionTool(func=get_store_products)
+@functools.cache
+def build_root_agent():
+    """Creates the agent and its tool on first use (ADK imports included)."""
+    from google.adk.agents import LlmAgent
+    from google.adk.models.google_llm import Gemini
+    from google.adk.tools import FunctionTool
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
 
-# Create and export the agent for ADK web
-root_agent = LlmAgent(
-    name="netrivals_agent",
-    model=Gemini(model="gemini-2.5-flash-lite"),
-    tools=[netrivals_tool],
-    instruction=(
-        "You are a helpful assistant that retrieves product information from the Netrivals API. "
-        "When asked about products for a store, use the get_store_products function with the store ID. "
-        "IMPORTANT: From the API response, present all product data but IGNORE and do not include "
-        "the 'rival_products' field. Show all other information including product details, prices, "
-        "stock, categories, and marketplace_offers. Format the data in a clear, readable way."
-    ),
-)
+    # Create function tool from the get_store_products function
+    netrivals_tool = FunctionTool(func=get_store_products)
 
+    return LlmAgent(
+        name="netrivals_agent",
+        model=Gemini(model="gemini-2.5-flash-lite", retry_options=rate_limit.RETRY_OPTIONS),
+        tools=[netrivals_tool],
+        instruction=(
+            "You are a helpful assistant that retrieves product information from the Netrivals API. "
+            "When asked about products for a store, use the get_store_products function with the store ID. "
+            "IMPORTANT: From the API response, present all product data but IGNORE and do not include "
+            "the 'rival_products' field. Show all other information including product details, prices, "
+            "stock, categories, and marketplace_offers. Format the data in a clear, readable way."
+        ),
+        **model_callbacks(),
+    )
+
+
+# Exported for ADK web, built when first accessed (see gemini_utils/lazy.py)
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent)
@@ -1,20 +1,9 @@
-from google.genai import types
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
-
-# Simple conversational agent - no manual session management needed!
-# ADK web will handle sessions automatically
-root_agent = LlmAgent(
-    name="session_test_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
-    instruction="""You are a helpful and friendly assistant.
+import functools
+
+from gemini_utils.lazy import lazy_module_attributes
+
+
+SESSION_TEST_INSTRUCTION = """You are a helpful and friendly assistant.
     
     IMPORTANT: You can remember information from previous messages in this conversation.
     
@@ -22,12 +11,37 @@ root_agent = LlmAgent(
     When the user asks about information from earlier in the conversation, recall it accurately.
     
     Be conversational and reference earlier context naturally.
-    """,
-)
-
-print("✅ Session test agent created!")
-print("🌐 Use 'adk web agent-session-adk' to test session management")
-print("💡 Try:")
-print("   1. Say: 'Hi, my name is Sam'")
-print("   2. Ask: 'What's the capital of France?'")
-print("   3. Ask: 'What's my name?' (should remember Sam!)")
+    """
+
+
+@functools.cache
+def build_root_agent():
+    """Creates the session test agent; ADK is only imported once the agent is needed."""
+    from google.adk.agents import LlmAgent
+    from google.adk.models.google_llm import Gemini
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
+
+    # Simple conversational agent - no manual session management needed!
+    # ADK web will handle sessions automatically
+    return LlmAgent(
+        name="session_test_agent",
+        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        instruction=SESSION_TEST_INSTRUCTION,
+        **model_callbacks(),
+    )
+
+
+# Built on first access (see gemini_utils/lazy.py)
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent)
+
+if __name__ == "__main__":
+    print("✅ Session test agent defined!")
+    print("🌐 Use 'adk web agent-session-adk' to test session management")
+    print("💡 Try:")
+    print("   1. Say: 'Hi, my name is Sam'")
+    print("   2. Ask: 'What's the capital of France?'")
+    print("   3. Ask: 'What's my name?' (should remember Sam!)")
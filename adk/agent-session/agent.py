@@ -1,38 +1,21 @@
+import functools
 from typing import Any, Dict
 import asyncio
 import os
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-env_path = Path(__file__).parent / ".env"
-load_dotenv(env_path)
-
-from google.adk.agents import Agent, LlmAgent
-from google.adk.apps.app import App, EventsCompactionConfig
-from google.adk.models.google_llm import Gemini
-from google.adk.sessions import DatabaseSessionService
-from google.adk.sessions import InMemorySessionService
-from google.adk.runners import Runner
-from google.adk.tools.tool_context import ToolContext
-from google.genai import types
-
-print("✅ ADK components imported successfully.")
-
-# Retry configuration for the model
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+
+from gemini_utils.events import consume
+from gemini_utils.lazy import lazy_module_attributes
+
 
 # Define helper functions that will be reused throughout the notebook
 async def run_session(
-    runner_instance: Runner,
+    runner_instance: "Runner",
     user_queries: list[str] | str = None,
     session_name: str = "default",
 ):
+    from google.genai import types
+
     print(f"\n ### Session: {session_name}")
 
     # Get app name from the Runner
@@ -40,14 +23,19 @@ async def run_session(
 
     # Attempt to create a new session or retrieve an existing one
     try:
-        session = await session_service.create_session(
+        session = await runner_instance.session_service.create_session(
             app_name=app_name, user_id=USER_ID, session_id=session_name
         )
     except:
-        session = await session_service.get_session(
+        session = await runner_instance.session_service.get_session(
             app_name=app_name, user_id=USER_ID, session_id=session_name
         )
 
+    def print_reply(event, text):
+        # Filter out "None" responses before printing
+        if text != "None":
+            print(f"{MODEL_NAME} > ", text)
+
     # Process queries if provided
     if user_queries:
         # Convert single query to list for uniform processing
@@ -61,24 +49,15 @@ async def run_session(
             # Convert the query string to the ADK Content format
             query = types.Content(role="user", parts=[types.Part(text=query)])
 
-            # Stream the agent's response asynchronously
-            async for event in runner_instance.run_async(
-                user_id=USER_ID, session_id=session.id, new_message=query
-            ):
-                # Check if the event contains valid content
-                if event.content and event.content.parts:
-                    # Filter out empty or "None" responses before printing
-                    if (
-                        event.content.parts[0].text != "None"
-                        and event.content.parts[0].text
-                    ):
-                        print(f"{MODEL_NAME} > ", event.content.parts[0].text)
+            # Stream the agent's response; all text parts of an event are printed, not just the first
+            await consume(
+                runner_instance.run_async(user_id=USER_ID, session_id=session.id, new_message=query),
+                on_text=print_reply,
+            )
     else:
         print("No queries!")
 
 
-print("✅ Helper functions defined.")
-
 APP_NAME = "default"  # Application
 USER_ID = "default"  # User
 SESSION = "default"  # Session
@@ -86,31 +65,55 @@ SESSION = "default"  # Session
 MODEL_NAME = "gemini-2.5-flash-lite"
 
 
-# Step 1: Create the LLM Agent
-root_agent = LlmAgent(
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
-    name="text_chat_bot",
-    description="A text chatbot",  # Description of the agent's purpose
-    instruction="You are a helpful and friendly assistant. Remember context from the conversation.",
-)
+@functools.cache
+def build_root_agent():
+    """Step 1: Create the LLM Agent (ADK, the model client and .env are loaded here, on first use)."""
+    from dotenv import load_dotenv
+    from google.adk.agents import LlmAgent
+    from google.adk.models.google_llm import Gemini
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+
+    # Load environment variables from .env file
+    load_dotenv(Path(__file__).parent / ".env")
+
+    # Retry configuration for the model
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
+
+    return LlmAgent(
+        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        name="text_chat_bot",
+        description="A text chatbot",  # Description of the agent's purpose
+        instruction="You are a helpful and friendly assistant. Remember context from the conversation.",
+        **model_callbacks(),
+    )
+
+
+@functools.cache
+def build_runner():
+    """Steps 2 and 3: session management and the Runner for the demo below."""
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
 
-# Step 2: Set up Session Management
-# InMemorySessionService stores conversations in RAM (temporary)
-session_service = InMemorySessionService()
+    # InMemorySessionService stores conversations in RAM (temporary)
+    session_service = InMemorySessionService()
+    return Runner(agent=build_root_agent(), app_name=APP_NAME, session_service=session_service)
 
-# Step 3: Create the Runner
-runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
 
-print("✅ Stateful agent initialized!")
-print(f"   - Application: {APP_NAME}")
-print(f"   - User: {USER_ID}")
-print(f"   - Using: {session_service.__class__.__name__}")
+# root_agent and runner are only built when first used (see gemini_utils/lazy.py)
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent, runner=build_runner)
 
 
 # Main function to run the conversation demo
 async def main():
     """Run a conversation demo with session management."""
-    
+    runner = build_runner()
+    print("✅ Stateful agent initialized!")
+    print(f"   - Application: {APP_NAME}")
+    print(f"   - User: {USER_ID}")
+    print(f"   - Using: {runner.session_service.__class__.__name__}")
+
     # Run a conversation with two queries in the same session
     # Notice: Both queries are part of the SAME session, so context is maintained
     await run_session(
@@ -0,0 +1,269 @@
+"""
+Serve every agent under adk/ from a single process.
+
+Running each folder with its own `adk web`/`adk run` means thirteen Python
+processes, each importing ADK, creating its own genai clients (and HTTP
+connection pools) and its own session store. The host discovers every agent
+package in this directory and serves them all from one asyncio loop, sharing:
+
+- one genai Client (one connection pool) for every Gemini model of every agent
+- one session service (in memory, or a database via --session-db)
+- the process-wide rate limiter and usage tracker from gemini_utils
+
+Agents are only imported when listed and only built on their first request
+(see gemini_utils/lazy.py); pass --preload to pay the warm-up at startup.
+
+Routes:
+    GET  /apps                                              agent folders and whether they are built
+    POST /apps/{app}/users/{user}/sessions/{session}/run    {"message": "..."} -> final text, transcript, tool calls
+    GET  /apps/{app}/users/{user}/sessions/{session}        the stored session
+    GET  /metrics                                           Prometheus text (host, rate limiter, tool cache, token usage)
+
+Usage:
+    python host.py
+    python host.py --port 8080 --preload
+    python host.py --session-db sqlite+aiosqlite:///host_sessions.db
+"""
+
+import argparse
+import asyncio
+import importlib
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ADK_DIR = Path(__file__).resolve().parent
+
+# Agent folders import each other as top-level packages (gemini_utils is installed, see pyproject.toml)
+sys.path.insert(0, str(ADK_DIR))
+
+
+def discover_agents(agents_dir: Path = ADK_DIR) -> list[str]:
+    """Folder names of all agent packages (folders with an agent.py)."""
+    return sorted(p.parent.name for p in agents_dir.glob("*/agent.py"))
+
+
+def iter_agents(agent):
+    """Yields `agent` and every agent below it (sub-agents and AgentTool agents)."""
+    yield agent
+    for sub_agent in getattr(agent, "sub_agents", None) or []:
+        yield from iter_agents(sub_agent)
+    for tool in getattr(agent, "tools", None) or []:
+        if getattr(tool, "agent", None) is not None:
+            yield from iter_agents(tool.agent)
+
+
+def share_client(agent, client) -> int:
+    """Points every Gemini model in the agent tree at `client`; returns how many were changed."""
+    from google.adk.models.google_llm import Gemini
+
+    shared = 0
+    for node in iter_agents(agent):
+        model = getattr(node, "model", None)
+        if isinstance(model, str) and model:
+            # Plain model names would get a fresh Gemini (and client) from the registry
+            node.model = model = Gemini(model=model)
+        if isinstance(model, Gemini) and model.client is None:
+            model.client = client
+            shared += 1
+    return shared
+
+
+class AgentHost:
+    """Discovers the agent packages and owns the resources they share.
+
+    Args:
+        agents_dir: Directory containing the agent folders
+        session_db: SQLAlchemy URL for a DatabaseSessionService, or None for in-memory sessions
+    """
+
+    def __init__(self, agents_dir: Path = ADK_DIR, session_db: str | None = None):
+        self.names = discover_agents(agents_dir)
+        self.session_db = session_db
+        self._runners = {}
+        self._build_lock = asyncio.Lock()
+        self._client = None
+        self._session_service = None
+        self.requests = Counter()
+        self.errors = Counter()
+        self.in_flight = Counter()
+        self.seconds = Counter()
+
+    @property
+    def client(self):
+        """The genai Client shared by all agents (created on first use, inside the serving loop)."""
+        if self._client is None:
+            from google.adk.models.google_llm import Gemini
+            from gemini_utils import rate_limit
+
+            # Same options ADK would use for each model (tracking headers, project defaults, backoff)
+            self._client = Gemini(retry_options=rate_limit.RETRY_OPTIONS).api_client
+        return self._client
+
+    @property
+    def session_service(self):
+        if self._session_service is None:
+            if self.session_db:
+                from google.adk.sessions import DatabaseSessionService
+
+                self._session_service = DatabaseSessionService(db_url=self.session_db)
+            else:
+                from google.adk.sessions import InMemorySessionService
+
+                self._session_service = InMemorySessionService()
+        return self._session_service
+
+    def _build_runner(self, name: str):
+        from google.adk.apps import App
+        from google.adk.runners import Runner
+
+        module = importlib.import_module(f"{name}.agent")
+        target = module.root_agent
+        if isinstance(target, App):
+            share_client(target.root_agent, self.client)
+            return Runner(app=target, session_service=self.session_service, auto_create_session=True)
+        share_client(target, self.client)
+        return Runner(agent=target, app_name=name, session_service=self.session_service,
+                      auto_create_session=True)
+
+    async def runner(self, name: str):
+        """The Runner for agent folder `name`, building the agent on first use."""
+        if name not in self.names:
+            raise KeyError(name)
+        if name not in self._runners:
+            async with self._build_lock:
+                if name not in self._runners:
+                    # Building may start MCP sessions or read files; keep the loop responsive
+                    self._runners[name] = await asyncio.to_thread(self._build_runner, name)
+        return self._runners[name]
+
+    async def preload(self) -> None:
+        for name in self.names:
+            start = time.perf_counter()
+            await self.runner(name)
+            print(f"   - {name} ready in {time.perf_counter() - start:.2f}s")
+
+    async def run(self, name: str, user_id: str, session_id: str, message: str) -> dict:
+        """Runs one user turn and returns its TurnRecord as a dict (final text, transcript, tool calls)."""
+        from google.genai import types
+        from gemini_utils.events import consume
+
+        runner = await self.runner(name)
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        self.requests[name] += 1
+        self.in_flight[name] += 1
+        start = time.perf_counter()
+        try:
+            record = await consume(runner.run_async(user_id=user_id, session_id=session_id, new_message=content))
+        except Exception:
+            self.errors[name] += 1
+            raise
+        finally:
+            self.in_flight[name] -= 1
+            self.seconds[name] += time.perf_counter() - start
+        return {"app": name, "session_id": session_id, **record.to_dict()}
+
+    async def get_session(self, name: str, user_id: str, session_id: str):
+        runner = await self.runner(name)
+        return await self.session_service.get_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session_id
+        )
+
+    def metrics(self) -> str:
+        """Prometheus text: per-agent request counters, rate limiter waits, tool cache hits and token usage."""
+        from gemini_utils import rate_limit, tool_cache, usage
+
+        metrics = [
+            ("adk_host_requests_total", "counter", "Turns served", self.requests),
+            ("adk_host_errors_total", "counter", "Turns that raised", self.errors),
+            ("adk_host_in_flight", "gauge", "Turns currently running", self.in_flight),
+            ("adk_host_request_seconds_total", "counter", "Sum of turn durations", self.seconds),
+        ]
+        lines = []
+        for name, kind, help_text, values in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for app in self.names:
+                lines.append(f'{name}{{app="{app}"}} {values[app]:g}')
+        lines += [
+            "# HELP adk_host_agents_built Agents built so far",
+            "# TYPE adk_host_agents_built gauge",
+            f"adk_host_agents_built {len(self._runners)}",
+            "# HELP genai_rate_limit_wait_seconds_total Time spent waiting for the shared rate limiter",
+            "# TYPE genai_rate_limit_wait_seconds_total counter",
+            f"genai_rate_limit_wait_seconds_total {rate_limit.limiter.waited_seconds:g}",
+        ]
+        return "\n".join(lines) + "\n" + tool_cache.to_prometheus() + usage.tracker.to_prometheus()
+
+    async def close(self) -> None:
+        for runner in self._runners.values():
+            await runner.close()
+        if self._client is not None:
+            await self._client.aio.aclose()
+
+
+def create_app(host: AgentHost, preload: bool = False):
+    """FastAPI application serving all agents of `host`."""
+    from contextlib import asynccontextmanager
+
+    from fastapi import Body, FastAPI, HTTPException
+    from fastapi.responses import PlainTextResponse
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        if preload:
+            await host.preload()
+        yield
+        await host.close()
+
+    app = FastAPI(title="ADK agent host", lifespan=lifespan)
+
+    async def checked_runner(name: str):
+        try:
+            return await host.runner(name)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown app {name!r}") from None
+
+    @app.get("/apps")
+    async def list_apps():
+        return [{"name": name, "built": name in host._runners} for name in host.names]
+
+    @app.post("/apps/{name}/users/{user_id}/sessions/{session_id}/run")
+    async def run(name: str, user_id: str, session_id: str, message: str = Body(..., embed=True)):
+        await checked_runner(name)
+        return await host.run(name, user_id, session_id, message)
+
+    @app.get("/apps/{name}/users/{user_id}/sessions/{session_id}")
+    async def get_session(name: str, user_id: str, session_id: str):
+        await checked_runner(name)
+        session = await host.get_session(name, user_id, session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return session.model_dump(mode="json", exclude_none=True)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return host.metrics()
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve all agents from one process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--session-db", help="e.g. sqlite+aiosqlite:///host_sessions.db (default: in memory)")
+    parser.add_argument("--preload", action="store_true", help="build every agent at startup")
+    args = parser.parse_args()
+
+    host = AgentHost(session_db=args.session_db)
+    print(f"✅ Hosting {len(host.names)} agents: {', '.join(host.names)}")
+    print(f"   - Sessions: {args.session_db or 'in memory'}")
+    uvicorn.run(create_app(host, preload=args.preload), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,56 @@
-from google.genai import types
-
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.runners import InMemoryRunner
-from google.adk.sessions import InMemorySessionService
-from google.adk.tools import google_search, AgentTool, ToolContext
-from google.adk.code_executors import BuiltInCodeExecutor
-
-retry_config=types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504], # Retry on these HTTP errors
-)
+import functools
+import os
+
+from gemini_utils.events import collect
+from gemini_utils.lazy import lazy_module_attributes
+from gemini_utils.tool_cache import cached_tool, normalize_case
+
+
+CALCULATION_INSTRUCTION = """You are a specialized calculator that ONLY responds with Python code. You are forbidden from providing any text, explanations, or conversational responses.
+ 
+     Your task is to take a request for a calculation and translate it into a single block of Python code that calculates the answer.
+     
+     **RULES:**
+    1.  Your output MUST be ONLY a Python code block.
+    2.  Do NOT write any text before or after the code block.
+    3.  The Python code MUST calculate the result.
+    4.  The Python code MUST print the final result to stdout.
+    5.  You are PROHIBITED from performing the calculation yourself. Your only job is to generate the code that will perform the calculation.
+   
+    Failure to follow these rules will result in an error.
+       """
+
+ENHANCED_CURRENCY_INSTRUCTION = """You are a smart currency conversion assistant. You must strictly follow these steps and use the available tools.
+
+  For any currency conversion request:
+
+   1. Get Transaction Fee: Use the get_fee_for_payment_method() tool to determine the transaction fee.
+   2. Get Exchange Rate: Use the get_exchange_rate() tool to get the currency conversion rate.
+   3. Error Check: After each tool call, you must check the "status" field in the response. If the status is "error", you must stop and clearly explain the issue to the user.
+   4. Calculate Final Amount (CRITICAL): You are strictly prohibited from performing any arithmetic calculations yourself. You must use the calculation_agent tool to generate Python code that calculates the final converted amount. This 
+      code will use the fee information from step 1 and the exchange rate from step 2.
+   5. Provide Detailed Breakdown: In your summary, you must:
+       * State the final converted amount.
+       * Explain how the result was calculated, including:
+           * The fee percentage and the fee amount in the original currency.
+           * The amount remaining after deducting the fee.
+           * The exchange rate applied.
+
+  For several conversions at once (for example every line of an invoice):
+
+   - Call convert_currency_batch() ONCE with all lines instead of the steps above.
+     Its results already contain the fee amount, the amount after the fee and the
+     converted amount for every line, so do not call the other tools or the
+     calculation_agent for those lines.
+   - Report any line whose "status" is "error", then present the per-line breakdown and the totals.
+    """
+
 
 def show_python_code_and_result(response):
-    for i in range(len(response)):
-        # Check if the response contains a valid function call result from the code executor
-        if (
-            (response[i].content.parts)
-            and (response[i].content.parts[0])
-            and (response[i].content.parts[0].function_response)
-            and (response[i].content.parts[0].function_response.response)
-        ):
-            response_code = response[i].content.parts[0].function_response.response
+    # Check every function response part (not just the first part of each event) for code executor results
+    for function_response in collect(response).tool_responses:
+        response_code = function_response.response
+        if response_code:
             if "result" in response_code and response_code["result"] != "```":
                 if "tool_code" in response_code["result"]:
                     print(
@@ -33,7 +60,27 @@ def show_python_code_and_result(response):
                 else:
                     print("Generated Python Response >> ", response_code["result"])
 
+
+@functools.cache
+def build_rate_provider():
+    """Rates and fees are served from memory by the rate provider, which builds a full
+    cross-rate matrix (any pair is one array lookup) and refreshes it in the background.
+    Set RATES_URL to load from an HTTP feed instead of the local rates.json file.
+
+    Started by the first tool call, not when the agent module is imported.
+    """
+    from .rates import HttpRateSource, JsonFileRateSource, RateProvider
+
+    return RateProvider(
+        HttpRateSource(os.environ["RATES_URL"]) if os.getenv("RATES_URL") else JsonFileRateSource(),
+        ttl=float(os.getenv("RATES_TTL_SECONDS", "300")),
+    ).start()
+
+
 # Pay attention to the docstring, type hints, and return value.
+# Cached for a minute so results follow the rate provider's refreshes closely;
+# "Platinum Credit Card" and "platinum credit card" share one entry (the lookup ignores case)
+@cached_tool(ttl=60, normalize={"method": normalize_case})
 def get_fee_for_payment_method(method: str) -> dict:
     """Looks up the transaction fee percentage for a given payment method.
 
@@ -49,14 +96,7 @@ def get_fee_for_payment_method(method: str) -> dict:
         Success: {"status": "success", "fee_percentage": 0.02}
         Error: {"status": "error", "error_message": "Payment method not found"}
     """
-    # This simulates looking up a company's internal fee structure.
-    fee_database = {
-        "platinum credit card": 0.02,  # 2%
-        "gold debit card": 0.035,  # 3.5%
-        "bank transfer": 0.01,  # 1%
-    }
-
-    fee = fee_database.get(method.lower())
+    fee = build_rate_provider().fee(method)
     if fee is not None:
         return {"status": "success", "fee_percentage": fee}
     else:
@@ -66,10 +106,7 @@ def get_fee_for_payment_method(method: str) -> dict:
         }
 
 
-print("✅ Fee lookup function created")
-print(f"💳 Test: {get_fee_for_payment_method('platinum credit card')}")
-
-
+@cached_tool(ttl=60, normalize={"base_currency": normalize_case, "target_currency": normalize_case})
 def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
     """Looks up and returns the exchange rate between two currencies.
 
@@ -84,23 +121,8 @@ def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
         Success: {"status": "success", "rate": 0.93}
         Error: {"status": "error", "error_message": "Unsupported currency pair"}
     """
-
-    # Static data simulating a live exchange rate API
-    # In production, this would call something like: requests.get("api.exchangerates.com")
-    rate_database = {
-        "usd": {
-            "eur": 0.93,  # Euro
-            "jpy": 157.50,  # Japanese Yen
-            "inr": 83.58,  # Indian Rupee
-        }
-    }
-
-    # Input validation and processing
-    base = base_currency.lower()
-    target = target_currency.lower()
-
     # Return structured result with status
-    rate = rate_database.get(base, {}).get(target)
+    rate = build_rate_provider().rate(base_currency, target_currency)
     if rate is not None:
         return {"status": "success", "rate": rate}
     else:
@@ -110,8 +132,97 @@ def get_exchange_rate(base_currency: str, target_currency: str) -> dict:
         }
 
 
-print("✅ Exchange rate function created")
-print(f"💱 Test: {get_exchange_rate('USD', 'EUR')}")
+def convert_currency_batch(
+    amounts: list[float],
+    base_currencies: list[str],
+    target_currencies: list[str],
+    methods: list[str],
+) -> dict:
+    """Converts a whole batch of amounts (e.g. every line of an invoice) in one call.
+
+    The four lists are parallel: entry i of each list describes conversion i.
+    Fees and converted amounts are computed for all lines at once, so there is
+    no need to call get_fee_for_payment_method(), get_exchange_rate() or the
+    calculation agent for each line.
+
+    Args:
+        amounts: Amounts to convert, in the base currency of each line.
+        base_currencies: ISO 4217 codes of the currencies converted from (e.g., "USD").
+        target_currencies: ISO 4217 codes of the currencies converted to (e.g., "EUR").
+        methods: Payment method for each line, e.g. "platinum credit card".
+
+    Returns:
+        Dictionary with status, one result per line and per-target totals.
+        Success: {"status": "success", "results": [...], "totals": {"EUR": 929.07}}
+        Error: {"status": "error", "error_message": "All lists must have the same length"}
+    """
+    if not (len(amounts) == len(base_currencies) == len(target_currencies) == len(methods)):
+        return {
+            "status": "error",
+            "error_message": "All lists must have the same length",
+        }
+
+    import numpy as np
+
+    # One snapshot for the whole batch, so a background refresh can't mix tables
+    tables = build_rate_provider().snapshot
+
+    amount = np.asarray(amounts, dtype=np.float64)
+    # Unknown methods/currencies map to -1 and are masked out below
+    method_idx = np.fromiter(
+        (tables.fee_methods.get(m.lower(), -1) for m in methods), dtype=np.intp, count=len(methods)
+    )
+    base_idx = np.fromiter(
+        (tables.currencies.get(c.lower(), -1) for c in base_currencies), dtype=np.intp, count=len(amounts)
+    )
+    target_idx = np.fromiter(
+        (tables.currencies.get(c.lower(), -1) for c in target_currencies), dtype=np.intp, count=len(amounts)
+    )
+
+    fee_ok = method_idx >= 0
+    pair_ok = (base_idx >= 0) & (target_idx >= 0)
+    fee_pct = np.where(fee_ok, tables.fee_table[method_idx], np.nan)
+    rate = np.where(pair_ok, tables.matrix[base_idx, target_idx], np.nan)
+
+    fee_amount = amount * fee_pct
+    amount_after_fee = amount - fee_amount
+    converted = amount_after_fee * rate
+
+    results = []
+    totals = {}
+    for i in range(len(amount)):
+        if not fee_ok[i]:
+            results.append({
+                "status": "error",
+                "error_message": f"Payment method '{methods[i]}' not found",
+            })
+            continue
+        if not pair_ok[i]:
+            results.append({
+                "status": "error",
+                "error_message": f"Unsupported currency pair: {base_currencies[i]}/{target_currencies[i]}",
+            })
+            continue
+        target = target_currencies[i].upper()
+        results.append({
+            "status": "success",
+            "amount": float(amount[i]),
+            "base_currency": base_currencies[i].upper(),
+            "target_currency": target,
+            "fee_percentage": float(fee_pct[i]),
+            "fee_amount": round(float(fee_amount[i]), 2),
+            "amount_after_fee": round(float(amount_after_fee[i]), 2),
+            "exchange_rate": float(rate[i]),
+            "converted_amount": round(float(converted[i]), 2),
+        })
+        totals[target] = totals.get(target, 0.0) + float(converted[i])
+
+    return {
+        "status": "success",
+        "results": results,
+        "totals": {code: round(total, 2) for code, total in totals.items()},
+    }
+
 
 # # Currency agent with custom function tools
 # currency_agent = LlmAgent(
@@ -140,60 +251,53 @@ print(f"💱 Test: {get_exchange_rate('USD', 'EUR')}")
 #root_agent = currency_agent
 
 
-# Specialized calculation agent that generates and runs Python code
-calculation_agent = LlmAgent(
-    name="CalculationAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
-    instruction="""You are a specialized calculator that ONLY responds with Python code. You are forbidden from providing any text, explanations, or conversational responses.
- 
-     Your task is to take a request for a calculation and translate it into a single block of Python code that calculates the answer.
-     
-     **RULES:**
-    1.  Your output MUST be ONLY a Python code block.
-    2.  Do NOT write any text before or after the code block.
-    3.  The Python code MUST calculate the result.
-    4.  The Python code MUST print the final result to stdout.
-    5.  You are PROHIBITED from performing the calculation yourself. Your only job is to generate the code that will perform the calculation.
-   
-    Failure to follow these rules will result in an error.
-       """,
-    code_executor=BuiltInCodeExecutor(),  # Use the built-in Code Executor Tool. This gives the agent code execution capabilities
-)
+@functools.cache
+def build_root_agent():
+    """Creates the currency agent and its calculation sub-agent on first use."""
+    from google.adk.agents import LlmAgent
+    from google.adk.models.google_llm import Gemini
+    from google.adk.tools import AgentTool
+    from google.adk.code_executors import BuiltInCodeExecutor
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
 
-enhanced_currency_agent = LlmAgent(
-    name="enhanced_currency_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
-    # Updated instruction
-    instruction="""You are a smart currency conversion assistant. You must strictly follow these steps and use the available tools.
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
 
-  For any currency conversion request:
+    # Specialized calculation agent that generates and runs Python code
+    calculation_agent = LlmAgent(
+        name="CalculationAgent",
+        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        instruction=CALCULATION_INSTRUCTION,
+        code_executor=BuiltInCodeExecutor(),  # Use the built-in Code Executor Tool. This gives the agent code execution capabilities
+        **model_callbacks(),
+    )
+
+    enhanced_currency_agent = LlmAgent(
+        name="enhanced_currency_agent",
+        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        # Updated instruction
+        instruction=ENHANCED_CURRENCY_INSTRUCTION,
+        tools=[
+            get_fee_for_payment_method,
+            get_exchange_rate,
+            convert_currency_batch,
+            AgentTool(agent=calculation_agent),  # Using another agent as a tool!
+        ],
+        **model_callbacks(),
+    )
+
+    return enhanced_currency_agent
 
-   1. Get Transaction Fee: Use the get_fee_for_payment_method() tool to determine the transaction fee.
-   2. Get Exchange Rate: Use the get_exchange_rate() tool to get the currency conversion rate.
-   3. Error Check: After each tool call, you must check the "status" field in the response. If the status is "error", you must stop and clearly explain the issue to the user.
-   4. Calculate Final Amount (CRITICAL): You are strictly prohibited from performing any arithmetic calculations yourself. You must use the calculation_agent tool to generate Python code that calculates the final converted amount. This 
-      code will use the fee information from step 1 and the exchange rate from step 2.
-   5. Provide Detailed Breakdown: In your summary, you must:
-       * State the final converted amount.
-       * Explain how the result was calculated, including:
-           * The fee percentage and the fee amount in the original currency.
-           * The amount remaining after deducting the fee.
-           * The exchange rate applied.
-    """,
-    tools=[
-        get_fee_for_payment_method,
-        get_exchange_rate,
-        AgentTool(agent=calculation_agent),  # Using another agent as a tool!
-    ],
-)
 
-# Assign to root_agent so it works with `adk run` and `adk web`
-root_agent = enhanced_currency_agent
+# Assign to root_agent so it works with `adk run` and `adk web`; built when first accessed
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent, rate_provider=build_rate_provider)
 
 # Optional: Run a test (uncomment the lines below and run: python agent.py)
 # import asyncio
+# from google.adk.runners import InMemoryRunner
 # async def test():
-#     currency_runner = InMemoryRunner(agent=currency_agent)
+#     currency_runner = InMemoryRunner(agent=build_root_agent())
 #     await currency_runner.run_debug(
 #         "I want to convert 500 US Dollars to Euros using my Platinum Credit Card. How much will I receive?"
 #     )
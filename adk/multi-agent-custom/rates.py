@@ -0,0 +1,227 @@
+"""
+Exchange-rate and fee table service for the currency agents.
+
+Rates are loaded from a pluggable source (a local JSON file or an HTTP feed),
+turned into a full cross-rate matrix once per refresh, and served from memory.
+A background thread reloads the tables every `ttl` seconds; lookups never
+touch the source.
+
+Run this file directly to start a stub HTTP feed and measure latency:
+    python rates.py --serve 8765
+    python rates.py --bench http://127.0.0.1:8765/rates.json
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import requests
+
+DEFAULT_RATES_FILE = Path(__file__).parent / "rates.json"
+
+
+class JsonFileRateSource:
+    """Loads the rate/fee document from a local JSON file."""
+
+    def __init__(self, path: str | Path = DEFAULT_RATES_FILE):
+        self.path = Path(path)
+
+    def fetch(self) -> dict:
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+class HttpRateSource:
+    """Loads the rate/fee document from an HTTP endpoint, reusing one connection pool."""
+
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def fetch(self) -> dict:
+        response = self._session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+@dataclass(frozen=True)
+class RateSnapshot:
+    """Immutable view of one load of the rate/fee tables.
+
+    `matrix[i, j]` is the number of units of currency j for one unit of
+    currency i, for every pair of known currencies.
+    """
+
+    currencies: dict[str, int]
+    matrix: np.ndarray
+    fee_methods: dict[str, int]
+    fee_table: np.ndarray
+    loaded_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_document(cls, document: dict) -> "RateSnapshot":
+        """Builds the cross-rate matrix from rates quoted against a single base currency.
+
+        Expected document shape:
+            {"base": "USD", "rates": {"EUR": 0.93, ...}, "fees": {"bank transfer": 0.01, ...}}
+        """
+        base = document["base"].lower()
+        quotes = {code.lower(): float(rate) for code, rate in document["rates"].items()}
+        quotes[base] = 1.0
+
+        currencies = {code: i for i, code in enumerate(quotes)}
+        per_base = np.fromiter(quotes.values(), dtype=np.float64, count=len(quotes))
+        # units of j per unit of i = (j per base) / (i per base)
+        matrix = per_base[np.newaxis, :] / per_base[:, np.newaxis]
+        matrix.setflags(write=False)
+
+        fees = {method.lower(): float(fee) for method, fee in document.get("fees", {}).items()}
+        fee_table = np.fromiter(fees.values(), dtype=np.float64, count=len(fees))
+        fee_table.setflags(write=False)
+
+        return cls(
+            currencies=currencies,
+            matrix=matrix,
+            fee_methods={method: i for i, method in enumerate(fees)},
+            fee_table=fee_table,
+        )
+
+    def rate(self, base_currency: str, target_currency: str) -> float | None:
+        i = self.currencies.get(base_currency.lower())
+        j = self.currencies.get(target_currency.lower())
+        if i is None or j is None:
+            return None
+        return float(self.matrix[i, j])
+
+    def fee(self, method: str) -> float | None:
+        i = self.fee_methods.get(method.lower())
+        return None if i is None else float(self.fee_table[i])
+
+
+class RateProvider:
+    """Serves rate and fee lookups from memory and refreshes them in the background.
+
+    Args:
+        source: Any object with a `fetch() -> dict` method (see the sources above)
+        ttl: Seconds between background refreshes
+    """
+
+    def __init__(self, source, ttl: float = 300):
+        self.source = source
+        self.ttl = ttl
+        self.last_refresh_seconds = None
+        self.last_error = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self) -> RateSnapshot:
+        """Current tables; loads them synchronously on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self.refresh()
+                snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self) -> None:
+        """Reloads the tables from the source and swaps them in atomically."""
+        start = time.perf_counter()
+        snapshot = RateSnapshot.from_document(self.source.fetch())
+        self.last_refresh_seconds = time.perf_counter() - start
+        self._snapshot = snapshot
+
+    def start(self) -> "RateProvider":
+        """Starts the background refresh thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._refresh_loop, name="rate-provider-refresh", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.ttl):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the previous tables until the source recovers
+                self.last_error = str(e)
+
+    def rate(self, base_currency: str, target_currency: str) -> float | None:
+        return self.snapshot.rate(base_currency, target_currency)
+
+    def fee(self, method: str) -> float | None:
+        return self.snapshot.fee(method)
+
+
+def _serve(port: int, path: Path, delay: float) -> None:
+    """Stub rate feed: serves the JSON file over HTTP with an optional artificial delay."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    body = path.read_bytes()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"📡 Serving {path.name} on http://127.0.0.1:{port}/rates.json (delay={delay}s)")
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+
+def _bench(url: str, lookups: int) -> None:
+    """Measures refresh latency against a feed and in-memory lookup latency."""
+    provider = RateProvider(HttpRateSource(url) if url else JsonFileRateSource())
+
+    refresh_times = []
+    for _ in range(20):
+        provider.refresh()
+        refresh_times.append(provider.last_refresh_seconds)
+    refresh_times.sort()
+
+    codes = list(provider.snapshot.currencies)
+    pairs = [(codes[i % len(codes)], codes[(i * 7 + 1) % len(codes)]) for i in range(lookups)]
+    start = time.perf_counter()
+    for base, target in pairs:
+        provider.rate(base, target)
+    lookup_ns = (time.perf_counter() - start) / lookups * 1e9
+
+    print(f"Source: {url or DEFAULT_RATES_FILE}")
+    print(f"  Refresh p50: {refresh_times[len(refresh_times) // 2] * 1000:.2f} ms")
+    print(f"  Refresh max: {refresh_times[-1] * 1000:.2f} ms")
+    print(f"  Lookup:      {lookup_ns:.0f} ns/op over {lookups:,} lookups")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serve", type=int, metavar="PORT", help="run the stub HTTP rate feed")
+    parser.add_argument("--delay", type=float, default=0.0, help="artificial feed latency in seconds")
+    parser.add_argument("--bench", nargs="?", const="", metavar="URL", help="benchmark a feed (default: local JSON file)")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve, DEFAULT_RATES_FILE, args.delay)
+    else:
+        _bench(args.bench or "", args.lookups)
@@ -1,54 +1,75 @@
-from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.runners import InMemoryRunner
-from google.adk.tools import AgentTool, FunctionTool, google_search
-from google.genai import types
-
-retry_config=types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504], # Retry on these HTTP errors
-)
-
-# Research Agent: Its job is to use the google_search tool and present findings.
-research_agent = Agent(
-    name="ResearchAgent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    instruction="""You are a specialized research agent. Your only job is to use the
-    google_search tool to find 2-3 pieces of relevant information on the given topic and present the findings with citations.""",
-    tools=[google_search],
-    output_key="research_findings",  # The result of this agent will be stored in the session state with this key.
-)
-
-summarizer_agent = Agent(
-    name="SummarizerAgent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    # The instruction is modified to request a bulleted list for a clear output format.
-    instruction="""Read the provided research findings: {research_findings}
-Create a concise summary as a bulleted list with 3-5 key points.""",
-    output_key="final_summary",
-)
-
-# Root Coordinator: Orchestrates the workflow by calling the sub-agents as tools.
-root_agent = Agent(
-    name="ResearchCoordinator",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    # This instruction tells the root agent HOW to use its tools (which are the other agents).
-    instruction="""You are a research coordinator. Your goal is to answer the user's query by orchestrating a workflow.
+import functools
+
+from gemini_utils.lazy import lazy_module_attributes
+
+
+RESEARCH_INSTRUCTION = """You are a specialized research agent. Your only job is to use the
+    google_search tool to find 2-3 pieces of relevant information on the given topic and present the findings with citations."""
+
+SUMMARIZER_INSTRUCTION = """Read the provided research findings: {research_findings}
+Create a concise summary as a bulleted list with 3-5 key points."""
+
+RESEARCH_COORDINATOR_INSTRUCTION = """You are a research coordinator. Your goal is to answer the user's query by orchestrating a workflow.
 1. First, you MUST call the `ResearchAgent` tool to find relevant information on the topic provided by the user.
 2. Next, after receiving the research findings, you MUST call the `SummarizerAgent` tool to create a concise summary.
-3. Finally, present the final summary clearly to the user as your response.""",
-    # We wrap the sub-agents in `AgentTool` to make them callable tools for the root agent.
-    tools=[AgentTool(research_agent), AgentTool(summarizer_agent)],
-)
+3. Finally, present the final summary clearly to the user as your response."""
+
+
+@functools.cache
+def build_root_agent():
+    """Creates the ResearchCoordinator with its research and summarizer agent tools."""
+    from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
+    from google.adk.models.google_llm import Gemini
+    from google.adk.runners import InMemoryRunner
+    from google.adk.tools import AgentTool, FunctionTool, google_search
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+    from gemini_utils.adk_models import HedgedGemini
+    from gemini_utils.templates import InstructionTemplate
+
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
+
+    # Research Agent: Its job is to use the google_search tool and present findings.
+    research_agent = Agent(
+        name="ResearchAgent",
+        model=HedgedGemini(  # Read-only search turns: a slow one is hedged (gemini_utils.hedging)
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config
+        ),
+        instruction=RESEARCH_INSTRUCTION,
+        tools=[google_search],
+        output_key="research_findings",  # The result of this agent will be stored in the session state with this key.
+        **model_callbacks(),
+    )
+
+    summarizer_agent = Agent(
+        name="SummarizerAgent",
+        model=Gemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config
+        ),
+        # The instruction is modified to request a bulleted list for a clear output format.
+        # Compiled once; long findings are trimmed to the budget instead of growing the prompt
+        instruction=InstructionTemplate(SUMMARIZER_INSTRUCTION, max_tokens=2000),
+        output_key="final_summary",
+        **model_callbacks(),
+    )
+
+    # Root Coordinator: Orchestrates the workflow by calling the sub-agents as tools.
+    return Agent(
+        name="ResearchCoordinator",
+        model=Gemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config
+        ),
+        # This instruction tells the root agent HOW to use its tools (which are the other agents).
+        instruction=RESEARCH_COORDINATOR_INSTRUCTION,
+        # We wrap the sub-agents in `AgentTool` to make them callable tools for the root agent.
+        tools=[AgentTool(research_agent), AgentTool(summarizer_agent)],
+        **model_callbacks(),
+    )
+
 
+# Built when ADK first looks up root_agent (gemini_utils/lazy.py)
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent)
@@ -1,34 +1,25 @@
+import functools
 import uuid
 import asyncio
 import os
 from pathlib import Path
-from dotenv import load_dotenv
-from google.genai import types
-
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.apps.app import App, ResumabilityConfig
-from google.adk.tools.function_tool import FunctionTool
-from google.adk.tools.tool_context import ToolContext
-
-# Load environment variables from .env file
-env_path = Path(__file__).parent / ".env"
-load_dotenv(env_path)
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+
+from gemini_utils.lazy import lazy_module_attributes
 
 LARGE_ORDER_THRESHOLD = 5
 
 
+SHIPPING_INSTRUCTION = """You are a shipping coordinator assistant.
+    
+    When users request to ship containers:
+    1. Use place_shipping_order_with_approval to process the order
+    2. Report the status back to the user clearly
+    3. Keep responses concise but friendly
+    """
+
+
 def place_shipping_order_with_approval(
-    num_containers: int, destination: str, tool_context: ToolContext
+    num_containers: int, destination: str, tool_context: "ToolContext"
 ) -> dict:
     """Places a shipping order. Orders with more than 5 containers need manager approval.
     
@@ -88,33 +79,54 @@ def place_shipping_order_with_approval(
         }
 
 
-# Create shipping agent with pausable tool
-shipping_agent = LlmAgent(
-    name="shipping_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
-    instruction="""You are a shipping coordinator assistant.
-    
-    When users request to ship containers:
-    1. Use place_shipping_order_with_approval to process the order
-    2. Report the status back to the user clearly
-    3. Keep responses concise but friendly
-    """,
-    tools=[
-        FunctionTool(func=place_shipping_order_with_approval),
-    ],
-)
+@functools.cache
+def build_shipping_agent():
+    """Creates the shipping agent; ADK, the model client and .env are loaded on first use."""
+    from dotenv import load_dotenv
+    from google.adk.agents import LlmAgent
+    from google.adk.models.google_llm import Gemini
+    from google.adk.tools.function_tool import FunctionTool
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+
+    # Load environment variables from .env file
+    load_dotenv(Path(__file__).parent / ".env")
+
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
+
+    # Create shipping agent with pausable tool
+    return LlmAgent(
+        name="shipping_agent",
+        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        instruction=SHIPPING_INSTRUCTION,
+        tools=[
+            FunctionTool(func=place_shipping_order_with_approval),
+        ],
+        **model_callbacks(),
+    )
 
-# Wrap agent in App with resumability
-shipping_app = App(
-    name="shipping_app",
-    root_agent=shipping_agent,
-    resumability_config=ResumabilityConfig()
-)
 
-# Export the app for ADK CLI (though adk run/web won't work with this pattern)
-root_agent = shipping_app
+@functools.cache
+def build_shipping_app():
+    """Wraps the agent in an App with resumability."""
+    from google.adk.apps.app import App, ResumabilityConfig
+
+    return App(
+        name="shipping_app",
+        root_agent=build_shipping_agent(),
+        resumability_config=ResumabilityConfig()
+    )
+
 
-print("✅ Shipping App created with ResumabilityConfig!")
+# Export the app for ADK CLI (though adk run/web won't work with this pattern).
+# Nothing is built until one of these names is first accessed (see gemini_utils/lazy.py).
+__getattr__ = lazy_module_attributes(
+    __name__,
+    root_agent=build_shipping_app,
+    shipping_app=build_shipping_app,
+    shipping_agent=build_shipping_agent,
+)
 
 
 # ============================================================================
@@ -124,69 +136,54 @@ print("✅ Shipping App created with ResumabilityConfig!")
 async def run_shipping_workflow():
     """Run the shipping workflow programmatically with human-in-the-loop approval.
     
-    This demonstrates the programmatic pattern using Runner with sessions.
-    Note: The ToolContext.request_confirmation() pattern may require specific
-    ADK version or configuration to work properly.
+    Orders go through the durable approval queue (approvals.py): sessions live in
+    SQLite, the large order's paused invocation is recorded as pending, approved
+    through the store and then resumed - the same steps `python approvals.py`
+    performs in bulk, from any process, after a restart.
     """
-    
-    session_service = InMemorySessionService()
-    
-    # Create session
+    if __package__:
+        from .approvals import build_approval_queue
+    else:
+        from approvals import build_approval_queue
+
+    queue = build_approval_queue()
+    print("✅ Shipping App created with ResumabilityConfig and persistent sessions!")
+
     user_id = "manager_001"
-    session = await session_service.create_session(
-        app_name="shipping_app",
-        user_id=user_id
-    )
-    session_id = session.id
-    
-    runner = Runner(
-        app_name="shipping_app",
-        agent=shipping_agent,  # Use agent directly, not app
-        session_service=session_service
-    )
     
     # Test Case 1: Small order (auto-approved)
     print("\n" + "="*60)
     print("TEST 1: Small order (3 containers) - should auto-approve")
     print("="*60)
     
-    response_text = ""
-    async for event in runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=types.Content(parts=[types.Part(text="Ship 3 containers to Singapore")])
-    ):
-        if hasattr(event, 'content') and hasattr(event.content, 'parts'):
-            for part in event.content.parts:
-                if hasattr(part, 'text') and part.text:
-                    response_text += part.text
+    result = await queue.submit(user_id, "Ship 3 containers to Singapore")
     
     print(f"\n📋 Result 1:")
-    print(f"   Response: {response_text}")
+    print(f"   Response: {result['text']}")
     print(f"   (Small orders auto-approve without confirmation)")
     
     # Test Case 2: Large order (needs approval)
     print("\n" + "="*60)
     print("TEST 2: Large order (20 containers) - requires approval")
     print("="*60)
-    print("Note: ToolContext.request_confirmation() may require specific ADK setup")
-    print("This example shows the tool execution, but programmatic approval")
-    print("handling depends on ADK version and configuration.")
-    print("="*60)
     
-    response_text = ""
-    async for event in runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=types.Content(parts=[types.Part(text="Ship 20 containers to Berlin")])
-    ):
-        if hasattr(event, 'content') and hasattr(event.content, 'parts'):
-            for part in event.content.parts:
-                if hasattr(part, 'text') and part.text:
-                    response_text += part.text
+    result = await queue.submit(user_id, "Ship 20 containers to Berlin", session_id=result["session_id"])
     
     print(f"\n📋 Result 2:")
-    print(f"   Response: {response_text}")
+    print(f"   Response: {result['text']}")
+    print(f"   Pending confirmations: {result['pending']}")
+
+    # The manager approves; this could just as well happen in another process later
+    approved = queue.store.decide(result["pending"], confirmed=True)
+    print(f"\n👍 Manager approved {approved} order(s), resuming the paused invocation...")
+    print(f"   {await queue.resume_decided()}")
+
+    for row in queue.store.rows("resumed"):
+        if row["confirmation_id"] not in result["pending"]:
+            continue
+        print(f"\n📋 Resumed {row['confirmation_id']}:")
+        print(f"   Result: {row['result']}")
+    print(f"\n📊 {queue.stats()}")
     
     print("\n" + "="*60)
     print("✅ All tests complete!")
@@ -203,7 +200,8 @@ This example demonstrates the PROGRAMMATIC pattern for human-in-the-loop:
 - Uses App + ResumabilityConfig for pausable workflows
 - Uses ToolContext.request_confirmation() in tool functions
 - Uses Runner with invocation_id to pause and resume
-- Confirmations are provided programmatically via confirmations parameter
+- Keeps sessions and pending confirmations in SQLite (see approvals.py),
+  so paused orders survive restarts and can be approved in bulk
 
 ⚠️  This pattern does NOT work with 'adk web' - it's for programmatic workflows only!
     For interactive chat, use the conversational pattern in multi-agent-long-running/
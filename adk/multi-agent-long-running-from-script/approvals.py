@@ -0,0 +1,356 @@
+"""
+Durable approval queue for the shipping App.
+
+Large orders pause on `tool_context.request_confirmation()`: ADK records an
+`adk_request_confirmation` function call in the session and the invocation
+stops. It continues when the matching function response is sent back with the
+same invocation_id. With sessions in SQLite (DatabaseSessionService) and every
+pending confirmation recorded in a small SQLite table, approvals survive
+restarts and can be handled in bulk instead of one conversation turn each:
+
+    python approvals.py pending
+    python approvals.py approve --all --max-containers 50
+    python approvals.py reject <confirmation_id> ...
+    python approvals.py resume --concurrency 64
+    python approvals.py stats
+
+From code:
+    queue = build_approval_queue()
+    await queue.submit("manager_001", "Ship 20 containers to Berlin")
+    queue.store.decide(confirmed=True, max_containers=50)
+    await queue.resume_decided()
+    print(queue.stats())
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import statistics
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from gemini_utils.events import TurnRecord, consume
+
+DEFAULT_DIR = Path(__file__).parent
+DEFAULT_STORE = DEFAULT_DIR / "approvals.db"
+DEFAULT_SESSION_DB = f"sqlite+aiosqlite:///{DEFAULT_DIR / 'shipping_sessions.db'}"
+
+# Name ADK gives the function call it emits for tool_context.request_confirmation()
+REQUEST_CONFIRMATION = "adk_request_confirmation"
+ORDER_TOOL = "place_shipping_order_with_approval"
+
+# SQLite allows at most 999 bound variables per statement on older builds
+_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS approvals (
+    confirmation_id TEXT PRIMARY KEY,
+    invocation_id   TEXT NOT NULL,
+    user_id         TEXT NOT NULL,
+    session_id      TEXT NOT NULL,
+    hint            TEXT,
+    num_containers  INTEGER,
+    destination     TEXT,
+    -- pending -> approved | rejected -> resuming -> resumed | failed
+    status          TEXT NOT NULL DEFAULT 'pending',
+    confirmed       INTEGER,
+    created_at      REAL NOT NULL,
+    decided_at      REAL,
+    resume_started_at REAL,
+    resume_seconds  REAL,
+    result          TEXT,
+    error           TEXT
+);
+CREATE INDEX IF NOT EXISTS approvals_status ON approvals (status, created_at);
+"""
+
+
+class ApprovalStore:
+    """Pending confirmations and their decisions, kept in SQLite.
+
+    Args:
+        path: SQLite file; shared by every process that submits, approves or resumes
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_STORE):
+        self.path = str(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets the resumer write while others read
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, *, confirmation_id: str, invocation_id: str, user_id: str, session_id: str,
+            hint: str = "", payload: dict | None = None) -> None:
+        payload = payload or {}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO approvals (confirmation_id, invocation_id, user_id, session_id, hint,"
+                " num_containers, destination, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (confirmation_id, invocation_id, user_id, session_id, hint,
+                 payload.get("num_containers"), payload.get("destination"), time.time()),
+            )
+
+    def rows(self, status: str = "pending", limit: int | None = None) -> list[dict]:
+        query = "SELECT * FROM approvals WHERE status = ? ORDER BY created_at"
+        rows = self._connect().execute(query + (" LIMIT ?" if limit else ""),
+                                       (status, limit) if limit else (status,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def decide(self, ids: list[str] | None = None, *, confirmed: bool,
+               max_containers: int | None = None, destination: str | None = None) -> int:
+        """Approves or rejects pending confirmations; returns how many were decided.
+
+        Args:
+            ids: Confirmation ids to decide, or None for every pending one matching the filters
+            confirmed: True to approve, False to reject
+            max_containers: Only decide orders with at most this many containers
+            destination: Only decide orders to this destination
+        """
+        where, params = ["status = 'pending'"], []
+        if max_containers is not None:
+            where.append("num_containers <= ?")
+            params.append(max_containers)
+        if destination is not None:
+            where.append("destination = ?")
+            params.append(destination)
+        query = ("UPDATE approvals SET status = ?, confirmed = ?, decided_at = ? WHERE "
+                 + " AND ".join(where))
+        head = ["approved" if confirmed else "rejected", int(confirmed), time.time()]
+
+        decided = 0
+        with self._connect() as conn:
+            if ids is None:
+                decided = conn.execute(query, head + params).rowcount
+            else:
+                for start in range(0, len(ids), _CHUNK):
+                    chunk = ids[start:start + _CHUNK]
+                    decided += conn.execute(
+                        query + f" AND confirmation_id IN ({', '.join('?' * len(chunk))})",
+                        head + params + chunk,
+                    ).rowcount
+        return decided
+
+    def claim(self, limit: int | None = None, stale_after: float = 600) -> list[dict]:
+        """Marks decided confirmations as being resumed and returns them.
+
+        Claims made by a resumer that died more than `stale_after` seconds ago are taken over.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "UPDATE approvals SET status = 'resuming', resume_started_at = ?"
+                " WHERE confirmation_id IN (SELECT confirmation_id FROM approvals"
+                "   WHERE status IN ('approved', 'rejected')"
+                "      OR (status = 'resuming' AND resume_started_at < ?)"
+                "   ORDER BY decided_at LIMIT ?)"
+                " RETURNING *",
+                (now, now - stale_after, limit if limit else -1),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def finish(self, confirmation_id: str, *, seconds: float, result: dict | None = None,
+               error: str | None = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE approvals SET status = ?, resume_seconds = ?, result = ?, error = ?"
+                " WHERE confirmation_id = ?",
+                ("failed" if error else "resumed", seconds,
+                 json.dumps(result) if result is not None else None, error, confirmation_id),
+            )
+
+    def counts(self) -> dict:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM approvals GROUP BY status")
+        return dict(rows.fetchall())
+
+    def resume_seconds(self) -> list[float]:
+        rows = self._connect().execute(
+            "SELECT resume_seconds FROM approvals WHERE resume_seconds IS NOT NULL")
+        return [seconds for (seconds,) in rows.fetchall()]
+
+
+def pending_confirmations(record: TurnRecord) -> list[dict]:
+    """The confirmation requests a turn ended with (as recorded by ApprovalStore.add)."""
+    found = []
+    for call in record.calls_to(REQUEST_CONFIRMATION):
+        confirmation = (call.args or {}).get("toolConfirmation", {})
+        found.append({
+            "confirmation_id": call.id,
+            "invocation_id": record.invocation_id,
+            "hint": confirmation.get("hint", ""),
+            "payload": confirmation.get("payload") or {},
+        })
+    return found
+
+
+class ApprovalQueue:
+    """Submits orders, records the ones that pause for approval and resumes them in bulk.
+
+    Args:
+        runner: Runner for the resumable shipping App, backed by a persistent session service
+        store: Where pending confirmations and decisions are kept
+        concurrency: Maximum number of invocations resumed at the same time
+    """
+
+    def __init__(self, runner, store: ApprovalStore, concurrency: int = 32):
+        self.runner = runner
+        self.store = store
+        self.concurrency = concurrency
+
+    async def submit(self, user_id: str, message: str, session_id: str | None = None) -> dict:
+        """Runs one order request; confirmations it asks for are added to the store."""
+        from google.genai import types
+
+        if session_id is None:
+            session = await self.runner.session_service.create_session(
+                app_name=self.runner.app_name, user_id=user_id)
+            session_id = session.id
+        record = await consume(self.runner.run_async(
+            user_id=user_id, session_id=session_id,
+            new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+        ))
+        pending = pending_confirmations(record)
+        for item in pending:
+            self.store.add(user_id=user_id, session_id=session_id, **item)
+        return {
+            "session_id": session_id,
+            "text": record.text,
+            "pending": [item["confirmation_id"] for item in pending],
+        }
+
+    async def resume_decided(self, limit: int | None = None) -> dict:
+        """Resumes every approved or rejected invocation, up to `concurrency` at a time.
+
+        Confirmations in the same session are resumed one after another, since each
+        resume appends to that session; different sessions run concurrently.
+        """
+        rows = self.store.claim(limit)
+        by_session = defaultdict(list)
+        for row in rows:
+            by_session[(row["user_id"], row["session_id"])].append(row)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+
+        async def resume_session(session_rows):
+            async with semaphore:
+                for row in session_rows:
+                    await self._resume(row)
+
+        await asyncio.gather(*(resume_session(session_rows) for session_rows in by_session.values()))
+        return {"resumed": len(rows), "sessions": len(by_session),
+                "seconds": round(time.perf_counter() - start, 3)}
+
+    async def _resume(self, row: dict) -> None:
+        from google.genai import types
+
+        response = types.FunctionResponse(
+            id=row["confirmation_id"],
+            name=REQUEST_CONFIRMATION,
+            response={"confirmed": bool(row["confirmed"])},
+        )
+        start = time.perf_counter()
+        try:
+            record = await consume(self.runner.run_async(
+                user_id=row["user_id"],
+                session_id=row["session_id"],
+                invocation_id=row["invocation_id"],
+                new_message=types.Content(role="user", parts=[types.Part(function_response=response)]),
+            ))
+        except Exception as e:
+            self.store.finish(row["confirmation_id"], seconds=time.perf_counter() - start,
+                              error=f"{type(e).__name__}: {e}")
+            return
+        self.store.finish(row["confirmation_id"], seconds=time.perf_counter() - start,
+                          result=_order_result(record))
+
+    def stats(self) -> dict:
+        """Confirmation counts by status and resume latency over everything resumed so far."""
+        seconds = sorted(self.store.resume_seconds())
+        latency = {}
+        if seconds:
+            latency = {
+                "p50_ms": round(statistics.median(seconds) * 1000, 1),
+                "p95_ms": round(seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))] * 1000, 1),
+                "max_ms": round(seconds[-1] * 1000, 1),
+            }
+        return {"counts": self.store.counts(), "resume_latency": latency}
+
+
+def _order_result(record: TurnRecord) -> dict:
+    """What the order tool returned after the confirmation, plus the agent's reply."""
+    responses = record.responses_from(ORDER_TOOL)
+    result = dict(responses[-1]) if responses else {}
+    if record.text:
+        result["reply"] = record.text
+    return result
+
+
+def build_approval_queue(store_path: str | Path = DEFAULT_STORE, session_db: str = DEFAULT_SESSION_DB,
+                         concurrency: int = 32) -> ApprovalQueue:
+    """ApprovalQueue for the shipping App with sessions in `session_db`."""
+    from google.adk.runners import Runner
+    from google.adk.sessions import DatabaseSessionService
+
+    if __package__:
+        from .agent import build_shipping_app
+    else:
+        # Run as a script from this folder
+        from agent import build_shipping_app
+
+    runner = Runner(app=build_shipping_app(), session_service=DatabaseSessionService(db_url=session_db))
+    return ApprovalQueue(runner, ApprovalStore(store_path), concurrency=concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage paused shipping orders")
+    parser.add_argument("--store", default=str(DEFAULT_STORE))
+    parser.add_argument("--session-db", default=DEFAULT_SESSION_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pending = commands.add_parser("pending", help="list orders waiting for a decision")
+    pending.add_argument("--limit", type=int, default=50)
+    for name in ("approve", "reject"):
+        decide = commands.add_parser(name, help=f"{name} pending orders")
+        decide.add_argument("ids", nargs="*")
+        decide.add_argument("--all", action="store_true", help="every pending order matching the filters")
+        decide.add_argument("--max-containers", type=int)
+        decide.add_argument("--destination")
+    resume = commands.add_parser("resume", help="resume every approved/rejected invocation")
+    resume.add_argument("--concurrency", type=int, default=32)
+    resume.add_argument("--limit", type=int)
+    commands.add_parser("stats", help="counts by status and resume latency")
+    args = parser.parse_args()
+
+    store = ApprovalStore(args.store)
+    if args.command == "pending":
+        for row in store.rows("pending", args.limit):
+            print(f"{row['confirmation_id']}  {row['num_containers']:>4} containers -> {row['destination']}"
+                  f"  (session {row['session_id']})")
+    elif args.command in ("approve", "reject"):
+        if not args.ids and not args.all:
+            parser.error("give confirmation ids or --all")
+        decided = store.decide(args.ids or None, confirmed=args.command == "approve",
+                               max_containers=args.max_containers, destination=args.destination)
+        print(f"✅ {args.command}d {decided} orders")
+    elif args.command == "resume":
+        queue = build_approval_queue(args.store, args.session_db, args.concurrency)
+        print(asyncio.run(queue.resume_decided(args.limit)))
+        print(queue.stats())
+    else:
+        print(ApprovalQueue(None, store).stats())
+
+
+if __name__ == "__main__":
+    main()
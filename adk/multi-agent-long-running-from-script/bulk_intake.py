@@ -0,0 +1,412 @@
+"""
+Bulk order intake for the shipping agents.
+
+Sending every order through an agent turn costs at least one model call just
+to compare `num_containers` with LARGE_ORDER_THRESHOLD. The intake streams
+orders from a file (or stdin) and only calls the model where a model is
+actually needed:
+
+- structured orders ({"num_containers": 3, "destination": "Singapore"}) and
+  free text that is exactly one plain order ("Ship 3 containers to Singapore")
+  are parsed locally; anything more ("... and 12 to Paris", "do not ship ...")
+  is left to the model
+- orders with a non-positive container count or no destination are rejected
+  before any tool or model sees them
+- small orders are approved locally by the same tool function the agent uses
+- large orders are grouped per destination into batches for a manager to review
+  (written out with --batches; nothing here approves them)
+- only free text the regexes can't parse goes to the model, many orders per call
+
+Input formats: .jsonl (one object per line, or {"text": "..."}), .csv with
+num_containers,destination columns, anything else is one free-text order per line.
+
+Usage:
+    python bulk_intake.py orders.jsonl --batches batches.jsonl --results results.jsonl
+    python bulk_intake.py --sample 100000 --no-llm
+    cat orders.txt | python bulk_intake.py -
+    python bulk_intake.py --check      # the local parser against PARSE_CASES
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+if __package__:
+    from .agent import LARGE_ORDER_THRESHOLD, place_shipping_order_with_approval
+else:
+    # Run as a script from this folder
+    from agent import LARGE_ORDER_THRESHOLD, place_shipping_order_with_approval
+
+PARSE_MODEL = "gemini-2.5-flash-lite"
+
+_NUMBER_WORDS = {
+    word: number for number, word in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen"
+        " fifteen sixteen seventeen eighteen nineteen twenty".split()
+    )
+}
+_COUNT = r"(?P<count>\d+|" + "|".join(_NUMBER_WORDS) + r")"
+# A short place name: up to four words of letters, no digits
+_DESTINATION = r"(?P<destination>[A-Za-z][A-Za-z.'-]*(?: [A-Za-z][A-Za-z.'-]*){0,3})"
+# The whole message has to be the order; anything around it goes to the model
+_ORDER_PATTERNS = [
+    # "Ship 3 containers to Singapore", "please send twelve containers to New York."
+    re.compile(rf"^(?:please\s+)?(?:(?:ship|send)\s+)?{_COUNT}\s+(?:shipping\s+)?containers?"
+               rf"\s+(?:to|for|->)\s+{_DESTINATION}\s*[.!]?$", re.I),
+    # "Singapore: 3 containers", "Singapore, 3"
+    re.compile(rf"^{_DESTINATION}\s*[:,;]\s*{_COUNT}(?:\s+containers?)?\s*$", re.I),
+]
+# The patterns leave no room for a second order or a negation around the order itself;
+# a "destination" with one of these words ("Berlin and Paris", "Berlin, not Paris")
+# or a second count is left to the model
+_NOT_A_PLACE = re.compile(rf"\b(?:and|or|then|plus|not|no|never|cancel|{'|'.join(_NUMBER_WORDS)})\b", re.I)
+
+# Free text and what parse_order must make of it (None: left to the model); run with --check
+PARSE_CASES = [
+    ("Ship 3 containers to Singapore", (3, "Singapore")),
+    ("please send twelve containers to New York.", (12, "New York")),
+    ("Rotterdam: 4 containers", (4, "Rotterdam")),
+    ("Ship 3 containers to Berlin and 12 containers to Paris", None),
+    ("Ship 3 containers to Berlin, then 12 to Paris", None),
+    ("Do not ship 3 containers to Berlin", None),
+    ("Don't send 2 containers to Oslo", None),
+    ("Hi team, ship 3 containers to Berlin", None),
+    ("Ship 3 containers to Berlin 2", None),
+    ("Ship 3 containers to Berlin and Paris", None),
+    ("Ship 3 containers to Berlin or two to Paris", None),
+    ("Ship 3 containers to Berlin not Paris", None),
+    ("Ship zero containers to Paris", ValueError),
+]
+
+ORDER_LIST_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "index": {"type": "integer", "description": "Index of the order in the input list."},
+            "num_containers": {"type": "integer", "description": "Number of containers; 0 if not a shipping order."},
+            "destination": {"type": "string", "description": "Destination city or port."},
+        },
+        "required": ["index", "num_containers", "destination"],
+    },
+}
+
+
+@dataclass(slots=True)
+class Order:
+    line: int
+    num_containers: int
+    destination: str
+    source: str = "structured"  # structured | regex | llm
+
+
+@dataclass
+class ApprovalBatch:
+    """Large orders to one destination, waiting for a manager's review."""
+
+    batch_id: str
+    destination: str
+    orders: list[Order] = field(default_factory=list)
+
+    @property
+    def total_containers(self) -> int:
+        return sum(order.num_containers for order in self.orders)
+
+    def to_dict(self) -> dict:
+        return {
+            "batch_id": self.batch_id,
+            "destination": self.destination,
+            "total_containers": self.total_containers,
+            "orders": [asdict(order) for order in self.orders],
+        }
+
+
+@dataclass
+class IntakeReport:
+    orders: int = 0
+    auto_approved: int = 0
+    queued_for_approval: int = 0
+    approval_batches: int = 0
+    parsed_by_llm: int = 0
+    unparseable: int = 0
+    rejected: int = 0
+    llm_calls: int = 0
+    seconds: float = 0.0
+
+    @property
+    def orders_per_second(self) -> float:
+        return self.orders / self.seconds if self.seconds else 0.0
+
+    @property
+    def zero_llm_fraction(self) -> float:
+        """Share of orders approved or batched without any model call."""
+        local = self.auto_approved + self.queued_for_approval - self.parsed_by_llm
+        return local / self.orders if self.orders else 0.0
+
+
+def read_orders(path: str):
+    """Yields (line number, dict or free text) for each order in `path` ("-" for stdin)."""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+    try:
+        if path.endswith(".csv"):
+            for number, row in enumerate(csv.DictReader(stream), start=2):
+                yield number, row
+            return
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                yield number, record.get("text", record)
+            else:
+                yield number, line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _checked(order: Order) -> Order:
+    if order.num_containers <= 0:
+        raise ValueError(f"line {order.line}: num_containers must be positive, got {order.num_containers}")
+    if not order.destination:
+        raise ValueError(f"line {order.line}: no destination")
+    return order
+
+
+def parse_order(line: int, record) -> Order | None:
+    """Parses a structured record or free text without a model; None if it needs one.
+
+    Raises:
+        ValueError: The order asks for zero or fewer containers or has no destination
+    """
+    if isinstance(record, dict):
+        try:
+            order = Order(line, int(record["num_containers"]), str(record["destination"] or "").strip())
+        except (KeyError, TypeError, ValueError):
+            record = " ".join(str(value) for value in record.values())
+        else:
+            return _checked(order)
+    record = record.strip()
+    for pattern in _ORDER_PATTERNS:
+        match = pattern.match(record)
+        if match:
+            destination = match["destination"].strip().rstrip(".")
+            if _NOT_A_PLACE.search(destination):
+                return None
+            count = match["count"].lower()
+            count = int(count) if count.isdigit() else _NUMBER_WORDS[count]
+            return _checked(Order(line, count, destination, source="regex"))
+    return None
+
+
+class LlmOrderParser:
+    """Parses free-text orders with one structured-output call per chunk of orders."""
+
+    def __init__(self, client, model: str = PARSE_MODEL):
+        self.client = client
+        self.model = model
+        self.calls = 0
+
+    async def parse(self, items: list[tuple[int, str]]) -> list[Order | None]:
+        from google.genai import types
+        from gemini_utils.rate_limit import limiter
+
+        listing = "\n".join(f"{index}: {text}" for index, (_, text) in enumerate(items))
+        await limiter.acquire_async(self.model)
+        self.calls += 1
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=f"Extract the shipping order from each numbered message.\n\n{listing}",
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=ORDER_LIST_SCHEMA,
+            ),
+        )
+        orders = [None] * len(items)
+        for item in json.loads(response.text or "[]"):
+            index = item.get("index")
+            if not (isinstance(index, int) and 0 <= index < len(items)):
+                continue
+            try:
+                orders[index] = _checked(Order(items[index][0], int(item["num_containers"]),
+                                               str(item["destination"] or "").strip(), source="llm"))
+            except (KeyError, TypeError, ValueError):
+                pass  # not a shipping order (num_containers 0) or not a usable one
+        return orders
+
+
+def build_llm_parser() -> LlmOrderParser:
+    from dotenv import load_dotenv
+    from google import genai
+    from google.genai import types
+    from gemini_utils import rate_limit
+    from gemini_utils.usage import track_client
+
+    load_dotenv(Path(__file__).parent / ".env")
+    client = genai.Client(http_options=types.HttpOptions(retry_options=rate_limit.RETRY_OPTIONS))
+    return LlmOrderParser(track_client(client, script="bulk_intake"))
+
+
+class BulkIntake:
+    """Routes a stream of orders: local approval, approval batches or model parsing.
+
+    Args:
+        parser: LlmOrderParser for free text, or None to count such orders as unparseable
+        threshold: Orders above this many containers need a manager's approval
+        batch_size: Large orders per approval batch
+        llm_batch_size: Free-text orders sent to the model in one call
+        on_result: Called with each auto-approval result (e.g. to write it out)
+        on_batch: Called with each full (or final partial) ApprovalBatch
+    """
+
+    def __init__(self, parser: LlmOrderParser | None = None, threshold: int = LARGE_ORDER_THRESHOLD,
+                 batch_size: int = 100, llm_batch_size: int = 25, on_result=None, on_batch=None):
+        self.parser = parser
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.llm_batch_size = llm_batch_size
+        self.on_result = on_result or (lambda result: None)
+        self.on_batch = on_batch or (lambda batch: None)
+        self.report = IntakeReport()
+        self._open_batches = {}
+
+    def _route(self, order: Order) -> None:
+        if order.num_containers <= self.threshold:
+            # Same function the agent would call; small orders never reach tool_context
+            self.on_result(place_shipping_order_with_approval(order.num_containers, order.destination, None))
+            self.report.auto_approved += 1
+            return
+        self.report.queued_for_approval += 1
+        key = order.destination.casefold()
+        batch = self._open_batches.get(key)
+        if batch is None:
+            self.report.approval_batches += 1
+            batch = self._open_batches[key] = ApprovalBatch(f"BATCH-{self.report.approval_batches:05d}",
+                                                            order.destination)
+        batch.orders.append(order)
+        if len(batch.orders) >= self.batch_size:
+            self.on_batch(self._open_batches.pop(key))
+
+    async def _parse_free_text(self, items: list[tuple[int, str]]) -> None:
+        orders = await self.parser.parse(items) if self.parser else [None] * len(items)
+        for order in orders:
+            if order is None:
+                self.report.unparseable += 1
+            else:
+                self.report.parsed_by_llm += 1
+                self._route(order)
+
+    async def run(self, records) -> IntakeReport:
+        """Processes (line, record) pairs, e.g. from read_orders(); returns the report."""
+        start = time.perf_counter()
+        free_text = []
+        for line, record in records:
+            self.report.orders += 1
+            try:
+                order = parse_order(line, record)
+            except ValueError:
+                self.report.rejected += 1
+                continue
+            if order is not None:
+                self._route(order)
+                continue
+            free_text.append((line, record if isinstance(record, str) else json.dumps(record)))
+            if len(free_text) >= self.llm_batch_size:
+                await self._parse_free_text(free_text)
+                free_text = []
+        if free_text:
+            await self._parse_free_text(free_text)
+        for batch in self._open_batches.values():
+            self.on_batch(batch)
+        self._open_batches.clear()
+        self.report.llm_calls = self.parser.calls if self.parser else 0
+        self.report.seconds = time.perf_counter() - start
+        return self.report
+
+
+def check_parser() -> list[str]:
+    """Runs PARSE_CASES through parse_order; returns a description of each mismatch."""
+    failures = []
+    for text, expected in PARSE_CASES:
+        try:
+            order = parse_order(1, text)
+            got = (order.num_containers, order.destination) if order else None
+        except ValueError:
+            got = ValueError
+        if got != expected:
+            failures.append(f"{text!r}: expected {expected}, got {got}")
+    return failures
+
+
+def sample_orders(count: int, free_text_share: float = 0.02, seed: int = 7):
+    """Synthetic orders for benchmarking: mostly structured, some regex text, a little messy text."""
+    import random
+
+    rng = random.Random(seed)
+    cities = ["Singapore", "Berlin", "Rotterdam", "Shanghai", "New York", "Hamburg", "Los Angeles"]
+    for line in range(1, count + 1):
+        num, city = rng.choice([1, 2, 3, 4, 5, 5, 8, 12, 20]), rng.choice(cities)
+        roll = rng.random()
+        if roll < free_text_share:
+            yield line, f"Hi team, {city} needs about {num} boxes of the usual, can you arrange it?"
+        elif roll < 0.3:
+            yield line, f"Ship {num} containers to {city}"
+        else:
+            yield line, {"num_containers": num, "destination": city}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk shipping order intake")
+    parser.add_argument("path", nargs="?", help="orders file (.jsonl, .csv, text) or - for stdin")
+    parser.add_argument("--sample", type=int, help="process N synthetic orders instead of a file")
+    parser.add_argument("--no-llm", action="store_true", help="never call the model; count free text as unparseable")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--llm-batch-size", type=int, default=25)
+    parser.add_argument("--results", help="write auto-approval results here (JSONL)")
+    parser.add_argument("--batches", help="write approval batches here (JSONL)")
+    parser.add_argument("--check", action="store_true", help="check the local parser against PARSE_CASES and exit")
+    args = parser.parse_args()
+    if args.check:
+        failures = check_parser()
+        for failure in failures:
+            print(f"❌ {failure}")
+        print(f"{'✅' if not failures else '❌'} {len(PARSE_CASES) - len(failures)}/{len(PARSE_CASES)} parser cases")
+        sys.exit(1 if failures else 0)
+    if not args.path and not args.sample:
+        parser.error("give an orders file or --sample N")
+
+    results = open(args.results, "w", encoding="utf-8") if args.results else None
+    batches = open(args.batches, "w", encoding="utf-8") if args.batches else None
+    intake = BulkIntake(
+        parser=None if args.no_llm else build_llm_parser(),
+        batch_size=args.batch_size,
+        llm_batch_size=args.llm_batch_size,
+        on_result=(lambda result: results.write(json.dumps(result) + "\n")) if results else None,
+        on_batch=(lambda batch: batches.write(json.dumps(batch.to_dict()) + "\n")) if batches else None,
+    )
+    records = sample_orders(args.sample) if args.sample else read_orders(args.path)
+    try:
+        report = asyncio.run(intake.run(records))
+    finally:
+        for f in (results, batches):
+            if f:
+                f.close()
+
+    print(f"✅ {report.orders} orders in {report.seconds:.2f}s ({report.orders_per_second:,.0f} orders/s)")
+    print(f"   - Auto-approved locally:  {report.auto_approved}")
+    print(f"   - Queued for approval:    {report.queued_for_approval} in {report.approval_batches} batches")
+    print(f"   - Parsed by the model:    {report.parsed_by_llm} ({report.llm_calls} calls)")
+    print(f"   - Unparseable:            {report.unparseable}")
+    print(f"   - Rejected (invalid):     {report.rejected}")
+    print(f"   - Handled with zero LLM calls: {report.zero_llm_fraction:.1%}")
+
+
+if __name__ == "__main__":
+    main()
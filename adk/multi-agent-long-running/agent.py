@@ -1,19 +1,23 @@
-from google.genai import types
+import functools
 
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.tools.function_tool import FunctionTool
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+from gemini_utils.lazy import lazy_module_attributes
 
 LARGE_ORDER_THRESHOLD = 5
 
 
+SHIPPING_INSTRUCTION = """You are a shipping coordinator assistant.
+  
+  When users request to ship containers:
+   1. Use place_shipping_order to check if the order can be processed
+   2. If status is "approved", confirm the order to the user with the order ID
+   3. If status is "needs_approval", inform the user that this large order requires manager approval
+      and ask them: "Would you like to approve this order? (yes/no)"
+   4. If user confirms approval (says yes, approve, confirm, etc.), use approve_shipping_order
+   5. If user rejects (says no, reject, cancel, etc.), inform them the order was cancelled
+   6. Keep responses concise but friendly
+  """
+
+
 def place_shipping_order(num_containers: int, destination: str) -> dict:
     """Places a shipping order. Orders with more than 5 containers need manager approval.
 
@@ -63,28 +67,31 @@ def approve_shipping_order(num_containers: int, destination: str) -> dict:
 
 # print("✅ Long-running functions created!")
 
-# Create shipping agent with pausable tool
-shipping_agent = LlmAgent(
-    name="shipping_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
-    instruction="""You are a shipping coordinator assistant.
-  
-  When users request to ship containers:
-   1. Use place_shipping_order to check if the order can be processed
-   2. If status is "approved", confirm the order to the user with the order ID
-   3. If status is "needs_approval", inform the user that this large order requires manager approval
-      and ask them: "Would you like to approve this order? (yes/no)"
-   4. If user confirms approval (says yes, approve, confirm, etc.), use approve_shipping_order
-   5. If user rejects (says no, reject, cancel, etc.), inform them the order was cancelled
-   6. Keep responses concise but friendly
-  """,
-    tools=[
-        FunctionTool(func=place_shipping_order),
-        FunctionTool(func=approve_shipping_order)
-    ],
-)
 
-# print("✅ Shipping Agent created!")
+@functools.cache
+def build_shipping_agent():
+    """Creates the shipping agent with its pausable tools; ADK is imported on first use."""
+    from google.adk.agents import LlmAgent
+    from google.adk.models.google_llm import Gemini
+    from google.adk.tools.function_tool import FunctionTool
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
+
+    # Create shipping agent with pausable tool
+    return LlmAgent(
+        name="shipping_agent",
+        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        instruction=SHIPPING_INSTRUCTION,
+        tools=[
+            FunctionTool(func=place_shipping_order),
+            FunctionTool(func=approve_shipping_order)
+        ],
+        **model_callbacks(),
+    )
+
 
-# Export the agent for ADK CLI
-root_agent = shipping_agent
+# Export the agent for ADK CLI - built on first access (see gemini_utils/lazy.py)
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_shipping_agent, shipping_agent=build_shipping_agent)
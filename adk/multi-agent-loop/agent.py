@@ -1,79 +1,102 @@
-from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.runners import InMemoryRunner
-from google.adk.tools import AgentTool, FunctionTool, google_search
-from google.genai import types
-
-retry_config=types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504], # Retry on these HTTP errors
-)
-
-# This agent runs ONCE at the beginning to create the first draft.
-initial_writer_agent = Agent(
-    name="InitialWriterAgent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    instruction="""Based on the user's prompt, write the first draft of a short story (around 100-150 words).
-    Output only the story text, with no introduction or explanation.""",
-    output_key="current_story",  # Stores the first draft in the state.
-)
-
-# This agent's only job is to provide feedback or the approval signal. It has no tools.
-critic_agent = Agent(
-    name="CriticAgent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    instruction="""You are a constructive story critic. Review the story provided below.
+import functools
+
+from gemini_utils.lazy import lazy_module_attributes
+
+
+# This is the function that the RefinerAgent will call to exit the loop.
+INITIAL_WRITER_INSTRUCTION = """Based on the user's prompt, write the first draft of a short story (around 100-150 words).
+    Output only the story text, with no introduction or explanation."""
+
+CRITIC_INSTRUCTION = """You are a constructive story critic. Review the story provided below.
     Story: {current_story}
     
     Evaluate the story's plot, characters, and pacing.
     - If the story is well-written and complete, you MUST respond with the exact phrase: "APPROVED"
-    - Otherwise, provide 2-3 specific, actionable suggestions for improvement.""",
-    output_key="critique",  # Stores the feedback in the state.
-)
+    - Otherwise, provide 2-3 specific, actionable suggestions for improvement."""
 
-# This is the function that the RefinerAgent will call to exit the loop.
-def exit_loop():
-    """Call this function ONLY when the critique is 'APPROVED', indicating the story is finished and no more changes are needed."""
-    return {"status": "approved", "message": "Story approved. Exiting refinement loop."}
-
-# This agent refines the story based on critique OR calls the exit_loop function.
-refiner_agent = Agent(
-    name="RefinerAgent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    instruction="""You are a story refiner. You have a story draft and critique.
+REFINER_INSTRUCTION = """You are a story refiner. You have a story draft and critique.
     
     Story Draft: {current_story}
     Critique: {critique}
     
     Your task is to analyze the critique.
     - IF the critique is EXACTLY "APPROVED", you MUST call the `exit_loop` function and nothing else.
-    - OTHERWISE, rewrite the story draft to fully incorporate the feedback from the critique.""",
-    output_key="current_story",  # It overwrites the story with the new, refined version.
-    tools=[
-        FunctionTool(exit_loop)
-    ],  # The tool is now correctly initialized with the function reference.
-)
-
-# The LoopAgent contains the agents that will run repeatedly: Critic -> Refiner.
-story_refinement_loop = LoopAgent(
-    name="StoryRefinementLoop",
-    sub_agents=[critic_agent, refiner_agent],
-    max_iterations=2,  # Prevents infinite loops
-)
-
-# The root agent is a SequentialAgent that defines the overall workflow: Initial Write -> Refinement Loop.
-root_agent = SequentialAgent(
-    name="StoryPipeline",
-    sub_agents=[initial_writer_agent, story_refinement_loop],
-)
+    - OTHERWISE, rewrite the story draft to fully incorporate the feedback from the critique."""
+
+
+def exit_loop():
+    """Call this function ONLY when the critique is 'APPROVED', indicating the story is finished and no more changes are needed."""
+    return {"status": "approved", "message": "Story approved. Exiting refinement loop."}
+
+
+@functools.cache
+def build_root_agent():
+    """Creates the StoryPipeline: initial draft, then the critic/refiner loop."""
+    from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
+    from google.adk.models.google_llm import Gemini
+    from google.adk.runners import InMemoryRunner
+    from google.adk.tools import AgentTool, FunctionTool, google_search
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+    from gemini_utils.templates import InstructionTemplate
+
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
+
+    # This agent runs ONCE at the beginning to create the first draft.
+    initial_writer_agent = Agent(
+        name="InitialWriterAgent",
+        model=Gemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config
+        ),
+        instruction=INITIAL_WRITER_INSTRUCTION,
+        output_key="current_story",  # Stores the first draft in the state.
+        **model_callbacks(),
+    )
+
+    # This agent's only job is to provide feedback or the approval signal. It has no tools.
+    critic_agent = Agent(
+        name="CriticAgent",
+        model=Gemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config
+        ),
+        # No token budget: the critic can only approve a story it sees in full
+        instruction=InstructionTemplate(CRITIC_INSTRUCTION),
+        output_key="critique",  # Stores the feedback in the state.
+        **model_callbacks(),
+    )
+
+    # This agent refines the story based on critique OR calls the exit_loop function.
+    refiner_agent = Agent(
+        name="RefinerAgent",
+        model=Gemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config
+        ),
+        # No token budget: whatever is cut from current_story would be missing from the rewrite
+        instruction=InstructionTemplate(REFINER_INSTRUCTION),
+        output_key="current_story",  # It overwrites the story with the new, refined version.
+        tools=[
+            FunctionTool(exit_loop)
+        ],  # The tool is now correctly initialized with the function reference.
+        **model_callbacks(),
+    )
+
+    # The LoopAgent contains the agents that will run repeatedly: Critic -> Refiner.
+    story_refinement_loop = LoopAgent(
+        name="StoryRefinementLoop",
+        sub_agents=[critic_agent, refiner_agent],
+        max_iterations=2,  # Prevents infinite loops
+    )
+
+    # The root agent is a SequentialAgent that defines the overall workflow: Initial Write -> Refinement Loop.
+    return SequentialAgent(
+        name="StoryPipeline",
+        sub_agents=[initial_writer_agent, story_refinement_loop],
+    )
+
+
+# Built on first access (see gemini_utils/lazy.py)
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent)
@@ -1,16 +1,7 @@
+import functools
 import os
-from google.genai import types
-from google.adk.agents.llm_agent import Agent
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
-from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
-from mcp import StdioServerParameters
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+
+from gemini_utils.lazy import lazy_module_attributes
 
 # Configure MCP Toolset for SQLite using GenAI Toolbox
 # This uses the toolbox.yaml configuration file
@@ -19,26 +10,8 @@ agent_dir = os.path.dirname(os.path.abspath(__file__))
 toolbox_path = os.path.join(agent_dir, "toolbox")
 toolbox_config = os.path.join(agent_dir, "toolbox.yaml")
 
-mysql_mcp_toolset = McpToolset(
-    connection_params=StdioConnectionParams(
-        server_params=StdioServerParameters(
-            command=toolbox_path,  # GenAI Toolbox CLI
-            args=[
-                "--stdio",
-                "--tools-file", toolbox_config,  # Config file path with absolute path
-            ],
-            cwd=agent_dir,  # Set working directory
-        ),
-        timeout=30,
-    )
-)
 
-# Create database agent with MCP integration
-root_agent = Agent(
-    model='gemini-2.5-flash',
-    name='database_agent',
-    description='A database agent that can query the local SQLite test database via MCP.',
-    instruction="""You are a helpful database assistant for the test products database.
+DATABASE_INSTRUCTION = """You are a helpful database assistant for the test products database.
 
     You have access to SQLite database tools via MCP.
     
@@ -49,13 +22,102 @@ root_agent = Agent(
     4. Present results in a clear, formatted way
     
     The database contains a 'products' table with: id, name, category, price, stock
+
+    The table can be large, so keep results small:
+    - For counts, averages, minimum or maximum prices use the stats tools
+      (count-products-by-category, category-price-stats, price-stats-for-category)
+      instead of listing products.
+    - To browse products use the paginated tools (list-products-page,
+      search-by-category-page, search-by-price-range) with a small page size,
+      and only fetch further pages if the user asks for more.
     
     Always be cautious with queries and explain what you're doing.
     Focus on SELECT queries for data retrieval.
-    """,
-    tools=[mysql_mcp_toolset],
-)
+    """
+
 
-print("✅ Database agent created with MCP SQLite integration")
-print("📊 Connected to: test_database.db (local SQLite)")
-print("🔧 MCP Tools available via GenAI Toolbox")
+@functools.cache
+def build_toolbox_pool():
+    """Keep warm toolbox sessions for the whole process instead of spawning the
+    binary and redoing the MCP handshake per toolset; TOOLBOX_POOL_SIZE processes
+    share the load and calls are multiplexed over their stdio pipes.
+    """
+    from mcp import StdioServerParameters
+    from .toolbox_pool import ToolboxSessionPool
+
+    return ToolboxSessionPool(
+        StdioServerParameters(
+            command=toolbox_path,  # GenAI Toolbox CLI
+            args=[
+                "--stdio",
+                "--tools-file", toolbox_config,  # Config file path with absolute path
+            ],
+            cwd=agent_dir,  # Set working directory
+        ),
+        size=int(os.getenv("TOOLBOX_POOL_SIZE", "2")),
+        timeout=30,
+    )
+
+
+@functools.cache
+def build_database_tools():
+    """Serve the local-test-db tools from a cached read-only connection so repeated
+    questions skip both SQL execution and JSON serialization (TOOLBOX_QUERY_CACHE=0
+    sends everything through the toolbox again). Only tools the cache doesn't cover
+    still go over MCP, so with the default config no toolbox process is started.
+
+    Returns:
+        (query cache or None, tools for the agent)
+    """
+    import yaml
+    from .query_cache import load_cached_tools
+    from .toolbox_pool import PooledToolboxToolset
+
+    query_cache, database_tools = None, []
+    if os.getenv("TOOLBOX_QUERY_CACHE", "1") == "1":
+        query_cache, database_tools = load_cached_tools(toolbox_config, "local-test-db")
+
+    cached_names = {tool.name for tool in database_tools}
+    with open(toolbox_config) as f:
+        toolbox_tool_names = yaml.safe_load(f)["tools"].keys()
+    if cached_names != set(toolbox_tool_names):
+        mysql_mcp_toolset = PooledToolboxToolset(
+            build_toolbox_pool(),
+            tool_filter=[name for name in toolbox_tool_names if name not in cached_names],
+        )
+        database_tools.append(mysql_mcp_toolset)
+    return query_cache, database_tools
+
+
+@functools.cache
+def build_root_agent():
+    """Create database agent with MCP integration (on first access; see __getattr__ below)."""
+    from google.adk.agents.llm_agent import Agent
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+    from gemini_utils.adk_models import RoutedGemini
+
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
+
+    # Simple lookups run on flash-lite; a malformed tool call is retried on flash
+    model = RoutedGemini(model='gemini-2.5-flash', retry_options=retry_config)
+
+    return Agent(
+        model=model,
+        name='database_agent',
+        description='A database agent that can query the local SQLite test database via MCP.',
+        instruction=DATABASE_INSTRUCTION,
+        tools=build_database_tools()[1],
+        **model_callbacks(model),  # RoutedGemini paces each attempt against the model it calls
+    )
+
+
+# Nothing above runs at import time: adk web/run build the agent (and open the
+# database / toolbox sessions) when they first read root_agent
+__getattr__ = lazy_module_attributes(
+    __name__,
+    root_agent=build_root_agent,
+    toolbox_pool=build_toolbox_pool,
+    query_cache=lambda: build_database_tools()[0],
+)
@@ -0,0 +1,127 @@
+"""
+Benchmark the toolbox.yaml SQL tools on a synthetic products table.
+
+Builds a throwaway SQLite copy of the products schema with N rows, then runs
+the statements from toolbox.yaml for a few typical questions, comparing the
+original "dump everything" tools with the paginated/aggregate variants, before
+and after applying indexes.sql. For every answer it reports query latency and
+the size of the JSON the model would have to read (tokens ≈ characters / 4).
+
+Usage:
+    python benchmark.py               # 1,000,000 rows
+    python benchmark.py --rows 200000
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+AGENT_DIR = Path(__file__).parent
+CATEGORIES = [
+    "Electronics", "Furniture", "Garden", "Kitchen", "Office", "Sports", "Toys",
+    "Books", "Clothing", "Beauty", "Automotive", "Pet Supplies", "Tools", "Music",
+    "Health", "Baby", "Grocery", "Outdoor", "Lighting", "Storage",
+]
+
+# (question, tool, parameters) - the original tool first, then the new variant
+SCENARIOS = [
+    ("Show me some products", [
+        ("list-products", []),
+        ("list-products-page", [0, 20]),
+    ]),
+    ("Which are the cheapest Garden products?", [
+        ("search-by-category", ["Garden"]),
+        ("search-by-category-page", ["Garden", -1, 0, 20]),
+    ]),
+    ("Products between 10 and 12 EUR?", [
+        ("list-products", []),
+        ("search-by-price-range", [10, 12, 20]),
+    ]),
+    ("Average, min and max price per category?", [
+        ("list-products", []),
+        ("category-price-stats", []),
+    ]),
+    ("How many Toys do we have?", [
+        ("search-by-category", ["Toys"]),
+        ("price-stats-for-category", ["Toys"]),
+    ]),
+]
+
+
+def build_database(path: Path, rows: int) -> None:
+    """Creates the products table (same schema as test_database.db) with synthetic rows."""
+    with sqlite3.connect(AGENT_DIR / "test_database.db") as source:
+        schema = source.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'products'"
+        ).fetchone()[0]
+
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(schema)
+    conn.executemany(
+        "INSERT INTO products (id, name, category, price, stock) VALUES (?, ?, ?, ?, ?)",
+        (
+            (i, f"Product {i}", rng.choice(CATEGORIES), round(rng.uniform(1, 1000), 2), rng.randint(0, 500))
+            for i in range(1, rows + 1)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_tool(conn: sqlite3.Connection, statement: str, params: list, repeats: int) -> tuple[float, int, int]:
+    """Returns (median latency in ms, rows, characters of the JSON result)."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        cursor = conn.execute(statement, params)
+        columns = [c[0] for c in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor]
+        timings.append((time.perf_counter() - start) * 1000)
+    payload = json.dumps(rows)
+    return statistics.median(timings), len(rows), len(payload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the toolbox.yaml SQL tools")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    tools = yaml.safe_load((AGENT_DIR / "toolbox.yaml").read_text())["tools"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "products.db"
+        print(f"Building synthetic products table with {args.rows:,} rows...")
+        build_database(db_path, args.rows)
+        conn = sqlite3.connect(db_path)
+
+        for label in ("without indexes", "with indexes.sql"):
+            if label == "with indexes.sql":
+                conn.executescript((AGENT_DIR / "indexes.sql").read_text())
+
+            print(f"\n=== {label} ===")
+            print(f"{'question / tool':<46} {'ms':>10} {'rows':>9} {'~tokens':>12}")
+            for question, variants in SCENARIOS:
+                print(question)
+                for name, params in variants:
+                    statement = tools[name]["statement"]
+                    # Full-table dumps are slow to serialize; one run is enough to see the cost
+                    repeats = 1 if name in ("list-products", "search-by-category") else args.repeats
+                    ms, rows, chars = run_tool(conn, statement, params, repeats)
+                    print(f"  {name:<44} {ms:>10.2f} {rows:>9,} {chars // 4:>12,}")
+
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
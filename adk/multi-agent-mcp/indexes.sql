@@ -0,0 +1,7 @@
+-- Indexes used by the paginated and aggregate tools in toolbox.yaml.
+-- (category, price) serves category filters, keyset pages ordered by price
+-- and the per-category MIN/MAX/AVG(price) stats without touching the table.
+CREATE INDEX IF NOT EXISTS idx_products_category_price ON products(category, price);
+-- price serves price-range searches across all categories.
+CREATE INDEX IF NOT EXISTS idx_products_price ON products(price);
+ANALYZE;
@@ -0,0 +1,209 @@
+"""
+Result cache in front of the `local-test-db` toolbox source.
+
+Operators ask the database agent the same catalog questions over and over.
+Instead of sending each one through the toolbox, the `sqlite-sql` tools of a
+source are served here:
+
+- long-lived, read-only connections with memory-mapped I/O, one per thread,
+  so queries run concurrently (off the event loop) and only the cache
+  bookkeeping is serialized
+- results cached as ready-to-send JSON text, keyed on (statement, parameters),
+  so a repeated question skips both SQL execution and serialization; the cache
+  is bounded by its total size, and results too large to be worth keeping are
+  returned without being cached
+- the cache is dropped as soon as the database changes, detected through
+  `PRAGMA data_version` (commits by any other connection) and the file mtime
+  (the file being replaced)
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import yaml
+from google.adk.tools.base_tool import BaseTool
+from google.genai import types
+
+from gemini_utils import fastjson
+
+# toolbox.yaml parameter types -> JSON schema types
+_PARAMETER_TYPES = {
+    "string": "string",
+    "integer": "integer",
+    "float": "number",
+    "boolean": "boolean",
+}
+
+
+class CachedSqliteSource:
+    """Read-only SQLite source with a bounded, self-invalidating result cache.
+
+    Args:
+        database: Path to the SQLite file
+        max_entries: Maximum number of cached results (least recently used are dropped)
+        max_bytes: Maximum total size of the cached JSON results
+        max_entry_bytes: Results larger than this are returned but not cached
+        mmap_size: Bytes of the file to memory-map for reads
+    """
+
+    def __init__(self, database: str | Path, max_entries: int = 512, max_bytes: int = 32 * 1024 * 1024,
+                 max_entry_bytes: int = 1024 * 1024, mmap_size: int = 256 * 1024 * 1024):
+        self.database = Path(database)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.mmap_size = int(mmap_size)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.uncached = 0
+        self._cache = OrderedDict()  # key -> JSON text
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        # PRAGMA data_version is only comparable on one connection, so changes are
+        # always checked on this one (under the lock); queries use per-thread connections
+        self._conn = self._connect()
+        self._version = self._data_version()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"{self.database.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _data_version(self) -> tuple:
+        return (
+            os.stat(self.database).st_mtime_ns,
+            self._conn.execute("PRAGMA data_version").fetchone()[0],
+        )
+
+    def cached(self, statement: str, params: tuple = ()) -> str | None:
+        """The cached JSON result of `statement`, or None (without running it)."""
+        return self._lookup((statement, tuple(params)))[0]
+
+    def _lookup(self, key: tuple) -> tuple[str | None, tuple]:
+        with self._lock:
+            version = self._data_version()
+            if version != self._version:
+                self._cache.clear()
+                self._bytes = 0
+                self._version = version
+                self.invalidations += 1
+
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            return cached, version
+
+    def query(self, statement: str, params: tuple = ()) -> str:
+        """Returns the rows of `statement` as a JSON array of objects."""
+        key = (statement, tuple(params))
+        cached, version = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        cursor = self._reader().execute(statement, key[1])
+        columns = [c[0] for c in cursor.description]
+        result = fastjson.dumps([dict(zip(columns, row)) for row in cursor])
+        size = len(result)  # characters; about bytes for the mostly ASCII catalog data
+
+        with self._lock:
+            self.misses += 1
+            if size > self.max_entry_bytes:
+                self.uncached += 1
+            # A result read before an invalidation that happened meanwhile is not kept
+            elif version == self._version and key not in self._cache:
+                self._cache[key] = result
+                self._bytes += size
+                while len(self._cache) > self.max_entries or self._bytes > self.max_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._bytes -= len(evicted)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._cache),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "uncached": self.uncached,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+
+class CachedSqlTool(BaseTool):
+    """A `sqlite-sql` tool from toolbox.yaml, executed through a `CachedSqliteSource`."""
+
+    def __init__(self, name: str, config: dict, source: CachedSqliteSource):
+        super().__init__(name=name, description=config.get("description", "").strip())
+        self._source = source
+        self._statement = config["statement"]
+        self._parameters = config.get("parameters", [])
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters_json_schema={
+                "type": "object",
+                "properties": {
+                    p["name"]: {
+                        "type": _PARAMETER_TYPES.get(p["type"], "string"),
+                        "description": p.get("description", ""),
+                    }
+                    for p in self._parameters
+                },
+                "required": [p["name"] for p in self._parameters],
+            },
+        )
+
+    async def run_async(self, *, args, tool_context):
+        try:
+            params = tuple(args[p["name"]] for p in self._parameters)
+        except KeyError as e:
+            return {"error": f"Missing parameter: {e.args[0]}"}
+        try:
+            cached = self._source.cached(self._statement, params)
+            if cached is not None:
+                return cached
+            # SQL and serialization run in a worker thread, not on the event loop
+            return await asyncio.to_thread(self._source.query, self._statement, params)
+        except sqlite3.Error as e:
+            return {"error": f"Query failed: {e}"}
+
+
+def load_cached_tools(toolbox_config: str | Path, source_name: str) -> tuple[CachedSqliteSource, list[CachedSqlTool]]:
+    """Builds cached tools for every `sqlite-sql` tool of `source_name` in toolbox.yaml.
+
+    Returns:
+        The shared source (for stats) and the tools to give to the agent
+    """
+    toolbox_config = Path(toolbox_config)
+    config = yaml.safe_load(toolbox_config.read_text())
+    source = CachedSqliteSource(toolbox_config.parent / config["sources"][source_name]["database"])
+    tools = [
+        CachedSqlTool(name, tool, source)
+        for name, tool in config["tools"].items()
+        if tool.get("source") == source_name and tool.get("kind") == "sqlite-sql"
+    ]
+    return source, tools
@@ -0,0 +1,348 @@
+"""
+Warm MCP session pool for the GenAI Toolbox.
+
+`McpToolset` with `StdioConnectionParams` spawns the toolbox binary and runs the
+MCP handshake for its own session, and every tool call is serialized over that
+one stdio pipe. This module keeps a small pool of already-initialized toolbox
+sessions alive for the life of the process instead:
+
+- sessions are spawned once (concurrently) and reused across agent invocations
+- each call goes to the least busy session; MCP request ids let several calls
+  share one pipe, so calls are multiplexed rather than queued
+- idle sessions are pinged before use and respawned if they stopped answering
+- spawn and handshake latency are recorded per session
+
+The agent (agent.py) serves the local-test-db tools from query_cache.py by
+default, so the pool is only started for toolbox tools the cache does not
+cover, or for all of them with TOOLBOX_QUERY_CACHE=0.
+
+Run this file directly to compare a warm pool against a cold spawn per call:
+    python toolbox_pool.py --calls 50
+"""
+
+import asyncio
+import os
+import time
+from contextlib import AsyncExitStack
+
+import anyio
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.genai import types
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+# JSON-RPC error code the MCP client raises when the transport closes under a request
+_CONNECTION_CLOSED = -32000
+_TRANSPORT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, ConnectionError)
+
+
+def _is_disconnect(error: BaseException) -> bool:
+    """Whether `error` means the toolbox process or its pipe is gone (not a tool or timeout error)."""
+    if isinstance(error, _TRANSPORT_ERRORS):
+        return True
+    return getattr(getattr(error, "error", None), "code", None) == _CONNECTION_CLOSED
+
+
+class _PooledSession:
+    """One toolbox process plus its initialized MCP session.
+
+    The stdio/session context managers are entered and exited by a dedicated
+    task, because anyio requires them to be closed by the task that opened them.
+    """
+
+    def __init__(self, server_params: StdioServerParameters, timeout: float):
+        self.server_params = server_params
+        self.timeout = timeout
+        self.session = None
+        self.in_flight = 0
+        self.calls = 0
+        self.spawn_seconds = None
+        self.handshake_seconds = None
+        self.last_ok = 0.0
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error = None
+        self._task = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error:
+            raise self._error
+
+    async def _run(self) -> None:
+        try:
+            async with AsyncExitStack() as stack:
+                start = time.perf_counter()
+                read, write = await stack.enter_async_context(stdio_client(self.server_params))
+                self.spawn_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await asyncio.wait_for(session.initialize(), self.timeout)
+                self.handshake_seconds = time.perf_counter() - start
+
+                self.session = session
+                self.last_ok = time.monotonic()
+                self._ready.set()
+                await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def is_healthy(self, timeout: float) -> bool:
+        if self.session is None:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+        except Exception:
+            return False
+        self.last_ok = time.monotonic()
+        return True
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task:
+            await self._task
+
+
+async def _close_all(members: list[_PooledSession]) -> None:
+    await asyncio.gather(*(member.close() for member in members))
+
+
+class ToolboxSessionPool:
+    """Pool of warm MCP sessions to the GenAI Toolbox, shared by every invocation.
+
+    Args:
+        server_params: How to launch the toolbox (same as for `StdioConnectionParams`)
+        size: Number of toolbox processes to keep warm
+        timeout: Seconds allowed for the MCP handshake and for each tool call
+        health_check_interval: Idle seconds after which a session is pinged before use
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        size: int = 2,
+        timeout: float = 30,
+        health_check_interval: float = 30,
+    ):
+        self.server_params = server_params
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.restarts = 0
+        self._members = []
+        self._loop = None
+        self._lock = None
+
+    async def start(self) -> None:
+        """Spawns all toolbox sessions concurrently; safe to call repeatedly."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._members:
+            return
+        if self._loop is not loop:
+            # Sessions belong to the loop that created them (e.g. a previous asyncio.run).
+            # A finished asyncio.run cancelled their tasks, which closed the processes;
+            # a loop still running in another thread has to close them itself.
+            stale, previous = self._members, self._loop
+            if stale and previous is not None and previous.is_running():
+                asyncio.run_coroutine_threadsafe(_close_all(stale), previous)
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._members = []
+        async with self._lock:
+            if self._members:
+                return
+            members = [_PooledSession(self.server_params, self.timeout) for _ in range(self.size)]
+            results = await asyncio.gather(*(member.start() for member in members), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                # Don't leave the processes that did start running behind a failed pool
+                await _close_all(members)
+                raise errors[0]
+            self._members = members
+
+    async def _acquire(self) -> _PooledSession:
+        await self.start()
+        member = min(self._members, key=lambda m: m.in_flight)
+        idle = time.monotonic() - member.last_ok
+        if member.in_flight == 0 and idle > self.health_check_interval:
+            if not await member.is_healthy(timeout=min(5, self.timeout)):
+                member = await self._replace(member)
+        return member
+
+    async def _replace(self, member: _PooledSession) -> _PooledSession:
+        async with self._lock:
+            if member in self._members:
+                fresh = _PooledSession(self.server_params, self.timeout)
+                try:
+                    await fresh.start()
+                except BaseException:
+                    await fresh.close()
+                    raise
+                self._members.remove(member)
+                self._members.append(fresh)
+                self.restarts += 1
+                asyncio.create_task(member.close())
+                return fresh
+        return min(self._members, key=lambda m: m.in_flight)
+
+    async def list_tools(self) -> list:
+        member = await self._acquire()
+        result = await asyncio.wait_for(member.session.list_tools(), self.timeout)
+        return result.tools
+
+    async def call_tool(self, name: str, arguments: dict, idempotent: bool = False):
+        """Runs one tool call on the least busy session.
+
+        A session found dead before the call was sent is replaced and the call goes
+        to another one. If the connection drops while the call is in flight, the
+        session is replaced too, but the call is only sent again when `idempotent`,
+        since the toolbox may already have run it. A timeout is raised as is: the
+        session is slow, not dead, and the call may still complete on the server.
+        """
+        for attempt in range(2):
+            member = await self._acquire()
+            session = member.session
+            if session is None:
+                # Torn down since it was picked; nothing has been sent yet
+                await self._replace(member)
+                continue
+            member.in_flight += 1
+            try:
+                result = await asyncio.wait_for(session.call_tool(name, arguments=arguments), self.timeout)
+            except asyncio.TimeoutError:
+                # TimeoutError is an OSError; keep it out of the disconnect handling below
+                raise
+            except Exception as e:
+                if not _is_disconnect(e):
+                    raise
+                await self._replace(member)
+                if attempt or not idempotent:
+                    raise
+                continue
+            finally:
+                member.in_flight -= 1
+            member.calls += 1
+            member.last_ok = time.monotonic()
+            return result
+        raise ConnectionError(f"No live toolbox session for {name}")
+
+    async def close(self) -> None:
+        members, self._members = self._members, []
+        await _close_all(members)
+
+    def metrics(self) -> dict:
+        """Startup latency and load per session, for logging or a metrics endpoint."""
+        return {
+            "size": len(self._members),
+            "restarts": self.restarts,
+            "sessions": [
+                {
+                    "spawn_ms": round((m.spawn_seconds or 0) * 1000, 1),
+                    "handshake_ms": round((m.handshake_seconds or 0) * 1000, 1),
+                    "in_flight": m.in_flight,
+                    "calls": m.calls,
+                }
+                for m in self._members
+            ],
+        }
+
+
+class PooledMcpTool(BaseTool):
+    """An MCP tool whose calls are served by a `ToolboxSessionPool`."""
+
+    def __init__(self, mcp_tool, pool: ToolboxSessionPool):
+        super().__init__(name=mcp_tool.name, description=mcp_tool.description or "")
+        self._mcp_tool = mcp_tool
+        self._pool = pool
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        # `inputSchema` in mcp 1.x, `input_schema` in mcp 2.x
+        schema = getattr(self._mcp_tool, "inputSchema", None) or getattr(self._mcp_tool, "input_schema", None)
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters_json_schema=schema,
+        )
+
+    async def run_async(self, *, args, tool_context):
+        # Only calls the server marks as safe to repeat are resent after a dropped connection
+        annotations = getattr(self._mcp_tool, "annotations", None)
+        # camelCase in mcp 1.x, snake_case in mcp 2.x
+        idempotent = any(getattr(annotations, name, None) for name in
+                         ("readOnlyHint", "idempotentHint", "read_only_hint", "idempotent_hint"))
+        result = await self._pool.call_tool(self.name, args, idempotent=idempotent)
+        return result.model_dump(exclude_none=True, mode="json")
+
+
+class PooledToolboxToolset(BaseToolset):
+    """Drop-in replacement for `McpToolset` backed by a shared session pool.
+
+    The tool list is fetched once and reused. `close()` leaves the pool running,
+    since the point is to keep it warm across runners; call `pool.close()` on shutdown.
+    """
+
+    def __init__(self, pool: ToolboxSessionPool, tool_filter=None):
+        super().__init__(tool_filter=tool_filter)
+        self.pool = pool
+        self._tools = None
+
+    async def get_tools(self, readonly_context=None) -> list[BaseTool]:
+        if self._tools is None:
+            self._tools = [PooledMcpTool(tool, self.pool) for tool in await self.pool.list_tools()]
+        return [tool for tool in self._tools if self._is_tool_selected(tool, readonly_context)]
+
+    async def close(self) -> None:
+        pass
+
+
+async def _bench(server_params: StdioServerParameters, calls: int, size: int) -> None:
+    tool_name = "list-products"
+
+    start = time.perf_counter()
+    for _ in range(min(calls, 5)):
+        async with stdio_client(server_params) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.call_tool(tool_name, arguments={})
+    cold_ms = (time.perf_counter() - start) / min(calls, 5) * 1000
+
+    pool = ToolboxSessionPool(server_params, size=size)
+    start = time.perf_counter()
+    await pool.start()
+    warmup_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    await asyncio.gather(*(pool.call_tool(tool_name, {}) for _ in range(calls)))
+    warm_ms = (time.perf_counter() - start) / calls * 1000
+
+    print(f"Cold spawn + handshake + call: {cold_ms:.1f} ms/call")
+    print(f"Pool warm-up ({size} sessions):  {warmup_ms:.1f} ms (paid once)")
+    print(f"Warm pool, {calls} concurrent:    {warm_ms:.2f} ms/call")
+    print(f"Pool metrics: {pool.metrics()}")
+    await pool.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the toolbox session pool")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--size", type=int, default=2)
+    args = parser.parse_args()
+
+    agent_dir = os.path.dirname(os.path.abspath(__file__))
+    asyncio.run(_bench(
+        StdioServerParameters(
+            command=os.path.join(agent_dir, "toolbox"),
+            args=["--stdio", "--tools-file", os.path.join(agent_dir, "toolbox.yaml")],
+            cwd=agent_dir,
+        ),
+        args.calls,
+        args.size,
+    ))
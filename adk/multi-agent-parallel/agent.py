@@ -1,62 +1,24 @@
-from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.runners import InMemoryRunner
-from google.adk.tools import AgentTool, FunctionTool, google_search
-from google.genai import types
-
-retry_config=types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504], # Retry on these HTTP errors
-)
-# Tech Researcher: Focuses on AI and ML trends.
-tech_researcher = Agent(
-    name="TechResearcher",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    instruction="""Research the latest AI/ML trends. Include 3 key developments,
-the main companies involved, and the potential impact. Keep the report very concise (100 words).""",
-    tools=[google_search],
-    output_key="tech_research",  # The result of this agent will be stored in the session state with this key.
-)
-
-# Health Researcher: Focuses on medical breakthroughs.
-health_researcher = Agent(
-    name="HealthResearcher",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    instruction="""Research recent medical breakthroughs. Include 3 significant advances,
-their practical applications, and estimated timelines. Keep the report concise (100 words).""",
-    tools=[google_search],
-    output_key="health_research",  # The result will be stored with this key.
-)
-
-# Finance Researcher: Focuses on fintech trends.
-finance_researcher = Agent(
-    name="FinanceResearcher",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    instruction="""Research current fintech trends. Include 3 key trends,
-their market implications, and the future outlook. Keep the report concise (100 words).""",
-    tools=[google_search],
-    output_key="finance_research",  # The result will be stored with this key.
-)
-# The AggregatorAgent runs *after* the parallel step to synthesize the results.
-aggregator_agent = Agent(
-    name="AggregatorAgent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    # It uses placeholders to inject the outputs from the parallel agents, which are now in the session state.
-    instruction="""Combine these three research findings into a single executive summary:
+import functools
+
+from gemini_utils.lazy import lazy_module_attributes
+from gemini_utils.hedging import HedgePolicy
+
+
+# The researchers only search and summarize, so a slow turn may be sent twice;
+# one policy for all three so the latency percentile is learned from their combined requests
+research_hedge_policy = HedgePolicy(percentile=95, budget=0.05)
+
+
+TECH_RESEARCHER_INSTRUCTION = """Research the latest AI/ML trends. Include 3 key developments,
+the main companies involved, and the potential impact. Keep the report very concise (100 words)."""
+
+HEALTH_RESEARCHER_INSTRUCTION = """Research recent medical breakthroughs. Include 3 significant advances,
+their practical applications, and estimated timelines. Keep the report concise (100 words)."""
+
+FINANCE_RESEARCHER_INSTRUCTION = """Research current fintech trends. Include 3 key trends,
+their market implications, and the future outlook. Keep the report concise (100 words)."""
+
+AGGREGATOR_INSTRUCTION = """Combine these three research findings into a single executive summary:
 
     **Technology Trends:**
     {tech_research}
@@ -67,18 +29,91 @@ aggregator_agent = Agent(
     **Finance Innovations:**
     {finance_research}
     
-    Your summary should highlight common themes, surprising connections, and the most important key takeaways from all three reports. The final summary should be around 200 words.""",
-    output_key="executive_summary",  # This will be the final output of the entire system.
-)
-
-# The ParallelAgent runs all its sub-agents simultaneously.
-parallel_research_team = ParallelAgent(
-    name="ParallelResearchTeam",
-    sub_agents=[tech_researcher, health_researcher, finance_researcher],
-)
-
-# This SequentialAgent defines the high-level workflow: run the parallel team first, then run the aggregator.
-root_agent = SequentialAgent(
-    name="ResearchSystem",
-    sub_agents=[parallel_research_team, aggregator_agent],
-)
\ No newline at end of file
+    Your summary should highlight common themes, surprising connections, and the most important key takeaways from all three reports. The final summary should be around 200 words."""
+
+
+@functools.cache
+def build_root_agent():
+    """Creates the research pipeline: three parallel researchers, then the aggregator."""
+    from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
+    from google.adk.models.google_llm import Gemini
+    from google.adk.runners import InMemoryRunner
+    from google.adk.tools import AgentTool, FunctionTool, google_search
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+    from gemini_utils.adk_models import HedgedGemini
+    from gemini_utils.templates import InstructionTemplate
+
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
+
+    # Tech Researcher: Focuses on AI and ML trends.
+    tech_researcher = Agent(
+        name="TechResearcher",
+        model=HedgedGemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config,
+            hedge_policy=research_hedge_policy,
+        ),
+        instruction=TECH_RESEARCHER_INSTRUCTION,
+        tools=[google_search],
+        output_key="tech_research",  # The result of this agent will be stored in the session state with this key.
+        **model_callbacks(),
+    )
+
+    # Health Researcher: Focuses on medical breakthroughs.
+    health_researcher = Agent(
+        name="HealthResearcher",
+        model=HedgedGemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config,
+            hedge_policy=research_hedge_policy,
+        ),
+        instruction=HEALTH_RESEARCHER_INSTRUCTION,
+        tools=[google_search],
+        output_key="health_research",  # The result will be stored with this key.
+        **model_callbacks(),
+    )
+
+    # Finance Researcher: Focuses on fintech trends.
+    finance_researcher = Agent(
+        name="FinanceResearcher",
+        model=HedgedGemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config,
+            hedge_policy=research_hedge_policy,
+        ),
+        instruction=FINANCE_RESEARCHER_INSTRUCTION,
+        tools=[google_search],
+        output_key="finance_research",  # The result will be stored with this key.
+        **model_callbacks(),
+    )
+    # The AggregatorAgent runs *after* the parallel step to synthesize the results.
+    aggregator_agent = Agent(
+        name="AggregatorAgent",
+        model=Gemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config
+        ),
+        # It uses placeholders to inject the outputs from the parallel agents, which are now in the session state.
+        # The three reports share one token budget, so a runaway report is trimmed rather than the others
+        instruction=InstructionTemplate(AGGREGATOR_INSTRUCTION, max_tokens=1500),
+        output_key="executive_summary",  # This will be the final output of the entire system.
+        **model_callbacks(),
+    )
+
+    # The ParallelAgent runs all its sub-agents simultaneously.
+    parallel_research_team = ParallelAgent(
+        name="ParallelResearchTeam",
+        sub_agents=[tech_researcher, health_researcher, finance_researcher],
+    )
+
+    # This SequentialAgent defines the high-level workflow: run the parallel team first, then run the aggregator.
+    return SequentialAgent(
+        name="ResearchSystem",
+        sub_agents=[parallel_research_team, aggregator_agent],
+    )
+
+
+# Built lazily on first access - see gemini_utils/lazy.py
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent)
@@ -1,68 +1,91 @@
-from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.runners import InMemoryRunner
-from google.adk.tools import AgentTool, FunctionTool, google_search
-from google.genai import types
-
-retry_config=types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504], # Retry on these HTTP errors
-)
-
-# Outline Agent: Creates the initial blog post outline.
-outline_agent = Agent(
-    name="OutlineAgent",
-    model=Gemini(
-        model="gemini-2.5-flash",
-        retry_options=retry_config
-    ),
-    instruction="""You are an outline creator. Based on the user's topic, create a blog outline with:
+import functools
+
+from gemini_utils.lazy import lazy_module_attributes
+from gemini_utils.routing import ModelRouter
+
+
+# Short pipeline steps go to flash-lite; blog_router.stats() shows how often flash was still needed
+blog_router = ModelRouter()
+
+
+OUTLINE_INSTRUCTION = """You are an outline creator. Based on the user's topic, create a blog outline with:
     1. A catchy headline
     2. An introduction hook
     3. 3-5 main sections with 2-3 bullet points for each
     4. A concluding thought
     
-    Output ONLY the outline structure, nothing else.""",
-    output_key="blog_outline",  # The result of this agent will be stored in the session state with this key.
-)
-
-
-# Writer Agent: Writes the full blog post based on the outline from the previous agent.
-writer_agent = Agent(
-    name="WriterAgent",
-    model=Gemini(
-        model="gemini-2.5-flash",
-        retry_options=retry_config
-    ),
-    # The `{blog_outline}` placeholder automatically injects the state value from the previous agent's output.
-    instruction="""You will receive an outline. Do NOT respond to any user question directly.
+    Output ONLY the outline structure, nothing else."""
+
+WRITER_INSTRUCTION = """You will receive an outline. Do NOT respond to any user question directly.
     
     Following this outline strictly: {blog_outline}
     
-    Write a brief, One sentence blog post with an engaging and informative tone.""",
-    output_key="blog_draft",  # The result of this agent will be stored with this key.
-)
-
-# Editor Agent: Edits and polishes the draft from the writer agent.
-editor_agent = Agent(
-    name="EditorAgent",
-    model=Gemini(
-        model="gemini-2.5-flash",
-        retry_options=retry_config
-    ),
-    # This agent receives the `{blog_draft}` from the writer agent's output.
-    instruction="""You will receive a blog draft. Do NOT respond to any user question directly.
+    Write a brief, One sentence blog post with an engaging and informative tone."""
+
+EDITOR_INSTRUCTION = """You will receive a blog draft. Do NOT respond to any user question directly.
     
     Edit this draft: {blog_draft}
     
-    Your task is to polish the text by fixing any grammatical errors, improving the flow and sentence structure, and enhancing overall clarity. Output ONLY the final polished blog post.""",
-    output_key="final_blog",  # This is the final output of the entire pipeline.
-)
+    Your task is to polish the text by fixing any grammatical errors, improving the flow and sentence structure, and enhancing overall clarity. Output ONLY the final polished blog post."""
+
+
+@functools.cache
+def build_root_agent():
+    """Creates the BlogPipeline (outline -> draft -> edit); ADK is imported here, on first use."""
+    from google.adk.agents import Agent, SequentialAgent, ParallelAgent, LoopAgent
+    from google.adk.models.google_llm import Gemini
+    from google.adk.runners import InMemoryRunner
+    from google.adk.tools import AgentTool, FunctionTool, google_search
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+    from gemini_utils.adk_models import RoutedGemini
+    from gemini_utils.templates import InstructionTemplate
+
+    # Shared jittered backoff; requests are paced up front by rate_limit
+    retry_config = rate_limit.RETRY_OPTIONS
+
+    def routed_model():
+        return RoutedGemini(model="gemini-2.5-flash", retry_options=retry_config, router=blog_router)
+
+    # RoutedGemini paces each attempt against the model it calls, not the agent's callbacks
+    callbacks = model_callbacks(RoutedGemini)
+
+    # Outline Agent: Creates the initial blog post outline.
+    outline_agent = Agent(
+        name="OutlineAgent",
+        model=routed_model(),
+        instruction=OUTLINE_INSTRUCTION,
+        output_key="blog_outline",  # The result of this agent will be stored in the session state with this key.
+        **callbacks,
+    )
+
+    # Writer Agent: Writes the full blog post based on the outline from the previous agent.
+    writer_agent = Agent(
+        name="WriterAgent",
+        model=routed_model(),
+        # The `{blog_outline}` placeholder injects the state value from the previous agent's output
+        # (template compiled once; no token budget, the post has to cover the whole outline).
+        instruction=InstructionTemplate(WRITER_INSTRUCTION),
+        output_key="blog_draft",  # The result of this agent will be stored with this key.
+        **callbacks,
+    )
+
+    # Editor Agent: Edits and polishes the draft from the writer agent.
+    editor_agent = Agent(
+        name="EditorAgent",
+        model=routed_model(),
+        # This agent receives the `{blog_draft}` from the writer agent's output.
+        # No token budget: the editor rewrites the draft, so it must see all of it.
+        instruction=InstructionTemplate(EDITOR_INSTRUCTION),
+        output_key="final_blog",  # This is the final output of the entire pipeline.
+        **callbacks,
+    )
+
+    return SequentialAgent(
+        name="BlogPipeline",
+        sub_agents=[outline_agent, writer_agent, editor_agent],
+    )
 
-root_agent = SequentialAgent(
-    name="BlogPipeline",
-    sub_agents=[outline_agent, writer_agent, editor_agent],
-)
 
+# root_agent is created when ADK first asks for it (gemini_utils/lazy.py)
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent)
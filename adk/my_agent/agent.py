@@ -1,28 +1,48 @@
-from google.adk.agents.llm_agent import Agent
-from google.adk.tools import google_search
+import functools
+
+from gemini_utils.lazy import lazy_module_attributes
+from gemini_utils.tool_cache import cached_tool, normalize_text
 
 
 # Custom tool implementation
+@cached_tool(ttl=30, normalize={"city": normalize_text})
 def get_current_time(city: str) -> dict:
     """Returns the current time in a specified city."""
     print(f"🔧 TOOL CALLED: get_current_time(city='{city}')")
     return {"status": "success", "city": city, "time": "10:30 AM"}
 
-# Option 1: Use only google_search (recommended for web queries)
-root_agent = Agent(
-    
-    model='gemini-2.5-flash',
-    name='root_agent',
-    description="A helpful assistant that can search the web for information.",
-    instruction="You are a helpful assistant. Search the web using 'google_search' when users need information about current events, facts, or anything requiring up-to-date data.",
-    tools=[google_search],
-)
-
-# Option 2: Use only custom functions (uncomment to use)
-# root_agent = Agent(
-#     model='gemini-2.5-flash',
-#     name='root_agent',
-#     description="A helpful assistant that can tell the current time.",
-#     instruction="You are a helpful assistant. Tell the current time in cities using 'get_current_time'.",
-#     tools=[get_current_time],
-# )
+
+@functools.cache
+def build_root_agent():
+    """Creates the agent; ADK is imported here, on first use, not when the module loads."""
+    from google.adk.agents.llm_agent import Agent
+    from google.adk.tools import google_search
+    from gemini_utils import rate_limit
+    from gemini_utils.callbacks import model_callbacks
+    from gemini_utils.adk_models import RoutedGemini
+
+    # Short questions are answered by flash-lite; long or failed turns use flash
+    model = RoutedGemini(model='gemini-2.5-flash', retry_options=rate_limit.RETRY_OPTIONS)
+
+    # Option 1: Use only google_search (recommended for web queries)
+    return Agent(
+        model=model,
+        name='root_agent',
+        description="A helpful assistant that can search the web for information.",
+        instruction="You are a helpful assistant. Search the web using 'google_search' when users need information about current events, facts, or anything requiring up-to-date data.",
+        tools=[google_search],
+        **model_callbacks(model),  # RoutedGemini paces each attempt against the model it calls
+    )
+
+    # Option 2: Use only custom functions (replace the return above)
+    # return Agent(
+    #     model='gemini-2.5-flash',
+    #     name='root_agent',
+    #     description="A helpful assistant that can tell the current time.",
+    #     instruction="You are a helpful assistant. Tell the current time in cities using 'get_current_time'.",
+    #     tools=[get_current_time],
+    # )
+
+
+# `root_agent` is built on first access (see gemini_utils/lazy.py)
+__getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent)
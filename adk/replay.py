@@ -0,0 +1,149 @@
+"""
+Record an agent's model calls once, then replay them offline.
+
+The google_search agents (my_agent, the multi-agent-parallel researchers, the
+ResearchAgent of multi-agent-detail-and-unpredictable) cannot be timed
+reproducibly against the live API. `record` runs the agent for real and keeps
+every model exchange, grounding included, in a cassette
+(gemini_utils/cassette.py); `replay` runs the same turns against the cassette
+without network access, with the recorded latency, a fraction of it, or none.
+With --latency-scale 0 the wall time is the orchestration cost alone
+(ADK, callbacks, state handling, the event loop).
+
+During replay the shared rate limiter is pointed at a throwaway bucket file
+with no effective limit, so replays neither wait for nor spend real quota.
+
+Usage:
+    python replay.py record my_agent "Who won the last Champions League final?"
+    python replay.py replay my_agent --latency-scale 0 --repeats 5
+    python replay.py replay multi-agent-parallel --latency-scale 1
+"""
+
+import argparse
+import asyncio
+import importlib
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ADK_DIR = Path(__file__).resolve().parent
+
+# Agent folders import as top-level packages
+sys.path.insert(0, str(ADK_DIR))
+
+from gemini_utils.cassette import Cassette  # noqa: E402
+
+# Turns used when none are given on the command line
+DEFAULT_PROMPTS = {
+    "my_agent": ["What are the latest developments in the Gemini API?"],
+    "multi-agent-parallel": ["Run the daily executive briefing on Tech, Health, and Finance"],
+    "multi-agent-detail-and-unpredictable": [
+        "What are the latest advancements in quantum computing and what do they mean for AI?"
+    ],
+}
+
+
+def default_cassette(name: str) -> Path:
+    return ADK_DIR / "cassettes" / f"{name}.jsonl.gz"
+
+
+def build_runner(name: str, cassette: Cassette):
+    """Runner for agent folder `name` with every Gemini model talking to `cassette`."""
+    from google.adk.apps import App
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    target = importlib.import_module(f"{name}.agent").root_agent
+    root = target.root_agent if isinstance(target, App) else target
+    models = cassette.attach(root)
+    print(f"   - {models} model(s) of {name} attached to {cassette.path.name} ({cassette.mode})")
+    if isinstance(target, App):
+        return Runner(app=target, session_service=InMemorySessionService(), auto_create_session=True)
+    return Runner(agent=target, app_name=name, session_service=InMemorySessionService(), auto_create_session=True)
+
+
+async def run_turns(runner, prompts: list[str], session_id: str) -> tuple[float, list]:
+    """Sends `prompts` as consecutive turns of one session; returns wall time and the turn records."""
+    from google.genai import types
+    from gemini_utils.events import consume
+
+    records = []
+    start = time.perf_counter()
+    for prompt in prompts:
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        records.append(await consume(runner.run_async(user_id="replay", session_id=session_id, new_message=message)))
+    return time.perf_counter() - start, records
+
+
+async def record(name: str, prompts: list[str], path: Path, client=None) -> None:
+    if client is None:
+        from google.adk.models.google_llm import Gemini
+        from gemini_utils import rate_limit
+
+        # The same client options ADK would use for the agent's models
+        client = Gemini(retry_options=rate_limit.RETRY_OPTIONS).api_client
+    cassette = Cassette(path, mode="record", client=client)
+    runner = build_runner(name, cassette)
+    try:
+        elapsed, records = await run_turns(runner, prompts, "record")
+    finally:
+        await runner.close()
+    cassette.save()
+    print(f"\n{records[-1].text[:500]}\n")
+    print(f"✅ Recorded {len(cassette.entries)} model calls in {elapsed:.2f}s -> {path} "
+          f"({path.stat().st_size / 1024:.1f} KiB)")
+
+
+async def replay(name: str, prompts: list[str], path: Path, latency_scale: float, repeats: int, strict: bool) -> None:
+    from gemini_utils import rate_limit
+
+    cassette = Cassette(path, latency_scale=latency_scale, strict=strict)
+    with tempfile.TemporaryDirectory() as tmp:
+        rate_limit.limiter = rate_limit.TokenBucketLimiter(
+            Path(tmp) / "replay_buckets.db", limits={model: 1e9 for model in cassette.models}
+        )
+        runner = build_runner(name, cassette)
+        walls = []
+        try:
+            for repeat in range(repeats):
+                cassette.rewind()
+                before = cassette.replayed_seconds
+                elapsed, records = await run_turns(runner, prompts, f"replay-{repeat}")
+                model_seconds = cassette.replayed_seconds - before
+                walls.append(elapsed)
+                print(f"   run {repeat + 1}: {elapsed * 1000:8.1f} ms wall, {model_seconds * 1000:8.1f} ms replayed "
+                      f"model latency, {len(records[-1].transcript)} events in the last turn")
+        finally:
+            await runner.close()
+
+    print(f"\n{records[-1].text[:500]}\n")
+    print(f"📋 Replay of {path.name} (latency scale {latency_scale:g}): median {statistics.median(walls) * 1000:.1f} ms, "
+          f"min {min(walls) * 1000:.1f} ms over {repeats} run(s)")
+    print(f"   Cassette: {cassette.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or replay an agent's model calls")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("agent", help="agent folder, e.g. my_agent")
+    parser.add_argument("prompts", nargs="*", help="user turns (default: a canned prompt for the search agents)")
+    parser.add_argument("--cassette", type=Path, help="cassette file (default: cassettes/<agent>.jsonl.gz)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="replay timing: 1 = as recorded, 0 = none")
+    parser.add_argument("--repeats", type=int, default=1, help="replay runs")
+    parser.add_argument("--strict", action="store_true", help="fail on requests that were not recorded")
+    args = parser.parse_args()
+
+    prompts = args.prompts or DEFAULT_PROMPTS.get(args.agent)
+    if not prompts:
+        parser.error(f"no default prompt for {args.agent}; pass the user turns as arguments")
+    path = args.cassette or default_cassette(args.agent)
+    if args.mode == "record":
+        asyncio.run(record(args.agent, prompts, path))
+    else:
+        asyncio.run(replay(args.agent, prompts, path, args.latency_scale, args.repeats, args.strict))
+
+
+if __name__ == "__main__":
+    main()
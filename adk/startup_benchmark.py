@@ -0,0 +1,156 @@
+"""
+Cold-start benchmark for the agents in this directory.
+
+Every agent is imported in a fresh interpreter with `python -X importtime`, the
+way `adk web`/`adk run` load them. For each agent it reports
+
+- modules:   number of modules loaded by `import <agent>.agent`
+- import ms: wall time of that import (what listing/loading an app costs)
+- build ms:  time until `root_agent` is usable (import + first access)
+- total modules: modules loaded once `root_agent` is built
+
+plus one run importing all agents in a single process (what `adk web` does when
+it lists and loads every app). With --baseline the same measurements are taken
+on the adk/ and gemini_utils/ trees of another git revision, to show the
+difference made by lazy agent construction.
+
+Usage:
+    python startup_benchmark.py
+    python startup_benchmark.py --baseline HEAD~1
+    python startup_benchmark.py --repeats 5 --agents my_agent multi-agent-mcp
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+ADK_DIR = Path(__file__).resolve().parent
+REPO_ROOT = ADK_DIR.parent
+
+# Runs inside the child interpreter; prints one JSON line after the importtime output
+_CHILD = """
+import importlib, json, sys, time
+names = sys.argv[1:]
+start = time.perf_counter()
+modules = [importlib.import_module(name + ".agent") for name in names]
+imported = time.perf_counter()
+print("STARTUP-IMPORTED", file=sys.stderr, flush=True)
+for module in modules:
+    module.root_agent
+built = time.perf_counter()
+print("STARTUP " + json.dumps({"import_s": imported - start, "build_s": built - start}), flush=True)
+"""
+
+
+def agent_names(adk_dir: Path) -> list[str]:
+    return sorted(p.parent.name for p in adk_dir.glob("*/agent.py"))
+
+
+def measure(adk_dir: Path, names: list[str]) -> dict:
+    """Imports `names` in a fresh interpreter and returns module count and timings."""
+    env = {**os.environ, "PYTHONPATH": str(adk_dir.parent)}
+    env.setdefault("GOOGLE_API_KEY", "startup-benchmark")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, *names],
+        cwd=adk_dir, env=env, capture_output=True, text=True, timeout=300,
+    )
+    timings = next(
+        (json.loads(line[len("STARTUP "):]) for line in result.stdout.splitlines() if line.startswith("STARTUP ")),
+        None,
+    )
+    if timings is None:
+        raise RuntimeError(f"{' '.join(names)} failed to load:\n{result.stderr[-2000:]}")
+
+    # "import time: self [us] | cumulative | imported package", one line per module
+    modules, total_modules = 0, 0
+    for line in result.stderr.splitlines():
+        if line == "STARTUP-IMPORTED":
+            modules = total_modules
+        elif line.startswith("import time:") and "self [us]" not in line:
+            total_modules += 1
+    return {
+        "modules": modules,
+        "import_ms": timings["import_s"] * 1000,
+        "build_ms": timings["build_s"] * 1000,
+        "total_modules": total_modules,
+    }
+
+
+def measure_median(adk_dir: Path, names: list[str], repeats: int) -> dict:
+    runs = [measure(adk_dir, names) for _ in range(repeats)]
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def checkout(revision: str, target: Path) -> Path:
+    """Extracts adk/ and gemini_utils/ of `revision` into `target`; returns the adk dir."""
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", revision, "adk", "gemini_utils"],
+        cwd=REPO_ROOT, capture_output=True, check=True,
+    ).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(target)  # Archive comes from our own repository
+    # Local-only files the agents read at import (databases, rate tables, .env)
+    for path in ADK_DIR.glob("*/*"):
+        copy = target / "adk" / path.parent.name / path.name
+        if path.is_file() and not copy.exists() and path.suffix in (".db", ".json", ".env", ".yaml"):
+            copy.parent.mkdir(parents=True, exist_ok=True)
+            copy.write_bytes(path.read_bytes())
+    return target / "adk"
+
+
+def print_row(label: str, row: dict) -> None:
+    print(f"{label:<40} {row['modules']:>8.0f} {row['import_ms']:>10.0f} "
+          f"{row['build_ms']:>10.0f} {row['total_modules']:>14.0f}")
+
+
+def report(label: str, adk_dir: Path, names: list[str], repeats: int) -> dict:
+    print(f"\n=== {label} ===")
+    header = f"{'agent':<40} {'modules':>8} {'import ms':>10} {'build ms':>10} {'total modules':>14}"
+    print(header)
+    rows = {}
+    for name in names:
+        try:
+            rows[name] = measure_median(adk_dir, [name], repeats)
+        except RuntimeError as e:
+            print(f"{name:<40} {'failed':>8}  {str(e).splitlines()[0]}")
+            continue
+        print_row(name, rows[name])
+    combined = measure_median(adk_dir, list(rows), repeats)
+    print_row("all agents, one process", combined)
+    return {"agents": rows, "combined": combined}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure agent import and build time")
+    parser.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--agents", nargs="*", help="agent directories (default: all)")
+    args = parser.parse_args()
+
+    names = args.agents or agent_names(ADK_DIR)
+    current = report("working tree", ADK_DIR, names, args.repeats)
+
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline_dir = checkout(args.baseline, Path(tmp))
+            baseline_names = [name for name in names if (baseline_dir / name / "agent.py").exists()]
+            baseline = report(f"baseline {args.baseline}", baseline_dir, baseline_names, args.repeats)
+
+        print(f"\n=== import cost: {args.baseline} -> working tree ===")
+        pairs = [(name, baseline["agents"].get(name), row) for name, row in current["agents"].items()]
+        pairs.append(("all agents, one process", baseline["combined"], current["combined"]))
+        for name, before, after in pairs:
+            if before:
+                print(f"{name:<40} {before['import_ms']:>6.0f} ms -> {after['import_ms']:>5.0f} ms  "
+                      f"({before['modules']:.0f} -> {after['modules']:.0f} modules)")
+
+
+if __name__ == "__main__":
+    main()
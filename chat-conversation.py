@@ -1,10 +1,21 @@
 """
 Chat Conversation with Gemini
 Multi-turn conversation where the AI remembers context
+
+    python chat-conversation.py              # one chat session
+    python chat-conversation.py --users 50   # 50 concurrent chats through gemini_utils.chat_pool
 """
 
+import argparse
+import asyncio
+import time
+
 from google import genai
 
+from gemini_utils import rate_limit
+from gemini_utils.chat_pool import ChatPool, ChatStore
+from gemini_utils.usage import track_client
+
 # Initialize Genai client with Vertex AI authentication
 # Make sure you've run: gcloud auth application-default login
 client = genai.Client(
@@ -16,24 +27,74 @@ client = genai.Client(
 # Alternative: Use Gemini API with API key 
 # client = genai.Client(api_key="YOUR_API_KEY_HERE")
 
-print("=== Chat Conversation Example ===\n")
+# Record token usage and latency for every call (export with GENAI_USAGE_EXPORT=usage.json)
+client = track_client(client, script="chat-conversation")
+
+QUESTIONS = [
+    "What is Python?",
+    "What are its main uses?",
+    "Can you show me a simple example?",
+]
+
+
+def run_example():
+    print("=== Chat Conversation Example ===\n")
+
+    # Create a chat session
+    chat = client.chats.create(model="gemini-2.5-flash")
+
+    # First message
+    print("User: What is Python?")
+    response1 = chat.send_message("What is Python?")
+    print(f"AI: {response1.text}\n")
+
+    # Follow-up message (context is preserved from previous message)
+    print("User: What are its main uses?")
+    response2 = chat.send_message("What are its main uses?")
+    print(f"AI: {response2.text}\n")
+
+    # Another follow-up (AI remembers we're talking about Python)
+    print("User: Can you show me a simple example?")
+    response3 = chat.send_message("Can you show me a simple example?")
+    print(f"AI: {response3.text}\n")
+
+    print("Chat complete! ✨")
+
+
+async def run_many_users(users: int, store_path: str):
+    """The same conversation for many users at once, served by one async ChatPool."""
+    pool = ChatPool(client, model="gemini-2.5-flash", store=ChatStore(store_path), limiter=rate_limit.limiter)
+    latencies = []
+
+    async def user(index: int):
+        answers = []
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            answers.append(await pool.send(f"user-{index}", question))
+            latencies.append(time.perf_counter() - start)
+        return answers
 
-# Create a chat session
-chat = client.chats.create(model="gemini-2.5-flash")
+    print(f"=== {users} concurrent chats ===\n")
+    start = time.perf_counter()
+    results = await asyncio.gather(*(user(index) for index in range(users)))
+    elapsed = time.perf_counter() - start
+    await pool.close()
 
-# First message
-print("User: What is Python?")
-response1 = chat.send_message("What is Python?")
-print(f"AI: {response1.text}\n")
+    for question, answer in zip(QUESTIONS, results[0]):
+        print(f"User: {question}")
+        print(f"AI: {answer}\n")
+    latencies.sort()
+    print(f"✅ {len(latencies)} turns in {elapsed:.1f}s, p95 turn latency {latencies[int(len(latencies) * 0.95)]:.2f}s")
+    print(f"   Pool: {pool.stats()}")
 
-# Follow-up message (context is preserved from previous message)
-print("User: What are its main uses?")
-response2 = chat.send_message("What are its main uses?")
-print(f"AI: {response2.text}\n")
 
-# Another follow-up (AI remembers we're talking about Python)
-print("User: Can you show me a simple example?")
-response3 = chat.send_message("Can you show me a simple example?")
-print(f"AI: {response3.text}\n")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-turn chat, for one user or many concurrent users")
+    parser.add_argument("--users", type=int, help="run the conversation for N concurrent users through a ChatPool")
+    parser.add_argument("--store", default="chat_sessions.db", help="where evicted chat sessions are kept")
+    args = parser.parse_args()
 
-print("Chat complete! ✨")
+    if args.users:
+        asyncio.run(run_many_users(args.users, args.store))
+    else:
+        run_example()
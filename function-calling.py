@@ -7,7 +7,11 @@ from google import genai
 from google.genai import types
 from google.cloud import logging
 from datetime import datetime, timedelta
-import json
+
+from gemini_utils import fastjson
+from gemini_utils.structs import LogEntry, LogSummary
+from gemini_utils.tool_cache import cached_tool
+from gemini_utils.usage import track_client
 
 # Initialize Genai client with Vertex AI authentication
 # Make sure you've run: gcloud auth application-default login
@@ -20,11 +24,18 @@ client = genai.Client(
 # Alternative: Use Gemini API with API key 
 # client = genai.Client(api_key="YOUR_API_KEY_HERE")
 
+# Record token usage and latency for every call (export with GENAI_USAGE_EXPORT=usage.json)
+client = track_client(client, script="function-calling")
+
 # Configuration
 PROJECT_ID = "metro-markets-sms-prod"
 
 # --- Define Your Python Functions ---
 
+# Follow-up questions about the same country/GTIN reuse the logs fetched in the last 2 minutes
+# instead of querying Cloud Logging again ("Error fetching logs: ..." results are not kept).
+# No normalization: the log filter matches country and GTIN exactly, so "de" and "DE" differ.
+@cached_tool(ttl=120, maxsize=128)
 def fetch_cloud_logs(country: str, gtin: str = None, days_back: int = 7) -> str:
     """
     Fetch logs from Google Cloud Logging
@@ -62,19 +73,18 @@ jsonPayload.context.message.country="{country}"'''
             return f"No logs found for country={country}, gtin={gtin}"
         
         # Format results
-        result = {
-            "count": len(entries),
-            "logs": []
-        }
-        
+        result = LogSummary(count=len(entries))
+
         for entry in entries:
-            result["logs"].append({
-                "timestamp": entry.timestamp.isoformat() if entry.timestamp else "N/A",
-                "severity": entry.severity,
-                "payload_summary": str(entry.payload)[:200] + "..." if len(str(entry.payload)) > 200 else str(entry.payload)
-            })
-        
-        return json.dumps(result, indent=2)
+            payload = str(entry.payload)
+            result.logs.append(LogEntry(
+                timestamp=entry.timestamp.isoformat() if entry.timestamp else "N/A",
+                severity=entry.severity,
+                payload_summary=payload[:200] + "..." if len(payload) > 200 else payload,
+            ))
+
+        # Compact: the model reads it as tokens, indentation would only add to the bill
+        return fastjson.dumps(result)
     
     except Exception as e:
         return f"Error fetching logs: {str(e)}"
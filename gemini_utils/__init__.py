@@ -0,0 +1,3 @@
+"""
+Shared helpers for the Gemini example scripts and the ADK agents.
+"""
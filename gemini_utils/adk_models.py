@@ -0,0 +1,157 @@
+"""
+ADK model classes built on the shared helpers.
+
+`HedgedGemini` is a drop-in replacement for `Gemini` that hedges non-streaming
+requests (see gemini_utils.hedging). Use it only for agents whose model turns
+are safe to send twice, e.g. researchers that search and summarize:
+
+    model=HedgedGemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
+
+`RoutedGemini` sends short turns to flash-lite and everything else to its own
+`model`, re-running a flash-lite turn on the large model when it comes back
+malformed or empty (see gemini_utils.routing). It paces every attempt against
+the model it actually calls, so give its agent `model_callbacks(model)`:
+
+    model = RoutedGemini(model="gemini-2.5-flash", retry_options=retry_config)
+    Agent(model=model, ..., **model_callbacks(model))
+"""
+
+import time
+from typing import AsyncGenerator, ClassVar
+
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import Field
+
+from . import usage
+from .hedging import HedgePolicy, hedged
+from .rate_limit import limiter
+from .routing import ModelRouter
+
+# Finish reasons worth a second try on the larger model (a SAFETY block would just repeat)
+_ESCALATE_FINISH_REASONS = {
+    types.FinishReason.MALFORMED_FUNCTION_CALL: "malformed_function_call",
+    types.FinishReason.UNEXPECTED_TOOL_CALL: "unexpected_tool_call",
+}
+
+
+def _copy_request(llm_request: LlmRequest, **update) -> LlmRequest:
+    # Gemini mutates the request (config headers, trailing user turn), so each attempt gets its own copy
+    return llm_request.model_copy(update={
+        "contents": list(llm_request.contents),
+        "config": llm_request.config.model_copy(deep=True) if llm_request.config else None,
+        **update,
+    })
+
+
+def _request_chars(llm_request: LlmRequest) -> int:
+    """Characters of text in the system instruction and conversation."""
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    contents = list(llm_request.contents)
+    if isinstance(instruction, str):
+        total = len(instruction)
+    else:
+        total = 0
+        if isinstance(instruction, types.Content):
+            contents.append(instruction)
+    for content in contents:
+        for part in content.parts or []:
+            total += len(part.text or "")
+    return total
+
+
+def _escalation_reason(responses: list[LlmResponse]) -> str | None:
+    if not responses:
+        return "empty"
+    final = responses[-1]
+    if final.finish_reason in _ESCALATE_FINISH_REASONS:
+        return _ESCALATE_FINISH_REASONS[final.finish_reason]
+    if not final.error_code and not (final.content and final.content.parts):
+        return "empty"
+    return None
+
+
+class HedgedGemini(Gemini):
+    """Gemini model that sends a duplicate request when the first one is unusually slow.
+
+    Streaming requests are passed through unchanged. Share one `hedge_policy`
+    between agents that call the same model so the latency percentile is
+    learned from all of their requests.
+    """
+
+    hedge_policy: HedgePolicy = Field(default_factory=HedgePolicy)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if stream:
+            async for response in super().generate_content_async(llm_request, stream=True):
+                yield response
+            return
+
+        parent = super()
+
+        async def attempt():
+            request = _copy_request(llm_request)
+            return [response async for response in parent.generate_content_async(request, stream=False)]
+
+        for response in await hedged(attempt, self.hedge_policy):
+            yield response
+
+
+class RoutedGemini(Gemini):
+    """Gemini model that tries flash-lite first for short turns.
+
+    `model` is the large model: it handles long turns and escalations. The
+    router's small model handles the rest. Escalation rates are available from
+    `router.stats()`; share one router between agents to aggregate them.
+
+    The rate limiter is charged per attempt, for the model the attempt goes to.
+    A discarded flash-lite answer is counted in gemini_utils.usage here; the
+    agent's after-callback counts the response that is returned.
+    """
+
+    router: ModelRouter = Field(default_factory=ModelRouter)
+
+    # Read by model_callbacks(): the agent's before-callbacks would charge the requested model
+    paces_requests: ClassVar[bool] = True
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        large_model = llm_request.model or self.model
+        first = self.router.pick(_request_chars(llm_request))
+        if first != self.router.small_model:
+            first = large_model
+
+        if stream:
+            # Partial responses are already on their way to the user; no escalation
+            self.router.record(first)
+            await limiter.acquire_async(first)
+            async for response in super().generate_content_async(_copy_request(llm_request, model=first), stream=True):
+                response.model_version = response.model_version or first
+                yield response
+            return
+
+        await limiter.acquire_async(first)
+        start = time.perf_counter()
+        responses = [
+            response
+            async for response in super().generate_content_async(_copy_request(llm_request, model=first), stream=False)
+        ]
+        reason = _escalation_reason(responses) if first != large_model else None
+        self.router.record(first, reason)
+        if reason:
+            usage.record_attempt(first, responses[-1].usage_metadata if responses else None,
+                                 time.perf_counter() - start)
+            await limiter.acquire_async(large_model)
+            responses = [
+                response
+                async for response in super().generate_content_async(_copy_request(llm_request, model=large_model), stream=False)
+            ]
+        for response in responses:
+            # Lets the usage after-callback account the response to the model that answered
+            response.model_version = response.model_version or (large_model if reason else first)
+            yield response
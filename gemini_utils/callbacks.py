@@ -0,0 +1,30 @@
+"""
+Model callbacks shared by every ADK agent in the repository.
+
+    Agent(..., **model_callbacks())
+    Agent(model=model, ..., **model_callbacks(model))   # for a RoutedGemini model
+
+Each model request is first paced by the shared rate limiter
+(gemini_utils.rate_limit), then timed and its tokens counted
+(gemini_utils.usage); a failed request is dropped from the accounting.
+Models that pick the model to call themselves (`paces_requests`) pace each
+attempt against that model, so they are not paced again here.
+"""
+
+from . import rate_limit, usage
+
+
+def model_callbacks(model=None) -> dict:
+    """The before/after model callback arguments for an `LlmAgent`.
+
+    Args:
+        model: The agent's model (or its class), when it may pace its own requests
+    """
+    before = [usage.before_model_callback]
+    if not getattr(model, "paces_requests", False):
+        before.insert(0, rate_limit.before_model_callback)
+    return {
+        "before_model_callback": before,
+        "after_model_callback": usage.after_model_callback,
+        "on_model_error_callback": usage.on_model_error_callback,
+    }
@@ -0,0 +1,298 @@
+"""
+Record and replay model calls, for offline and repeatable agent runs.
+
+Agents using the built-in google_search tool get their grounding from inside
+the model call, so their timing depends on the network and on what the search
+returns that day. A `Cassette` sits where ADK's Gemini model calls its genai
+client:
+
+- record mode forwards every request to a real client and keeps the response
+  (grounding metadata included) and its timing
+- replay mode answers from the recording without any network access, either
+  with the recorded timing (`latency_scale=1`), scaled, or instantly (0)
+
+    cassette = Cassette("cassettes/my_agent.jsonl.gz", mode="replay", latency_scale=0)
+    cassette.attach(root_agent)   # every Gemini model in the agent tree
+    ...                           # run the agent as usual
+    cassette.stats()
+
+    cassette = Cassette("cassettes/my_agent.jsonl.gz", mode="record", client=real_client)
+    cassette.attach(root_agent)
+    ...
+    cassette.save()
+
+Requests are matched by a hash of model, contents and config (HTTP options
+such as tracking headers are left out; see request_key). Identical requests are answered in
+the order they were recorded; once their recordings are used up, a repeat gets
+the last one again. A request that was never recorded gets the next unplayed
+recording of the same model, unless `strict=True`, in which case it raises
+CassetteMiss. Cassettes are gzipped JSON lines: one header, then one line per
+model call.
+
+In replay, attached HedgedGemini models never hedge: the duplicate attempt
+would take a recording of its own.
+
+adk/replay.py records and replays the agents from the command line.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+
+from google.genai import types
+
+FORMAT = "gemini-cassette"
+VERSION = 1
+
+
+class CassetteMiss(KeyError):
+    """Raised in strict replay when a request was not recorded."""
+
+
+def request_key(model: str, contents, config) -> str:
+    """Stable hash of a generate_content request.
+
+    ADK passes the outputs of parallel branches to the next agent in the order
+    they finished, which changes from run to run; so each run of consecutive
+    contents with the same role is hashed as a set, not a sequence.
+    """
+    if isinstance(contents, (str, types.Content)):
+        contents = [contents]
+    groups = []
+    for item in contents or []:
+        if isinstance(item, str):
+            # What the SDK sends for a plain string
+            item = types.Content(role="user", parts=[types.Part(text=item)])
+        data = item.model_dump(mode="json", exclude_none=True) if hasattr(item, "model_dump") else item
+        role = data.get("role") if isinstance(data, dict) else None
+        text = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+        if groups and groups[-1][0] == role:
+            groups[-1][1].append(text)
+        else:
+            groups.append((role, [text]))
+    payload = {"model": model, "contents": [sorted(texts) for _, texts in groups]}
+    if config is not None:
+        if hasattr(config, "model_dump"):
+            config = config.model_dump(mode="json", exclude_none=True, exclude={"http_options"})
+        payload["config"] = config
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+def _dump_response(response: types.GenerateContentResponse) -> dict:
+    return response.model_dump(mode="json", exclude_none=True, exclude={"sdk_http_response"})
+
+
+class Cassette:
+    """Recorded model calls, with a genai-compatible client that records or replays them.
+
+    Args:
+        path: Cassette file (.jsonl.gz)
+        mode: "record" (forward to `client` and keep the responses) or "replay"
+        client: Real genai Client, required for recording
+        latency_scale: Replay timing: 1 = as recorded, 0 = no delay
+        strict: Raise CassetteMiss for requests that were not recorded, instead of
+            answering with the next recording of the same model
+    """
+
+    def __init__(self, path: str | Path, mode: str = "replay", client=None,
+                 latency_scale: float = 1.0, strict: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode must be 'record' or 'replay', not {mode!r}")
+        if mode == "record" and client is None:
+            raise ValueError("Recording needs a real client")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self.client = CassetteClient(self, client)
+        self.entries: list[dict] = []
+        self._lock = threading.Lock()
+        self._by_key = defaultdict(deque)  # key -> indexes into entries, in recorded order
+        self._by_model = defaultdict(deque)
+        self._played = set()
+        self._last_recorded = {}  # key -> index of its last recording
+        self.counts = {"recorded": 0, "replayed": 0, "repeats": 0, "fallbacks": 0, "misses": 0}
+        self.replayed_seconds = 0.0
+        if mode == "replay":
+            self.load()
+
+    # --- Storage ----------------------------------------------------------
+
+    def load(self) -> None:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != FORMAT or header.get("version") != VERSION:
+                raise ValueError(f"{self.path} is not a version {VERSION} {FORMAT} file")
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        # ADK shapes requests per backend; replay as the recording client did so the keys match
+        self.client.vertexai = header.get("vertexai", False)
+        self.rewind()
+
+    def rewind(self) -> None:
+        """Makes every recording available again (for repeated replays)."""
+        with self._lock:
+            self._by_key.clear()
+            self._by_model.clear()
+            self._played.clear()
+            self._last_recorded.clear()
+            for index, entry in enumerate(self.entries):
+                self._by_key[entry["key"]].append(index)
+                self._by_model[entry["model"]].append(index)
+                self._last_recorded[entry["key"]] = index
+
+    def save(self) -> Path:
+        """Writes the recording (atomically) and returns its path."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        header = {"format": FORMAT, "version": VERSION, "recorded_at": time.time(),
+                  "vertexai": self.client.vertexai, "calls": len(self.entries)}
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=9) as f:
+            for line in (header, *self.entries):
+                f.write(json.dumps(line, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.path)
+        return self.path
+
+    @property
+    def models(self) -> set[str]:
+        return {entry["model"] for entry in self.entries}
+
+    # --- Record / replay --------------------------------------------------
+
+    def record(self, key: str, model: str, stream: bool, chunks: list[tuple[float, dict]]) -> None:
+        entry = {"key": key, "model": model, "stream": stream, "chunks": [[round(at, 4), data] for at, data in chunks]}
+        with self._lock:
+            self.entries.append(entry)
+            self.counts["recorded"] += 1
+
+    def take(self, key: str, model: str) -> dict:
+        """The recording answering this request (played once per rewind, except to repeats of its own request)."""
+        with self._lock:
+            index = self._next_unplayed(self._by_key.get(key))
+            outcome = "replayed"
+            if index is None and key in self._last_recorded:
+                # Asked more often than recorded (e.g. a retry): never take another request's recording
+                index, outcome = self._last_recorded[key], "repeats"
+            elif index is None and not self.strict:
+                index, outcome = self._next_unplayed(self._by_model.get(model)), "fallbacks"
+            if index is None:
+                self.counts["misses"] += 1
+                raise CassetteMiss(f"No recorded {model} call left for this request (key {key})")
+            self._played.add(index)
+            self.counts[outcome] += 1
+            entry = self.entries[index]
+            self.replayed_seconds += entry["chunks"][-1][0] * self.latency_scale
+            return entry
+
+    def _next_unplayed(self, queue: deque | None) -> int | None:
+        while queue:
+            index = queue.popleft()
+            if index not in self._played:
+                return index
+        return None
+
+    def attach(self, agent) -> int:
+        """Points every Gemini model in the agent tree (sub-agents, AgentTool agents) at this cassette.
+
+        In replay, HedgedGemini models get a policy that never hedges.
+        Returns how many models were attached.
+        """
+        from google.adk.models.google_llm import Gemini
+
+        from .adk_models import HedgedGemini
+        from .hedging import HedgePolicy
+
+        attached = 0
+        pending = [agent]
+        while pending:
+            node = pending.pop()
+            model = getattr(node, "model", None)
+            if isinstance(model, str) and model:
+                # A plain model name would otherwise get its own client from the registry
+                node.model = model = Gemini(model=model)
+            if isinstance(model, Gemini):
+                model.client = self.client
+                attached += 1
+            if isinstance(model, HedgedGemini) and self.mode == "replay":
+                model.hedge_policy = HedgePolicy(budget=0)
+            pending.extend(getattr(node, "sub_agents", None) or [])
+            pending.extend(tool.agent for tool in getattr(node, "tools", None) or []
+                           if getattr(tool, "agent", None) is not None)
+        return attached
+
+    def stats(self) -> dict:
+        return {**self.counts, "calls": len(self.entries), "replayed_seconds": round(self.replayed_seconds, 3)}
+
+
+class _AsyncModels:
+    def __init__(self, cassette: Cassette, real):
+        self._cassette = cassette
+        self._real = real
+
+    async def generate_content(self, *, model: str, contents, config=None) -> types.GenerateContentResponse:
+        cassette = self._cassette
+        key = request_key(model, contents, config)
+        if cassette.mode == "record":
+            start = time.perf_counter()
+            response = await self._real.generate_content(model=model, contents=contents, config=config)
+            cassette.record(key, model, False, [(time.perf_counter() - start, _dump_response(response))])
+            return response
+
+        entry = cassette.take(key, model)
+        at, data = entry["chunks"][-1]
+        if at and cassette.latency_scale:
+            await asyncio.sleep(at * cassette.latency_scale)
+        return types.GenerateContentResponse.model_validate(data)
+
+    async def generate_content_stream(self, *, model: str, contents, config=None):
+        cassette = self._cassette
+        key = request_key(model, contents, config)
+        if cassette.mode == "record":
+            start = time.perf_counter()
+            stream = await self._real.generate_content_stream(model=model, contents=contents, config=config)
+
+            async def recorded():
+                chunks = []
+                async for response in stream:
+                    chunks.append((time.perf_counter() - start, _dump_response(response)))
+                    yield response
+                cassette.record(key, model, True, chunks)
+
+            return recorded()
+
+        entry = cassette.take(key, model)
+
+        async def replayed():
+            elapsed = 0.0
+            for at, data in entry["chunks"]:
+                if cassette.latency_scale and at > elapsed:
+                    await asyncio.sleep((at - elapsed) * cassette.latency_scale)
+                    elapsed = at
+                yield types.GenerateContentResponse.model_validate(data)
+
+        return replayed()
+
+
+class _Aio:
+    def __init__(self, cassette: Cassette, real):
+        self.models = _AsyncModels(cassette, real.models if real is not None else None)
+        self._real = real
+
+    async def aclose(self) -> None:
+        if self._real is not None:
+            await self._real.aclose()
+
+
+class CassetteClient:
+    """The part of `genai.Client` ADK's Gemini model uses (`client.aio.models`), backed by a Cassette."""
+
+    def __init__(self, cassette: Cassette, real=None):
+        self.cassette = cassette
+        self.aio = _Aio(cassette, real.aio if real is not None else None)
+        self.vertexai = bool(getattr(real, "vertexai", False))
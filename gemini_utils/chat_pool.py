@@ -0,0 +1,320 @@
+"""
+Async chat sessions for many concurrent users.
+
+`client.chats.create()` keeps one synchronous session per object, with its
+history as full `types.Content` models. `ChatPool` serves any number of chats
+over `client.aio`:
+
+- sessions live in an LRU-bounded pool; the least recently used sessions are
+  evicted when the pool is full, and sessions idle for `idle_seconds` are
+  evicted, by a background task started after a turn is answered, so no
+  request waits for the scan or the store write
+- history is a list of slotted `Turn` records with interned role strings;
+  `types.Content` objects are only built for the request being sent
+- evicted sessions are written to a ChatStore (SQLite) and restored from it
+  when their chat comes back
+- turns of the same chat are serialized; different chats run concurrently
+
+    pool = ChatPool(client, model="gemini-2.5-flash", store=ChatStore("chats.db"))
+    answer = await pool.send("user-42", "What is Python?")
+    await pool.close()   # writes every live session to the store
+
+Memory per idle session and p95 turn latency against the stub model, with
+and without eviction:
+    python -m gemini_utils.chat_pool --chats 1000 --turns 5 --max-sessions 300
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from google.genai import types
+
+# Busy sessions skipped per eviction pass before giving up; the next answered turn starts another pass
+_MAX_SKIPPED = 64
+
+USER = sys.intern("user")
+MODEL = sys.intern("model")
+_ROLES = {USER: USER, MODEL: MODEL}
+
+
+class Turn:
+    """One message of a chat history."""
+
+    __slots__ = ("role", "text")
+
+    def __init__(self, role: str, text: str):
+        self.role = _ROLES.get(role) or sys.intern(role)
+        self.text = text
+
+    def to_content(self) -> types.Content:
+        return types.Content(role=self.role, parts=[types.Part(text=self.text)])
+
+
+class ChatSession:
+    __slots__ = ("chat_id", "turns", "last_used", "lock", "users")
+
+    def __init__(self, chat_id: str, turns: list[Turn] | None = None):
+        self.chat_id = chat_id
+        self.turns = turns or []
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.users = 0  # send() calls holding this session; such sessions are never evicted
+
+    def to_json(self) -> str:
+        return json.dumps([[turn.role, turn.text] for turn in self.turns], separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, chat_id: str, data: str) -> "ChatSession":
+        return cls(chat_id, [Turn(role, text) for role, text in json.loads(data)])
+
+
+class ChatStore:
+    """Chat histories on disk (SQLite), for sessions evicted from the pool.
+
+    Args:
+        path: SQLite file
+    """
+
+    def __init__(self, path: str | Path = "chat_sessions.db"):
+        self.path = str(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS chats (chat_id TEXT PRIMARY KEY, turns TEXT NOT NULL,"
+                         " updated_at REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def load(self, chat_id: str) -> ChatSession | None:
+        row = self._connect().execute("SELECT turns FROM chats WHERE chat_id = ?", (chat_id,)).fetchone()
+        return ChatSession.from_json(chat_id, row[0]) if row else None
+
+    def save_many(self, sessions: list[ChatSession]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO chats (chat_id, turns, updated_at) VALUES (?, ?, ?)",
+                             [(session.chat_id, session.to_json(), now) for session in sessions])
+
+
+class ChatPool:
+    """LRU-bounded pool of chat sessions sharing one async client.
+
+    Args:
+        client: genai Client (or anything with `aio.models.generate_content`)
+        model: Model for every chat
+        max_sessions: Sessions kept in memory; the least recently used beyond this are evicted
+        idle_seconds: Sessions unused for this long are evicted
+        store: Where evicted sessions go and are restored from; without one they are dropped
+        config: GenerateContentConfig for every request (system instruction, temperature, ...)
+        limiter: Optional rate limiter (e.g. gemini_utils.rate_limit.limiter) to pace requests
+    """
+
+    def __init__(self, client, model: str = "gemini-2.5-flash", max_sessions: int = 10_000,
+                 idle_seconds: float = 900, store: ChatStore | None = None,
+                 config: types.GenerateContentConfig | None = None, limiter=None):
+        self.client = client
+        self.model = model
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.store = store
+        self.config = config
+        self.limiter = limiter
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+        self._saving = {}
+        self._evicting: asyncio.Task | None = None
+        self._counts = {"hits": 0, "restored": 0, "created": 0, "evicted": 0, "peak_sessions": 0}
+
+    async def send(self, chat_id: str, message: str) -> str:
+        """Sends `message` in chat `chat_id` (created or restored as needed) and returns the answer."""
+        session = await self._session(chat_id)
+        try:
+            async with session.lock:
+                contents = [turn.to_content() for turn in session.turns]
+                contents.append(Turn(USER, message).to_content())
+                if self.limiter is not None:
+                    await self.limiter.acquire_async(self.model)
+                response = await self.client.aio.models.generate_content(
+                    model=self.model, contents=contents, config=self.config,
+                )
+                answer = response.text or ""
+                # History only changes once the model has answered
+                session.turns.append(Turn(USER, message))
+                session.turns.append(Turn(MODEL, answer))
+                session.last_used = time.monotonic()
+        finally:
+            session.users -= 1
+            self._evict_soon()
+        return answer
+
+    def history(self, chat_id: str) -> list[Turn]:
+        session = self._sessions.get(chat_id)
+        return list(session.turns) if session else []
+
+    async def _session(self, chat_id: str) -> ChatSession:
+        session = self._sessions.get(chat_id)
+        if session is not None:
+            self._sessions.move_to_end(chat_id)
+            self._counts["hits"] += 1
+        else:
+            # Just evicted and still being written: take it back as is
+            session = self._saving.get(chat_id)
+            if session is None and self.store:
+                session = await asyncio.to_thread(self.store.load, chat_id)
+                # Another task may have restored or created it while we were reading
+                if chat_id in self._sessions:
+                    return await self._session(chat_id)
+            if session is None:
+                session = ChatSession(chat_id)
+                self._counts["created"] += 1
+            else:
+                self._counts["restored"] += 1
+            self._sessions[chat_id] = session
+            self._counts["peak_sessions"] = max(self._counts["peak_sessions"], len(self._sessions))
+        session.users += 1
+        session.last_used = time.monotonic()
+        return session
+
+    def _evict_soon(self) -> None:
+        """Starts a background eviction pass if the pool is over its bound or its oldest session is idle."""
+        if self._evicting is not None or not self._sessions:
+            return
+        oldest = next(iter(self._sessions.values()))
+        if len(self._sessions) > self.max_sessions or oldest.last_used <= time.monotonic() - self.idle_seconds:
+            self._evicting = asyncio.get_running_loop().create_task(self._evict())
+            self._evicting.add_done_callback(self._evicted)
+
+    def _evicted(self, task: asyncio.Task) -> None:
+        self._evicting = None
+        if not task.cancelled() and task.exception() is None:
+            # Sessions that were busy during the pass may be free by now
+            self._evict_soon()
+
+    def _victims(self) -> list[str]:
+        """Idle sessions and the least recently used ones beyond max_sessions, oldest first."""
+        cutoff = time.monotonic() - self.idle_seconds
+        excess = len(self._sessions) - self.max_sessions
+        victims = []
+        skipped = 0
+        # OrderedDict order is recency order, so both kinds of victims are at the front
+        for chat_id, session in self._sessions.items():
+            if len(victims) >= excess and session.last_used > cutoff:
+                break
+            if session.users:
+                # A turn is in flight or about to start; its answer would be lost
+                skipped += 1
+                if skipped > _MAX_SKIPPED:
+                    break
+                continue
+            victims.append(chat_id)
+        return victims
+
+    async def _evict(self) -> None:
+        """Evicts what `_victims` finds and writes it to the store."""
+        evicted = [self._sessions.pop(chat_id) for chat_id in self._victims()]
+        if not evicted:
+            return
+        self._counts["evicted"] += len(evicted)
+        if self.store:
+            for session in evicted:
+                self._saving[session.chat_id] = session
+            try:
+                await asyncio.to_thread(self.store.save_many, [s for s in evicted if s.turns])
+            finally:
+                for session in evicted:
+                    if self._saving.get(session.chat_id) is session:
+                        del self._saving[session.chat_id]
+
+    async def close(self) -> None:
+        """Writes every live session to the store."""
+        if self._evicting is not None:
+            await self._evicting
+        if self.store and self._sessions:
+            await asyncio.to_thread(self.store.save_many, [s for s in self._sessions.values() if s.turns])
+
+    def stats(self) -> dict:
+        return {"live_sessions": len(self._sessions), **self._counts}
+
+
+# --- Benchmark against the stub model --------------------------------------
+
+def _idle_bytes_per_session(chats: int, turns: int, compact: bool) -> float:
+    """Allocated bytes per idle session holding `turns` exchanges."""
+    import tracemalloc
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = []
+    for chat in range(chats):
+        if compact:
+            session = ChatSession(f"chat-{chat}")
+            for turn in range(turns):
+                session.turns.append(Turn("user", f"Question {turn} from chat {chat}?"))
+                session.turns.append(Turn("model", f"Answer {turn} for chat {chat}, a few words long."))
+        else:
+            # What a `client.chats` session keeps: a list of full Content models
+            session = []
+            for turn in range(turns):
+                session.append(types.Content(role="user", parts=[types.Part(text=f"Question {turn} from chat {chat}?")]))
+                session.append(types.Content(role="model", parts=[
+                    types.Part(text=f"Answer {turn} for chat {chat}, a few words long.")]))
+        sessions.append(session)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / chats
+
+
+async def _latency_run(chats: int, turns: int, max_sessions: int, store_path: str) -> tuple[list[float], dict]:
+    from .stub import StubClient
+
+    client = StubClient(latency=0.2, tail_probability=0.01, responder=lambda contents: "Stub answer, a few words long.")
+    pool = ChatPool(client, max_sessions=max_sessions, store=ChatStore(store_path))
+    latencies = []
+
+    async def user(chat: int):
+        for turn in range(turns):
+            start = time.perf_counter()
+            await pool.send(f"chat-{chat}", f"Question {turn} from chat {chat}?")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(user(chat) for chat in range(chats)))
+    await pool.close()
+    return sorted(latencies), {**pool.stats(), **client.stats()}
+
+
+def main() -> None:
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="ChatPool memory and latency against the stub model")
+    parser.add_argument("--chats", type=int, default=1000, help="concurrent chats")
+    parser.add_argument("--turns", type=int, default=5, help="exchanges per chat")
+    parser.add_argument("--max-sessions", type=int, default=300, help="pool size for the eviction run (below --chats)")
+    args = parser.parse_args()
+
+    for compact in (False, True):
+        label = "compact Turn history" if compact else "types.Content history"
+        size = _idle_bytes_per_session(args.chats, args.turns, compact)
+        print(f"{label:<22} {size / 1024:6.1f} KiB per idle session ({args.turns} exchanges)")
+
+    for label, max_sessions in (("no eviction", max(args.chats, args.max_sessions)),
+                                (f"max {args.max_sessions} sessions", args.max_sessions)):
+        with tempfile.TemporaryDirectory() as tmp:
+            latencies, stats = asyncio.run(_latency_run(args.chats, args.turns, max_sessions, f"{tmp}/chats.db"))
+        p50, p95 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+        print(f"{args.chats} concurrent chats x {args.turns} turns, {label}: p50 {p50 * 1000:.0f} ms, "
+              f"p95 {p95 * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms (stub latency 200 ms)")
+        print(f"  pool: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Consuming `Runner.run_async` event streams.
+
+Every ADK event loop in this repo did the same thing slightly differently:
+`hasattr` checks on `event.content.parts`, text concatenated with `+=`, or
+only `parts[0]` printed, silently dropping the rest of a multi-part answer.
+`TurnCollector` does it once, in a single pass per event that only reads the
+parts (no copies, no model_dump), and produces one `TurnRecord` per turn:
+
+    record = await consume(
+        runner.run_async(user_id=user_id, session_id=session_id, new_message=message),
+        on_text=lambda event, text: print(f"{event.author} > {text}"),
+    )
+    record.text                      # final response text, all parts
+    record.calls_to("place_order")   # FunctionCall objects
+    record.responses_from("place_order")
+    record.state_delta               # merged state changes of the turn
+
+Thought parts are skipped. Streaming (partial) events are passed to `on_text`
+but only complete events are recorded, so streamed text isn't counted twice.
+
+Micro-benchmark against the old loop (no API calls):
+    python -m gemini_utils.events --events 100000
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class TurnRecord:
+    """What one user turn produced."""
+
+    invocation_id: str = ""
+    text: str = ""
+    transcript: list[tuple[str, str]] = field(default_factory=list)  # (author, text) per complete event
+    tool_calls: list = field(default_factory=list)  # google.genai.types.FunctionCall
+    tool_responses: list = field(default_factory=list)  # google.genai.types.FunctionResponse
+    state_delta: dict = field(default_factory=dict)
+    events: int = 0
+
+    def calls_to(self, name: str) -> list:
+        return [call for call in self.tool_calls if call.name == name]
+
+    def responses_from(self, name: str) -> list[dict]:
+        return [response.response or {} for response in self.tool_responses if response.name == name]
+
+    def to_dict(self) -> dict:
+        return {
+            "invocation_id": self.invocation_id,
+            "text": self.text,
+            "transcript": [{"author": author, "text": text} for author, text in self.transcript],
+            "tool_calls": [{"name": call.name, "args": call.args} for call in self.tool_calls],
+            "tool_responses": [{"name": r.name, "response": r.response} for r in self.tool_responses],
+            "state_delta": self.state_delta,
+            "events": self.events,
+        }
+
+
+def event_text(event) -> str:
+    """All non-thought text of `event`, joined."""
+    content = event.content
+    if content is None or not content.parts:
+        return ""
+    return "".join([part.text for part in content.parts if part.text and not part.thought])
+
+
+class TurnCollector:
+    """Folds a stream of events into a TurnRecord; call `add` for each event, then `finish`.
+
+    Args:
+        on_text: Optional callback(event, text) for every event carrying text, partial or not
+    """
+
+    __slots__ = ("record", "on_text", "_final")
+
+    def __init__(self, on_text=None):
+        self.record = TurnRecord()
+        self.on_text = on_text
+        self._final = []
+
+    def add(self, event) -> None:
+        record = self.record
+        record.events += 1
+        if not record.invocation_id:
+            record.invocation_id = event.invocation_id
+        actions = event.actions
+
+        content = event.content
+        parts = content.parts if content is not None else None
+        if parts:
+            partial = event.partial
+            texts = None
+            has_calls = False
+            for part in parts:
+                text = part.text
+                if text:
+                    if not part.thought:
+                        if texts is None:
+                            texts = [text]
+                        else:
+                            texts.append(text)
+                elif part.function_call is not None:
+                    has_calls = True
+                    if not partial:
+                        record.tool_calls.append(part.function_call)
+                elif part.function_response is not None:
+                    has_calls = True
+                    if not partial:
+                        record.tool_responses.append(part.function_response)
+            if texts:
+                text = texts[0] if len(texts) == 1 else "".join(texts)
+                if self.on_text is not None:
+                    self.on_text(event, text)
+                if not partial:
+                    record.transcript.append((event.author, text))
+                    # Event.is_final_response() without walking the parts again
+                    if (actions.skip_summarization or event.long_running_tool_ids
+                            or (not has_calls and parts[-1].code_execution_result is None)):
+                        self._final.append(text)
+
+        if actions.state_delta:
+            record.state_delta.update(actions.state_delta)
+
+    def finish(self) -> TurnRecord:
+        self.record.text = "\n".join(self._final)
+        return self.record
+
+
+async def consume(stream, on_text=None) -> TurnRecord:
+    """Drains an async event stream (e.g. `runner.run_async(...)`) into a TurnRecord."""
+    collector = TurnCollector(on_text)
+    add = collector.add
+    async for event in stream:
+        add(event)
+    return collector.finish()
+
+
+def collect(events, on_text=None) -> TurnRecord:
+    """Same as `consume` for events already in a list."""
+    collector = TurnCollector(on_text)
+    for event in events:
+        collector.add(event)
+    return collector.finish()
+
+
+# --- Micro-benchmark -------------------------------------------------------
+
+def _sample_events(count: int) -> list:
+    from google.adk.events import Event, EventActions
+    from google.genai import types
+
+    events = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            parts = [types.Part(function_call=types.FunctionCall(name="lookup", args={"i": i}))]
+        elif kind == 1:
+            parts = [types.Part(function_response=types.FunctionResponse(name="lookup", response={"i": i}))]
+        else:
+            parts = [types.Part(text=f"chunk {i} "), types.Part(text="and a second part")]
+        actions = EventActions(state_delta={"step": i}) if kind == 3 else EventActions()
+        events.append(Event(invocation_id="bench", author="agent", content=types.Content(role="model", parts=parts),
+                            actions=actions))
+    return events
+
+
+def _legacy_loop(events) -> tuple[str, int]:
+    """The loop the agents used to have: hasattr checks and += concatenation."""
+    response_text = ""
+    calls = 0
+    for event in events:
+        if hasattr(event, "content") and hasattr(event.content, "parts"):
+            for part in event.content.parts:
+                if hasattr(part, "text") and part.text:
+                    response_text += part.text
+        calls += len(event.get_function_calls())
+        event.actions.state_delta
+    return response_text, calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-event cost of TurnCollector vs the old event loop")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    events = _sample_events(args.events)
+    for label, run in (
+        ("iteration only", lambda: [None for _ in events]),
+        ("legacy loop", lambda: _legacy_loop(events)),
+        ("TurnCollector", lambda: collect(events)),
+    ):
+        best = min(_timed(run) for _ in range(args.repeats))
+        print(f"{label:<14} {best / args.events * 1e9:7.0f} ns/event   ({best * 1000:.1f} ms for {args.events} events)")
+
+    record = collect(events)
+    print(f"TurnCollector: {len(record.transcript)} text events, {len(record.tool_calls)} calls, "
+          f"{len(record.tool_responses)} responses, state_delta {record.state_delta}")
+
+
+def _timed(run) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
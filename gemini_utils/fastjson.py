@@ -0,0 +1,73 @@
+"""
+Compact JSON encoding and fast decoding for model outputs and tool payloads.
+
+Tool results go back to the model as text, where indentation only costs
+tokens, and structured answers are parsed once per call. This module is the
+single JSON entry point for those paths:
+
+- `loads` / `dumps` use orjson when it is installed and the standard library
+  otherwise, with the same results for JSON-compatible values; non-string
+  dict keys (ints, floats, bools, None) are converted to strings by both.
+  One difference remains: orjson writes NaN and infinities as `null`, the
+  standard library as `NaN` / `Infinity`, which is not valid JSON
+- `dumps` is compact (no indentation, no spaces after separators), keeps
+  non-ASCII characters as they are and returns `str`
+- dataclasses (including slotted ones, see gemini_utils/structs.py) and
+  datetimes are encoded directly
+
+    payload = fastjson.dumps(LogSummary(count=2, logs=[...]))
+    data = fastjson.loads(response.text)
+
+`python -m gemini_utils.structs` compares both backends and the pretty-printed
+encoding on the multipack and log payloads.
+"""
+
+import dataclasses
+import datetime
+import json
+
+try:
+    import orjson
+except ImportError:  # the standard library is used instead
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# What both backends raise for malformed input
+JSONDecodeError = orjson.JSONDecodeError if orjson is not None else json.JSONDecodeError
+
+
+def _default(value):
+    """Encodes the types the standard library does not know; orjson handles them natively."""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def loads(data: str | bytes):
+    """Parses JSON text (str or UTF-8 bytes)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value, default=None) -> str:
+    """`value` as compact JSON text.
+
+    Args:
+        value: Any JSON-compatible value, dataclass or datetime
+        default: Called for other objects; returns something encodable or raises TypeError
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+    if default is None:
+        fallback = _default
+    else:
+        def fallback(obj):
+            try:
+                return _default(obj)
+            except TypeError:
+                return default(obj)
+    return json.dumps(value, default=fallback, ensure_ascii=False, separators=(",", ":"))
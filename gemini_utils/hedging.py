@@ -0,0 +1,256 @@
+"""
+Request hedging for read-only model calls.
+
+Retries on status codes do nothing for a request that is merely slow. Hedging
+does: if a response hasn't arrived after the recent p95 latency and 1.5x the
+median (both configurable), the same request is sent a second time and
+whichever finishes first wins. The other one is cancelled. A budget caps hedges
+at a percentage of requests so a generally slow backend can't double the load.
+The median bound keeps ordinary jitter from using up the budget: on its own,
+p95 with a 5% budget hedges about 5% of requests, so the slow ones arriving
+after the budget is spent get no hedge.
+
+Only use it for idempotent calls (plain generation, extraction, research) -
+never for prompts whose tool calls have side effects.
+
+- scripts:    client = hedge_client(client, HedgePolicy())   (after track_client, see hedge_client for
+              what the usage totals include)
+- ADK agents: model=HedgedGemini(model="gemini-2.5-flash-lite", ...)   (see gemini_utils.adk_models)
+
+Try it against the stub model (no API calls):
+    python -m gemini_utils.hedging --requests 500
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import time
+from collections import deque
+
+
+class HedgePolicy:
+    """When to send a duplicate request, and how many duplicates are allowed.
+
+    Args:
+        percentile: Latency percentile (of recent requests) after which to hedge
+        median_multiple: Never hedge before this multiple of the recent median latency
+        budget: Maximum share of requests that may be hedged (0.05 = 5%)
+        initial_delay: Hedge delay in seconds until `min_samples` latencies are known
+        min_delay: Lower bound for the hedge delay in seconds
+        window: Number of recent latencies the percentile is computed over
+        min_samples: Latencies needed before the percentile is trusted
+    """
+
+    def __init__(self, percentile: float = 95, budget: float = 0.05, initial_delay: float = 5.0,
+                 min_delay: float = 0.05, window: int = 200, min_samples: int = 20,
+                 median_multiple: float = 1.5):
+        self.percentile = percentile
+        self.median_multiple = median_multiple
+        self.budget = budget
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """Seconds to wait for the first attempt before hedging."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index], self.median_multiple * ordered[len(ordered) // 2])
+
+    def start_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def try_hedge(self) -> bool:
+        """Reserves a hedge if the budget allows one."""
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def record(self, latency_seconds: float, hedge_won: bool = False) -> None:
+        with self._lock:
+            self._latencies.append(latency_seconds)
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def record_cancelled(self, attempts: int) -> None:
+        with self._lock:
+            self.cancelled += attempts
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "cancelled": self.cancelled,
+            }
+
+
+async def hedged(call, policy: HedgePolicy):
+    """Awaits `call()`, starting a second `call()` if the first is slower than the policy's delay.
+
+    Args:
+        call: Zero-argument function returning a new awaitable for each attempt
+        policy: The hedge policy (shared by all calls to the same model)
+
+    Returns:
+        The result of whichever attempt finishes first; the other attempt is cancelled.
+        If the first finisher failed, the remaining attempt is awaited instead.
+    """
+    policy.start_request()
+    start = time.perf_counter()
+    attempts = [asyncio.ensure_future(call())]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=policy.delay())
+        if done or not policy.try_hedge():
+            result = await attempts[0]
+            policy.record(time.perf_counter() - start)
+            return result
+
+        attempts.append(asyncio.ensure_future(call()))
+        pending = set(attempts)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next(iter(done))
+            if winner.exception() is None or not pending:
+                policy.record(time.perf_counter() - start, hedge_won=winner is attempts[1])
+                return winner.result()
+    finally:
+        # The loser (or both attempts, if the caller was cancelled)
+        unfinished = [task for task in attempts if not task.done()]
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            policy.record_cancelled(len(unfinished))
+
+
+def hedged_sync(call, policy: HedgePolicy, executor: concurrent.futures.Executor):
+    """Blocking variant of `hedged` for synchronous clients.
+
+    A running thread can't be interrupted, so the losing attempt is abandoned:
+    its result is discarded when it completes.
+    """
+    policy.start_request()
+    start = time.perf_counter()
+    primary = executor.submit(call)
+    done, _ = concurrent.futures.wait([primary], timeout=policy.delay())
+    if done or not policy.try_hedge():
+        result = primary.result()
+        policy.record(time.perf_counter() - start)
+        return result
+
+    hedge = executor.submit(call)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        winner = next(iter(done))
+        if winner.exception() is None or not pending:
+            for future in pending:
+                future.cancel()
+            policy.record(time.perf_counter() - start, hedge_won=winner is hedge)
+            return winner.result()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """The thread pool all hedged sync clients share (created on first use, joined at exit)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+        return _executor
+
+
+def hedge_client(client, policy: HedgePolicy | None = None,
+                 executor: concurrent.futures.Executor | None = None):
+    """Hedges generate_content on `client.models` and `client.aio.models`. Returns the client.
+
+    Apply after `track_client` to have the attempts that complete counted in the
+    usage totals, including the abandoned thread of a sync hedge. A cancelled
+    async attempt never returns its usage_metadata, so it is missing from the
+    totals although its prompt was billed; `policy.stats()["cancelled"]` counts them.
+
+    Args:
+        client: genai Client (or anything with the same generate_content methods)
+        policy: Hedge policy; a new default policy if omitted
+        executor: Threads running sync attempts; `shared_executor()` if omitted
+    """
+    policy = policy or HedgePolicy()
+    executor = executor or shared_executor()
+    sync_generate = client.models.generate_content
+    async_generate = client.aio.models.generate_content
+
+    @functools.wraps(sync_generate)
+    def generate_content(**kwargs):
+        return hedged_sync(lambda: sync_generate(**kwargs), policy, executor)
+
+    @functools.wraps(async_generate)
+    async def generate_content_async(**kwargs):
+        return await hedged(lambda: async_generate(**kwargs), policy)
+
+    client.models.generate_content = generate_content
+    client.aio.models.generate_content = generate_content_async
+    client.hedge_policy = policy
+    return client
+
+
+def _percentiles(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+    return {p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in (50, 95, 99)}
+
+
+async def _benchmark(requests: int, concurrency: int, budget: float, hedge: bool) -> tuple[dict, dict]:
+    from .stub import StubClient
+
+    client = StubClient()
+    policy = HedgePolicy(budget=budget)
+    if hedge:
+        client = hedge_client(client, policy)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await client.aio.models.generate_content(model="stub", contents=f"question {i}")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return _percentiles(latencies), {**policy.stats(), **client.stats()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare tail latency with and without hedging on the stub model")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=0.05)
+    args = parser.parse_args()
+
+    for hedge in (False, True):
+        latency, stats = asyncio.run(_benchmark(args.requests, args.concurrency, args.budget, hedge))
+        label = "hedged" if hedge else "plain"
+        print(f"{label:<7} p50 {latency[50] * 1000:7.0f} ms   p95 {latency[95] * 1000:7.0f} ms   "
+              f"p99 {latency[99] * 1000:7.0f} ms   calls {stats['calls']:>5}   "
+              f"hedge rate {stats['hedge_rate']:.1%}   cancelled {stats['cancelled']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Lazy module attributes for agent modules.
+
+`adk web`/`adk run` and the agent host import every agent package to find its
+`root_agent`. Building an agent means importing ADK and the genai client,
+creating models and often starting resources (MCP toolbox sessions, rate feeds,
+session databases). Agent modules therefore only define builder functions and
+expose the results through a module `__getattr__`:
+
+    @functools.cache
+    def build_root_agent():
+        from google.adk.agents import LlmAgent
+        ...
+
+    __getattr__ = lazy_module_attributes(__name__, root_agent=build_root_agent)
+
+Importing the module is then nearly free; the agent is built the first time
+`module.root_agent` is accessed. Code inside the module itself must call the
+(cached) builder, since module `__getattr__` does not apply to global lookups.
+"""
+
+import sys
+
+
+def lazy_module_attributes(module_name: str, **builders):
+    """Returns a module `__getattr__` that builds each named attribute on first access.
+
+    Args:
+        module_name: `__name__` of the module the attributes belong to
+        **builders: Attribute name -> zero-argument function creating the value
+
+    Returns:
+        The function to assign to the module's `__getattr__`
+    """
+
+    def __getattr__(name):
+        try:
+            builder = builders[name]
+        except KeyError:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}") from None
+        value = builder()
+        # Later lookups find the value directly and skip __getattr__
+        setattr(sys.modules[module_name], name, value)
+        return value
+
+    return __getattr__
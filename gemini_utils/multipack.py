@@ -0,0 +1,366 @@
+"""
+Validation and repair of multipack extraction results (structured-output.py).
+
+The extraction prompt states invariants the model does not always keep:
+
+- valid=false comes alone, without quantity / count_of_pieces_per_package /
+  count_of_packages
+- valid=true has all three, as positive integers
+- quantity == count_of_packages x count_of_pieces_per_package
+
+Sending the whole request again for every violation is the expensive fix.
+`MultipackValidator` checks a result locally and, in this order:
+
+1. repairs what needs no model: drops the extra fields of a valid=false answer,
+   unwraps bare or string numbers, clamps confidences into [0, 1], derives a
+   missing field from the other two, and recomputes the one field of an
+   inconsistent triple that is clearly the least confident
+2. re-asks the model for a single field it cannot settle locally, with a
+   minimal prompt (the other two values as givens, a one-field schema)
+3. only then reports a reason ("invalid_json", "schema", "inconsistent",
+   "low_confidence") for a full retry
+
+    validator = MultipackValidator(min_confidence=0.8)
+    checked = validator.check(response.text, reask=lambda field, question: ...)
+    checked.result, checked.reason, checked.repairs
+    validator.stats()   # repair, re-request and full-retry rates
+
+How many full retries the repairs save on a batch of typical model mistakes:
+    python -m gemini_utils.multipack --samples 10000
+"""
+
+import argparse
+import json
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+from gemini_utils import fastjson
+
+MULTIPACK_FIELDS = ("quantity", "count_of_pieces_per_package", "count_of_packages")
+
+# Schema of a single re-asked field
+FIELD_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "value": {"type": "integer"},
+        "confidence_rate": {"type": "number", "description": "Confidence in [0,1]."},
+        "reasoning": {"type": "string", "description": "Brief explanation of how the value was determined."},
+    },
+    "required": ["value"],
+}
+
+_QUESTIONS = {
+    "quantity": "the total number of items in the retail unit",
+    "count_of_pieces_per_package": "the number of items in each package (1 if not applicable)",
+    "count_of_packages": "the number of packages in the retail unit (1 if not explicitly a multipack)",
+}
+
+
+@dataclass(slots=True)
+class CheckedResult:
+    """A result after validation: usable when `reason` is None."""
+
+    result: dict | None
+    reason: str | None = None  # Why a full retry is still needed
+    repairs: list[str] = field(default_factory=list)  # Local fixes, e.g. "derived:quantity"
+    reasked: list[str] = field(default_factory=list)  # Fields re-requested from the model
+    response: object = None  # The model response the result came from (for usage)
+
+
+def _as_int(value):
+    """Positive integer from an int, an integral float or a digit string; None otherwise."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str) and value.strip().isdigit():
+        value = int(value.strip())
+    return value if isinstance(value, int) and value > 0 else None
+
+
+def _derive(name: str, values: dict) -> int | None:
+    """`name` computed exactly from the other two values, or None."""
+    quantity, pieces, packages = (values.get(key) for key in MULTIPACK_FIELDS)
+    if name == "quantity":
+        return pieces * packages if pieces and packages else None
+    other = packages if name == "count_of_pieces_per_package" else pieces
+    if quantity and other and quantity % other == 0:
+        return quantity // other
+    return None
+
+
+class MultipackValidator:
+    """Checks multipack results against the extraction invariants and repairs them.
+
+    Args:
+        min_confidence: Results with a field below this confidence are not accepted as they are
+        max_reasks: Fields that may be re-requested per result
+    """
+
+    def __init__(self, min_confidence: float = 0.8, max_reasks: int = 1):
+        self.min_confidence = min_confidence
+        self.max_reasks = max_reasks
+        self._counts = Counter()
+        self._reasons = Counter()
+        self._repairs = Counter()
+        self._lock = threading.Lock()
+
+    def check(self, data, reask=None, response=None) -> CheckedResult:
+        """Validates `data` (JSON text or a parsed dict), repairing it where possible.
+
+        Args:
+            data: The model's answer
+            reask: Optional `reask(field, question) -> dict | None` asking the model for one field;
+                the dict is that field's {"value", "confidence_rate", "reasoning"}
+            response: Model response to keep on the CheckedResult
+        """
+        checked = CheckedResult(result=None, response=response)
+        checked.reason = self._check(data, reask, checked)
+        with self._lock:
+            self._counts["checked"] += 1
+            if checked.repairs:
+                self._counts["repaired"] += 1
+                self._repairs.update(repair.split(":")[0] for repair in checked.repairs)
+            if checked.reasked:
+                self._counts["reasked"] += 1
+            if checked.reason:
+                self._counts["failed"] += 1
+                self._reasons[checked.reason] += 1
+        return checked
+
+    def _check(self, data, reask, checked: CheckedResult) -> str | None:
+        if isinstance(data, (str, bytes)):
+            try:
+                data = fastjson.loads(data)
+            except ValueError:
+                return "invalid_json"
+        if not isinstance(data, dict):
+            return "schema"
+        result = checked.result = dict(data)
+
+        valid = result.get("valid")
+        if isinstance(valid, str) and valid.lower() in ("true", "false"):
+            result["valid"] = valid = valid.lower() == "true"
+            checked.repairs.append("coerced:valid")
+        if not isinstance(valid, bool):
+            return "schema"
+        if not valid:
+            extra = [key for key in result if key != "valid"]
+            if extra:
+                checked.result = {"valid": False}
+                checked.repairs.append("dropped:" + ",".join(extra))
+            return None
+
+        values, confidences = self._normalize(result, checked)
+        missing = [name for name in MULTIPACK_FIELDS if values[name] is None]
+        if len(missing) > 1:
+            return "schema"
+        if missing:
+            name = missing[0]
+            derived = _derive(name, values)
+            if derived is not None:
+                self._set_derived(result, values, confidences, name, derived, checked, "derived")
+            elif not self._reask(name, values, result, confidences, reask, checked):
+                return "schema"
+
+        if values["quantity"] != values["count_of_packages"] * values["count_of_pieces_per_package"]:
+            suspect = self._suspect(values, confidences)
+            if suspect is not None:
+                self._set_derived(result, values, confidences, suspect, _derive(suspect, values), checked, "recomputed")
+            else:
+                # No field is clearly the odd one out: ask for the least confident one (the total on a tie)
+                name = min(MULTIPACK_FIELDS, key=lambda key: (confidences[key], key != "quantity"))
+                if not self._reask(name, values, result, confidences, reask, checked):
+                    return "inconsistent"
+                if values["quantity"] != values["count_of_packages"] * values["count_of_pieces_per_package"]:
+                    return "inconsistent"
+
+        # A consistent triple does not settle a value the model itself doubts (1 x 1 = 1 holds
+        # whether or not there is really one package), so low confidence always means a retry
+        if any(confidences[name] < self.min_confidence for name in MULTIPACK_FIELDS):
+            return "low_confidence"
+        return None
+
+    def _normalize(self, result: dict, checked: CheckedResult) -> tuple[dict, dict]:
+        """Integer value and confidence per field (value None when missing or unusable)."""
+        values = {}
+        confidences = {}
+        for name in MULTIPACK_FIELDS:
+            entry = result.get(name)
+            if entry is not None and not isinstance(entry, dict):
+                # A bare number instead of {"value": ...}
+                entry = result[name] = {"value": entry}
+                checked.repairs.append(f"wrapped:{name}")
+            raw = entry.get("value") if entry else None
+            value = _as_int(raw)
+            if value is not None and value is not raw:
+                result[name] = entry = {**entry, "value": value}
+                checked.repairs.append(f"coerced:{name}")
+            values[name] = value
+            confidences[name] = self._confidence(name, entry, result, checked)
+        return values, confidences
+
+    @staticmethod
+    def _confidence(name, entry, result, checked) -> float:
+        """Confidence of `result[name]` (= `entry`), clamped into [0, 1] in the result."""
+        rate = entry.get("confidence_rate") if entry else None
+        if not isinstance(rate, (int, float)) or isinstance(rate, bool):
+            # Fields without a usable stated confidence count as fully confident
+            return 1.0
+        if not 0 <= rate <= 1:
+            rate = min(1.0, max(0.0, float(rate)))
+            result[name] = {**entry, "confidence_rate": rate}
+            checked.repairs.append(f"clamped:{name}")
+        return rate
+
+    def _suspect(self, values: dict, confidences: dict) -> str | None:
+        """The field of an inconsistent triple to recompute: low confidence, strictly the lowest, derivable."""
+        ranked = sorted(MULTIPACK_FIELDS, key=confidences.__getitem__)
+        name = ranked[0]
+        if (confidences[name] < min(self.min_confidence, confidences[ranked[1]])
+                and _derive(name, values) is not None):
+            return name
+        return None
+
+    @staticmethod
+    def _set_derived(result, values, confidences, name, value, checked, how) -> None:
+        others = [key for key in MULTIPACK_FIELDS if key != name]
+        confidence = min(confidences[key] for key in others)
+        if name == "quantity":
+            reasoning = f"{how.capitalize()} as count_of_packages x count_of_pieces_per_package"
+        else:
+            divisor = next(key for key in others if key != "quantity")
+            reasoning = f"{how.capitalize()} as quantity / {divisor}"
+        result[name] = {"value": value, "confidence_rate": confidence, "reasoning": reasoning}
+        values[name] = value
+        confidences[name] = confidence
+        checked.repairs.append(f"{how}:{name}")
+
+    def _reask(self, name, values, result, confidences, reask, checked) -> bool:
+        """Asks the model for field `name` alone; True if it returned a usable value."""
+        if reask is None or len(checked.reasked) >= self.max_reasks:
+            return False
+        givens = ", ".join(f"{key}={values[key]}" for key in MULTIPACK_FIELDS if key != name and values[key])
+        question = f"Determine only {name}: {_QUESTIONS[name]}."
+        if givens:
+            question += f" Already established: {givens}."
+        if values[name] is not None:
+            question += f" The previous answer {name}={values[name]} was inconsistent with these."
+        checked.reasked.append(name)
+        answer = reask(name, question)
+        value = _as_int(answer.get("value")) if isinstance(answer, dict) else None
+        if value is None:
+            return False
+        entry = result[name] = {"value": value, **{key: answer[key] for key in ("confidence_rate", "reasoning")
+                                                   if key in answer}}
+        values[name] = value
+        confidences[name] = self._confidence(name, entry, result, checked)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            checked = self._counts["checked"]
+            rate = (lambda count: count / checked if checked else 0.0)
+            return {
+                "checked": checked,
+                "repaired": self._counts["repaired"],
+                "reasked": self._counts["reasked"],
+                "failed": self._counts["failed"],
+                "repair_rate": rate(self._counts["repaired"]),
+                "rerequest_rate": rate(self._counts["reasked"]),
+                "full_retry_rate": rate(self._counts["failed"]),
+                "repairs": dict(self._repairs),
+                "failure_reasons": dict(self._reasons),
+            }
+
+
+# --- Simulation: full retries with and without repair -----------------------
+
+def _legacy_reason(result: dict) -> str | None:
+    """The check structured-output.py used before: any violation meant a full retry."""
+    if not isinstance(result.get("valid"), bool):
+        return "schema"
+    if not result["valid"]:
+        return None
+    if any(not isinstance(result.get(key), dict) or not isinstance(result[key].get("value"), int)
+           for key in MULTIPACK_FIELDS):
+        return "schema"
+    if result["quantity"]["value"] != result["count_of_packages"]["value"] * result["count_of_pieces_per_package"]["value"]:
+        return "inconsistent"
+    if any(result[key].get("confidence_rate", 1) < 0.8 for key in MULTIPACK_FIELDS):
+        return "low_confidence"
+    return None
+
+
+def _sample(rng) -> tuple[dict, dict, str]:
+    """A model answer with one of the usual mistakes (or none), the truth it came from and the mistake."""
+    packages, pieces = rng.choice([(1, 1), (1, 6), (3, 4), (6, 1), (2, 24), (4, 12)])
+    truth = {"quantity": packages * pieces, "count_of_pieces_per_package": pieces, "count_of_packages": packages}
+    answer = {"valid": True}
+    for name, value in truth.items():
+        answer[name] = {"value": value, "confidence_rate": round(rng.uniform(0.85, 1.0), 2), "reasoning": "..."}
+    mistake = rng.choices(
+        ["none", "invalid_extra", "missing", "string_value", "wrong_total", "wrong_part", "low_conf",
+         "unsure_consistent", "garbage"],
+        weights=[56, 6, 8, 4, 8, 6, 6, 4, 2],
+    )[0]
+    name = rng.choice(MULTIPACK_FIELDS)
+    if mistake == "invalid_extra":
+        answer["valid"] = False
+        truth = {}
+    elif mistake == "missing":
+        del answer[name]
+    elif mistake == "string_value":
+        answer[name]["value"] = str(answer[name]["value"])
+    elif mistake == "wrong_total":
+        answer["quantity"] = {"value": truth["quantity"] + rng.randint(1, 5), "confidence_rate": 0.6}
+    elif mistake == "wrong_part":
+        # Confident but wrong: nothing local can tell which field it is
+        answer["count_of_packages"]["value"] += 1
+    elif mistake == "low_conf":
+        answer[name]["confidence_rate"] = 0.5
+    elif mistake == "unsure_consistent":
+        # Wrong, and the model says it is unsure, but the total matches the wrong count:
+        # the invariant holds and only the confidence gives it away
+        answer["count_of_packages"] = {"value": packages + 1, "confidence_rate": 0.5, "reasoning": "..."}
+        answer["quantity"]["value"] = (packages + 1) * pieces
+    elif mistake == "garbage":
+        answer = {"result": "n/a"}
+    return answer, truth, mistake
+
+
+def main() -> None:
+    import random
+
+    parser = argparse.ArgumentParser(description="Full retries needed with and without local repair")
+    parser.add_argument("--samples", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    validator = MultipackValidator()
+    legacy_retries = wrong = mistakes = 0
+    for _ in range(args.samples):
+        answer, truth, mistake = _sample(rng)
+        mistakes += mistake != "none"
+        legacy_retries += _legacy_reason(json.loads(json.dumps(answer))) is not None
+        # The re-ask stands in for the model answering the one field correctly
+        checked = validator.check(json.dumps(answer), reask=lambda name, question: {
+            "value": truth[name], "confidence_rate": 0.9})
+        if checked.reason is None and truth and any(
+                checked.result[name]["value"] != value for name, value in truth.items()):
+            wrong += 1
+
+    stats = validator.stats()
+    print(f"{args.samples} answers, {mistakes} ({mistakes / args.samples:.0%}) with a typical mistake")
+    print(f"full retries before: {legacy_retries} ({legacy_retries / args.samples:.1%})")
+    print(f"full retries now:    {stats['failed']} ({stats['full_retry_rate']:.1%}), "
+          f"single-field re-asks {stats['reasked']} ({stats['rerequest_rate']:.1%}), "
+          f"repaired locally {stats['repaired']} ({stats['repair_rate']:.1%})")
+    print(f"accepted with a wrong value: {wrong}")
+    print(f"repairs: {stats['repairs']}, failures: {stats['failure_reasons']}")
+
+
+if __name__ == "__main__":
+    main()
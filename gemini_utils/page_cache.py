@@ -0,0 +1,284 @@
+"""
+Local page pre-fetch and extraction cache for URL grounding.
+
+Instead of letting the model fetch and read a full product page on every
+request, pages are fetched locally through a pooled HTTP session and reduced to
+a compact extract: the main text, JSON-LD product/offer data and price
+microdata. Extracts are cached on disk together with the page's ETag and
+Last-Modified headers, so a revisit is a conditional request that usually comes
+back as "304 Not Modified" and is answered straight from the cache.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Elements whose text is page chrome rather than content
+_SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "nav", "footer", "header", "aside", "form", "iframe"}
+_VOID_TAGS = {"meta", "link", "img", "br", "hr", "input", "source", "wbr", "area", "base", "col", "embed", "track"}
+
+# Microdata / OpenGraph properties worth keeping for price questions
+_MICRODATA_PROPS = {
+    "name", "price", "pricecurrency", "availability", "sku", "gtin", "gtin8", "gtin12",
+    "gtin13", "gtin14", "brand", "lowprice", "highprice",
+}
+_META_PROPS = {
+    "og:title": "name",
+    "product:price:amount": "price",
+    "og:price:amount": "price",
+    "product:price:currency": "priceCurrency",
+    "og:price:currency": "priceCurrency",
+    "product:availability": "availability",
+}
+
+# JSON-LD fields kept for Product and Offer objects
+_JSON_LD_FIELDS = {
+    "@type", "name", "sku", "gtin", "gtin8", "gtin12", "gtin13", "gtin14", "mpn", "brand",
+    "offers", "price", "priceCurrency", "availability", "lowPrice", "highPrice", "url",
+}
+
+
+@dataclass
+class PageExtract:
+    """The compact view of a page that is sent to the model instead of the page itself."""
+
+    url: str
+    title: str = ""
+    text: str = ""
+    json_ld: list = field(default_factory=list)
+    microdata: dict = field(default_factory=dict)
+
+    def to_prompt(self) -> str:
+        """Renders the extract as a short context block for the prompt."""
+        lines = [f"Page: {self.url}"]
+        if self.title:
+            lines.append(f"Title: {self.title}")
+        if self.microdata:
+            lines.append("Price microdata: " + json.dumps(self.microdata, ensure_ascii=False, separators=(",", ":")))
+        if self.json_ld:
+            lines.append("JSON-LD: " + json.dumps(self.json_ld, ensure_ascii=False, separators=(",", ":")))
+        if self.text:
+            lines.append(f"Main text:\n{self.text}")
+        return "\n".join(lines)
+
+
+class _PageParser(HTMLParser):
+    """Single-pass HTML scan collecting visible text, JSON-LD blocks and microdata."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.microdata = {}
+        self.json_ld_blocks = []
+        self._body_text = []
+        self._main_text = []
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._in_title = False
+        self._json_ld = None
+        self._itemprop_stack = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "script" and (attrs.get("type") or "").lower() == "application/ld+json":
+            self._json_ld = []
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in ("main", "article"):
+            self._main_depth += 1
+        elif tag == "title":
+            self._in_title = True
+
+        if tag == "meta":
+            prop = (attrs.get("property") or attrs.get("name") or "").lower()
+            if prop in _META_PROPS and attrs.get("content"):
+                self.microdata.setdefault(_META_PROPS[prop], attrs["content"].strip())
+
+        itemprop = (attrs.get("itemprop") or "").lower()
+        if itemprop in _MICRODATA_PROPS:
+            value = attrs.get("content") or attrs.get("href")
+            if value:
+                self.microdata.setdefault(attrs["itemprop"], value.strip())
+            elif tag not in _VOID_TAGS:
+                self._itemprop_stack.append((tag, attrs["itemprop"], []))
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._json_ld is not None:
+            self.json_ld_blocks.append("".join(self._json_ld))
+            self._json_ld = None
+        if tag in _SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in ("main", "article") and self._main_depth:
+            self._main_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        if self._itemprop_stack and self._itemprop_stack[-1][0] == tag:
+            _, prop, chunks = self._itemprop_stack.pop()
+            value = " ".join("".join(chunks).split())
+            if value:
+                self.microdata.setdefault(prop, value)
+
+    def handle_data(self, data):
+        if self._json_ld is not None:
+            self._json_ld.append(data)
+            return
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth:
+            return
+        for _, _, chunks in self._itemprop_stack:
+            chunks.append(data)
+        self._body_text.append(data)
+        if self._main_depth:
+            self._main_text.append(data)
+
+    def main_text(self) -> str:
+        # Prefer <main>/<article> when the page marks its content, else the whole body
+        chunks = self._main_text if "".join(self._main_text).strip() else self._body_text
+        return re.sub(r"\s+", " ", " ".join(chunks)).strip()
+
+
+def _product_nodes(node):
+    """Yields Product/Offer objects from a JSON-LD document, including @graph entries."""
+    if isinstance(node, list):
+        for item in node:
+            yield from _product_nodes(item)
+    elif isinstance(node, dict):
+        types_ = node.get("@type")
+        types_ = types_ if isinstance(types_, list) else [types_]
+        if any(t in ("Product", "Offer", "AggregateOffer", "ProductGroup") for t in types_):
+            yield node
+        elif "@graph" in node:
+            yield from _product_nodes(node["@graph"])
+
+
+def _compact(node):
+    """Drops JSON-LD fields that don't help answer price/product questions."""
+    if isinstance(node, list):
+        return [_compact(item) for item in node]
+    if isinstance(node, dict):
+        return {k: _compact(v) for k, v in node.items() if k in _JSON_LD_FIELDS}
+    return node
+
+
+def extract_page(url: str, html: str, max_text_chars: int = 4000) -> PageExtract:
+    """Reduces an HTML page to its main text, product JSON-LD and price microdata."""
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+
+    json_ld = []
+    for block in parser.json_ld_blocks:
+        try:
+            document = json.loads(block)
+        except ValueError:
+            continue
+        json_ld.extend(_compact(node) for node in _product_nodes(document))
+
+    return PageExtract(
+        url=url,
+        title=" ".join(parser.title.split()),
+        text=parser.main_text()[:max_text_chars],
+        json_ld=json_ld,
+        microdata=parser.microdata,
+    )
+
+
+class PageFetcher:
+    """Fetches pages through one pooled session and caches their extracts on disk.
+
+    Args:
+        cache_dir: Directory for cached extracts (one small JSON file per URL)
+        timeout: Request timeout in seconds
+        pool_size: Connections kept open per host
+        max_text_chars: Upper bound for the main text kept per page
+    """
+
+    def __init__(self, cache_dir: str | Path = ".page_cache", timeout: float = 15, pool_size: int = 32, max_text_chars: int = 4000):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.max_text_chars = max_text_chars
+        self.stats = {"fetched": 0, "not_modified": 0, "errors": 0, "corrupt": 0}
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers["User-Agent"] = "Mozilla/5.0 (compatible; price-grounding/1.0)"
+
+    def _cache_path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _read_cache(self, path: Path) -> dict | None:
+        """The cached record, or None when it is missing or unreadable (then it is refetched)."""
+        try:
+            cached = json.loads(path.read_text(encoding="utf-8"))
+            PageExtract(**cached["extract"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, KeyError):
+            # Truncated or from an older layout: a miss, overwritten by the next fetch
+            self.stats["corrupt"] += 1
+            return None
+        return cached
+
+    def _write_cache(self, path: Path, record: dict) -> None:
+        """Writes `record` atomically, so concurrent jobs and crashes never leave half a file."""
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{path.stem[:16]}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def fetch(self, url: str) -> PageExtract:
+        """Returns the page extract, revalidating a cached copy with ETag/Last-Modified."""
+        path = self._cache_path(url)
+        cached = self._read_cache(path)
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            response = self._session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached:
+                self.stats["not_modified"] += 1
+                return PageExtract(**cached["extract"])
+            response.raise_for_status()
+        except requests.RequestException:
+            self.stats["errors"] += 1
+            if cached:
+                # Serve the stale copy rather than failing the job
+                return PageExtract(**cached["extract"])
+            raise
+
+        self.stats["fetched"] += 1
+        if "charset=" not in response.headers.get("Content-Type", "").lower():
+            # requests falls back to ISO-8859-1 for text/html; trust the page's own declaration
+            match = re.search(rb"""<meta[^>]+charset=["']?([\w-]+)""", response.content[:4096], re.I)
+            response.encoding = match.group(1).decode() if match else "utf-8"
+        extract = extract_page(url, response.text, self.max_text_chars)
+        self._write_cache(path, {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "extract": asdict(extract),
+        })
+        return extract
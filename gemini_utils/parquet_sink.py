@@ -0,0 +1,289 @@
+"""
+Columnar export of multipack extraction results to partitioned Parquet.
+
+structured-output.py prints every answer as indented JSON, which analytics
+jobs can only get back by parsing console or JSONL output. `ParquetSink`
+collects the results as Arrow columns and writes them as a Hive-partitioned
+Parquet dataset that pyarrow, DuckDB, Spark or BigQuery scan directly:
+
+    <root>/date=2026-10-19/part-3f2a9c1e-00000.parquet
+
+- one flat row per product: mid, gtin, valid, the three values, their
+  confidences and reasoning, plus the model, the failure reason (for answers
+  that never passed validation) and the extraction time
+- rows are buffered as plain column lists and written as one Arrow record
+  batch (one Parquet row group) per `batch_rows`, so memory stays bounded by
+  the batch size however many results go through
+- files are rotated after `max_file_rows`, at most `max_open_files` writers
+  stay open, and a file only gets its final name once its footer is written,
+  so readers never see a half-written file
+
+    with ParquetSink("exports/multipack") as sink:
+        sink.write(product["MID"], product["GTIN"], result, model=model)
+
+    pyarrow.dataset.dataset("exports/multipack", partitioning="hive")
+
+Write and scan throughput against a JSONL file with the same results:
+    python -m gemini_utils.parquet_sink --rows 1000000
+"""
+
+import argparse
+import datetime
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SCHEMA = pa.schema([
+    ("mid", pa.string()),
+    ("gtin", pa.string()),
+    ("valid", pa.bool_()),
+    ("quantity", pa.int32()),
+    ("pieces_per_package", pa.int32()),
+    ("packages", pa.int32()),
+    ("quantity_confidence", pa.float64()),
+    ("pieces_confidence", pa.float64()),
+    ("packages_confidence", pa.float64()),
+    ("quantity_reasoning", pa.string()),
+    ("pieces_reasoning", pa.string()),
+    ("packages_reasoning", pa.string()),
+    ("model", pa.string()),
+    ("failure_reason", pa.string()),
+    ("extracted_at", pa.timestamp("ms", tz="UTC")),
+])
+
+# Result field -> value column, prefix of its confidence and reasoning columns
+_FIELDS = (
+    ("quantity", "quantity", "quantity"),
+    ("count_of_pieces_per_package", "pieces_per_package", "pieces"),
+    ("count_of_packages", "packages", "packages"),
+)
+
+
+def _field_columns(result, name: str) -> tuple:
+    """(value, confidence, reasoning) of one field of a MultipackResult or a result dict."""
+    if isinstance(result, dict):
+        data = result.get(name)
+        if not isinstance(data, dict):
+            return None, None, None
+        value, confidence, reasoning = data.get("value"), data.get("confidence_rate"), data.get("reasoning")
+    else:
+        data = getattr(result, name)
+        if data is None:
+            return None, None, None
+        value, confidence, reasoning = data.value, data.confidence_rate, data.reasoning
+    # A result that failed validation may hold anything; keep only what fits the column
+    if not isinstance(value, int) or isinstance(value, bool) or not -2**31 <= value < 2**31:
+        value = None
+    if not isinstance(confidence, (int, float)) or isinstance(confidence, bool):
+        confidence = None
+    return value, confidence, reasoning if isinstance(reasoning, str) else None
+
+
+class ParquetSink:
+    """Buffers extraction results and writes them as a date-partitioned Parquet dataset.
+
+    Args:
+        root: Dataset directory (created if missing)
+        batch_rows: Rows buffered before they are written out as one row group
+        max_file_rows: Rows per file before a new file is started in the partition
+        max_open_files: Partitions with an open file at the same time
+        compression: Parquet compression codec
+    """
+
+    def __init__(self, root: str | Path, batch_rows: int = 10_000, max_file_rows: int = 1_000_000,
+                 max_open_files: int = 8, compression: str = "zstd"):
+        self.root = Path(root)
+        self.batch_rows = batch_rows
+        self.max_file_rows = max_file_rows
+        self.max_open_files = max_open_files
+        self.compression = compression
+        self.rows = 0
+        self.batches = 0
+        self.files: list[Path] = []
+        self._run = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._buffers: dict[str, dict[str, list]] = {}  # partition -> column name -> values
+        self._buffered = 0
+        self._writers = OrderedDict()  # partition -> [writer, temporary path, final path, rows]
+
+    def write(self, mid: str, gtin: str, result, model: str | None = None,
+              reason: str | None = None, extracted_at: datetime.datetime | None = None) -> None:
+        """Adds one result.
+
+        Args:
+            mid: Product MID
+            gtin: Product GTIN
+            result: MultipackResult, or the result dict when it did not pass validation
+            model: Model that produced the answer
+            reason: Why the answer still failed validation, if it did
+            extracted_at: Extraction time (default: now)
+        """
+        extracted_at = extracted_at or datetime.datetime.now(datetime.timezone.utc)
+        partition = f"date={extracted_at.astimezone(datetime.timezone.utc):%Y-%m-%d}"
+        columns = self._buffers.get(partition)
+        if columns is None:
+            columns = self._buffers[partition] = {name: [] for name in SCHEMA.names}
+
+        valid = result.get("valid") if isinstance(result, dict) else result.valid
+        columns["mid"].append(mid)
+        columns["gtin"].append(gtin)
+        columns["valid"].append(valid if isinstance(valid, bool) else None)
+        for name, column, prefix in _FIELDS:
+            value, confidence, reasoning = _field_columns(result, name)
+            columns[column].append(value)
+            columns[f"{prefix}_confidence"].append(confidence)
+            columns[f"{prefix}_reasoning"].append(reasoning)
+        columns["model"].append(model)
+        columns["failure_reason"].append(reason)
+        columns["extracted_at"].append(extracted_at)
+
+        self._buffered += 1
+        if self._buffered >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered rows (one record batch per partition)."""
+        for partition, columns in self._buffers.items():
+            batch = pa.RecordBatch.from_pydict(columns, schema=SCHEMA)
+            self._writer(partition).write_batch(batch)
+            self._writers[partition][3] += batch.num_rows
+            self.rows += batch.num_rows
+            self.batches += 1
+            if self._writers[partition][3] >= self.max_file_rows:
+                self._close_writer(partition)
+        self._buffers.clear()
+        self._buffered = 0
+
+    def _writer(self, partition: str) -> pq.ParquetWriter:
+        if partition in self._writers:
+            self._writers.move_to_end(partition)
+            return self._writers[partition][0]
+        if len(self._writers) >= self.max_open_files:
+            self._close_writer(next(iter(self._writers)))
+        directory = self.root / partition
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"part-{self._run}-{self._sequence:05d}.parquet"
+        self._sequence += 1
+        # Dot-prefixed while open: dataset readers skip hidden files
+        tmp = directory / f".{path.name}.tmp"
+        writer = pq.ParquetWriter(tmp, SCHEMA, compression=self.compression)
+        self._writers[partition] = [writer, tmp, path, 0]
+        return writer
+
+    def _close_writer(self, partition: str) -> None:
+        writer, tmp, path, _ = self._writers.pop(partition)
+        writer.close()
+        os.replace(tmp, path)
+        self.files.append(path)
+
+    def close(self) -> None:
+        """Flushes what is left and finalizes every open file."""
+        self.flush()
+        for partition in list(self._writers):
+            self._close_writer(partition)
+
+    def __enter__(self) -> "ParquetSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def stats(self) -> dict:
+        return {"rows": self.rows, "batches": self.batches, "files": len(self.files),
+                "buffered": self._buffered, "open_files": len(self._writers)}
+
+
+# --- Benchmark against JSONL ----------------------------------------------------
+
+def main() -> None:
+    import json
+    import random
+    import tempfile
+
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    from gemini_utils.structs import MultipackField, MultipackResult
+
+    parser = argparse.ArgumentParser(description="Writing and scanning multipack results: JSONL vs Parquet")
+    parser.add_argument("--rows", type=int, default=200_000, help="results to write")
+    parser.add_argument("--days", type=int, default=3, help="extraction dates the results are spread over")
+    parser.add_argument("--batch-rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    start_day = datetime.datetime(2026, 10, 1, tzinfo=datetime.timezone.utc)
+    reasons = ["Stated explicitly in all product names.", "Single item; no pack size given.",
+               "Derived from '6x1,5L' in two of the three names."]
+
+    def results():
+        for index in range(args.rows):
+            at = start_day + datetime.timedelta(days=index * args.days // args.rows, seconds=index % 86_400)
+            if rng.random() < 0.2:
+                yield f"{index:08d}", f"{4000000000000 + index:014d}", MultipackResult(valid=False), at
+                continue
+            pieces, packages = rng.choice((1, 4, 6, 12)), rng.choice((1, 1, 2, 4))
+            result = MultipackResult(
+                valid=True,
+                quantity=MultipackField(pieces * packages, round(rng.uniform(0.7, 1), 2), rng.choice(reasons)),
+                count_of_pieces_per_package=MultipackField(pieces, round(rng.uniform(0.7, 1), 2), rng.choice(reasons)),
+                count_of_packages=MultipackField(packages, round(rng.uniform(0.7, 1), 2), rng.choice(reasons)),
+            )
+            yield f"{index:08d}", f"{4000000000000 + index:014d}", result, at
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = Path(tmp) / "results.jsonl"
+        started = time.perf_counter()
+        with open(jsonl, "w", encoding="utf-8") as f:
+            for mid, gtin, result, at in results():
+                f.write(json.dumps({"MID": mid, "GTIN": gtin, "extracted_at": at.isoformat(), **result.to_dict()}) + "\n")
+        jsonl_write = time.perf_counter() - started
+
+        rng.seed(7)
+        sink = ParquetSink(Path(tmp) / "dataset", batch_rows=args.batch_rows)
+        peak = 0
+        started = time.perf_counter()
+        for mid, gtin, result, at in results():
+            sink.write(mid, gtin, result, model="gemini-2.5-flash-lite", extracted_at=at)
+            peak = max(peak, pa.total_allocated_bytes())
+        sink.close()
+        parquet_write = time.perf_counter() - started
+        parquet_size = sum(path.stat().st_size for path in sink.files)
+
+        # The same question both ways: valid share and mean quantity of confident answers
+        started = time.perf_counter()
+        valid = confident = total = 0
+        with open(jsonl, encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if row["valid"]:
+                    valid += 1
+                    if row["quantity"]["confidence_rate"] >= 0.9:
+                        confident += 1
+                        total += row["quantity"]["value"]
+        jsonl_scan = time.perf_counter() - started
+        jsonl_answer = (valid, round(total / confident, 3))
+
+        started = time.perf_counter()
+        table = ds.dataset(Path(tmp) / "dataset", partitioning="hive").to_table(
+            columns=["valid", "quantity", "quantity_confidence"])
+        confident_rows = table.filter(pc.greater_equal(table["quantity_confidence"], 0.9))
+        parquet_answer = (pc.sum(table["valid"].cast(pa.int64())).as_py(),
+                          round(pc.mean(confident_rows["quantity"]).as_py(), 3))
+        parquet_scan = time.perf_counter() - started
+
+        print(f"{args.rows:,} results over {args.days} day(s): {sink.stats()}")
+        print(f"  {'':<8} {'write':>10} {'size':>10} {'scan':>10}")
+        print(f"  {'JSONL':<8} {jsonl_write:>9.2f}s {jsonl.stat().st_size / 2**20:>8.1f}MB {jsonl_scan:>9.3f}s")
+        print(f"  {'Parquet':<8} {parquet_write:>9.2f}s {parquet_size / 2**20:>8.1f}MB {parquet_scan:>9.3f}s")
+        print(f"  Peak Arrow memory while writing: {peak / 2**20:.1f} MB (batch of {args.batch_rows:,} rows)")
+        print(f"  Same answer from both: {jsonl_answer == parquet_answer} {parquet_answer}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Client-side rate limiting shared by every agent, thread and process on the host.
+
+Each (project, model) pair gets a token bucket stored in a small SQLite file.
+Callers reserve a slot inside a `BEGIN IMMEDIATE` transaction, so threads and
+separate processes (several `adk web`/`adk run` instances, batch scripts) draw
+from the same budget and are paced *before* they hit the quota. Retries stay
+as a fallback for the occasional 429/5xx, with short jittered backoff instead
+of the old exp_base=7 schedule (1s, 7s, 49s, 343s).
+
+Limits come from GENAI_RATE_LIMITS, e.g. "gemini-2.5-flash=60,gemini-2.5-flash-lite=120"
+(requests per minute); the bucket file from GENAI_RATE_LIMIT_DB.
+
+ADK agents add `rate_limit.before_model_callback` as their first before-model
+callback; scripts can call `limiter.acquire(model)` before a request.
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from google.genai import types
+
+# Jittered exponential backoff for what still gets through: ~1s, 2s, 4s, 8s (+ up to 1s jitter)
+RETRY_OPTIONS = types.HttpRetryOptions(
+    attempts=5,
+    initial_delay=1,
+    exp_base=2,
+    max_delay=30,
+    jitter=1,
+    http_status_codes=[429, 500, 503, 504],
+)
+
+# Requests per minute per model when GENAI_RATE_LIMITS doesn't say otherwise
+DEFAULT_LIMITS = {
+    "gemini-2.5-flash": 60,
+    "gemini-2.5-flash-lite": 120,
+}
+DEFAULT_RPM = 60
+
+DEFAULT_DB = Path(os.getenv("GENAI_RATE_LIMIT_DB", Path(tempfile.gettempdir()) / "genai_rate_limit.db"))
+
+
+def _limits_from_env() -> dict:
+    limits = dict(DEFAULT_LIMITS)
+    for item in os.getenv("GENAI_RATE_LIMITS", "").split(","):
+        if "=" in item:
+            model, rpm = item.split("=", 1)
+            limits[model.strip()] = float(rpm)
+    return limits
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a caller would have to wait longer than its `max_wait`."""
+
+
+class TokenBucketLimiter:
+    """Token buckets per (project, model) in a SQLite file shared across processes.
+
+    A bucket refills at `rpm / 60` tokens per second up to `burst`. A request
+    reserves one token even if the bucket is empty (the balance goes negative),
+    and sleeps until its token would have been refilled - so concurrent callers
+    queue up in arrival order without retrying the transaction.
+
+    The SQLite file is opened (and created) on the first acquire, not by the
+    constructor, so importing this module has no file-system side effects.
+
+    Args:
+        path: SQLite file holding the buckets
+        limits: Requests per minute per model
+        burst_seconds: How many seconds of budget may be spent at once after idling
+        project: Quota project; buckets are separate per project
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_DB, limits: dict | None = None,
+                 burst_seconds: float = 5, project: str | None = None):
+        self.path = str(path)
+        self.limits = limits if limits is not None else _limits_from_env()
+        self.burst_seconds = burst_seconds
+        self.project = project or os.getenv("GOOGLE_CLOUD_PROJECT", "default")
+        self.waited_seconds = 0.0
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite's file lock coordinates threads and processes alike
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.execute("PRAGMA journal_mode = WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS buckets "
+                        "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+                    )
+                    self._schema_ready = True
+        return conn
+
+    def _reserve(self, model: str, tokens: float, max_wait: float | None) -> float:
+        """Takes `tokens` from the bucket and returns how long the caller must wait."""
+        rate = self.limits.get(model, DEFAULT_RPM) / 60
+        burst = max(1.0, rate * self.burst_seconds)
+        key = f"{self.project}:{model}"
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            available = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            wait = max(0.0, (tokens - available) / rate)
+            if max_wait is not None and wait > max_wait:
+                conn.execute("ROLLBACK")
+                raise RateLimitExceeded(f"{key}: would wait {wait:.1f}s (max {max_wait}s)")
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, available - tokens, now),
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        self.waited_seconds += wait
+        return wait
+
+    def acquire(self, model: str, tokens: float = 1, max_wait: float | None = None) -> float:
+        """Blocks until a request to `model` may be sent; returns the seconds waited."""
+        wait = self._reserve(model, tokens, max_wait)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, model: str, tokens: float = 1, max_wait: float | None = None) -> float:
+        """Async version of `acquire`; the SQLite transaction runs in a worker thread."""
+        wait = await asyncio.to_thread(self._reserve, model, tokens, max_wait)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+# Process-wide limiter (all instances on the host share the same SQLite file, opened on first use)
+limiter = TokenBucketLimiter()
+
+
+async def before_model_callback(callback_context, llm_request):
+    """ADK before_model_callback: paces the request against the shared bucket for its model."""
+    await limiter.acquire_async(llm_request.model or "default")
+    return None
@@ -0,0 +1,99 @@
+"""
+Model routing: flash-lite first, flash only when needed.
+
+Most requests in this repo are short and easy, and `gemini-2.5-flash-lite` answers
+them at a third of the input price of `gemini-2.5-flash`. The router sends a
+request to the small model unless its prompt is long, and escalates to the
+large model only when the small model's answer fails a check - invalid JSON,
+a schema violation or a low `confidence_rate`. The escalation rate is tracked,
+so the thresholds can be tuned from real traffic:
+
+    router = ModelRouter()
+    response, model = router.generate(
+        lambda model: client.models.generate_content(model=model, contents=prompt),
+        prompt_chars=len(prompt),
+        check=lambda response: None if response.text else "empty",
+    )
+    print(router.stats())
+"""
+
+import threading
+from collections import Counter
+
+SMALL_MODEL = "gemini-2.5-flash-lite"
+LARGE_MODEL = "gemini-2.5-flash"
+
+
+def low_confidence(result, threshold: float) -> bool:
+    """True if any `confidence_rate` in a (nested) structured result is below `threshold`."""
+    if isinstance(result, dict):
+        rate = result.get("confidence_rate")
+        if isinstance(rate, (int, float)) and rate < threshold:
+            return True
+        return any(low_confidence(value, threshold) for value in result.values())
+    if isinstance(result, list):
+        return any(low_confidence(item, threshold) for item in result)
+    return False
+
+
+class ModelRouter:
+    """Picks the small or large model per request and escalates failed small-model answers.
+
+    Args:
+        small_model: Model tried first for short prompts
+        large_model: Model for long prompts and escalations
+        max_small_prompt_chars: Prompts longer than this go straight to the large model
+    """
+
+    def __init__(self, small_model: str = SMALL_MODEL, large_model: str = LARGE_MODEL,
+                 max_small_prompt_chars: int = 6000):
+        self.small_model = small_model
+        self.large_model = large_model
+        self.max_small_prompt_chars = max_small_prompt_chars
+        self._counts = Counter()
+        self._reasons = Counter()
+        self._lock = threading.Lock()
+
+    def pick(self, prompt_chars: int) -> str:
+        """The model to try first for a prompt of `prompt_chars` characters."""
+        return self.small_model if prompt_chars <= self.max_small_prompt_chars else self.large_model
+
+    def record(self, first_model: str, escalation_reason: str | None = None) -> None:
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts["first_small" if first_model == self.small_model else "first_large"] += 1
+            if escalation_reason:
+                self._counts["escalations"] += 1
+                self._reasons[escalation_reason] += 1
+
+    def generate(self, call, *, prompt_chars: int, check=None):
+        """Runs `call(model)` on the picked model, escalating once if `check` rejects the answer.
+
+        Args:
+            call: Function sending the request to the given model and returning the response
+            prompt_chars: Size of the prompt, used to pick the first model
+            check: Function returning an escalation reason for an unacceptable response, or None
+
+        Returns:
+            (response, model that produced it)
+        """
+        model = self.pick(prompt_chars)
+        response = call(model)
+        reason = check(response) if check and model != self.large_model else None
+        self.record(model, reason)
+        if reason:
+            model = self.large_model
+            response = call(model)
+        return response, model
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self._counts["requests"]
+            return {
+                "requests": requests,
+                "first_small": self._counts["first_small"],
+                "first_large": self._counts["first_large"],
+                "escalations": self._counts["escalations"],
+                "escalation_rate": self._counts["escalations"] / requests if requests else 0.0,
+                "escalation_reasons": dict(self._reasons),
+            }
@@ -0,0 +1,166 @@
+"""
+Typed, slotted result records for the multipack extraction and the log tool.
+
+Parsed model answers and tool results used to live as nested dicts. The
+records here hold the same data in `__slots__` instances, with typed
+attribute access, and convert to and from the JSON shape:
+
+- `MultipackResult` / `MultipackField`: the multipack extraction answer
+  (structured-output.py); `from_dict` takes the validated answer and `to_dict`
+  gives back the schema shape, without absent fields
+- `LogSummary` / `LogEntry`: what fetch_cloud_logs (function-calling.py)
+  returns to the model, encoded by gemini_utils/fastjson.py
+
+    result = MultipackResult.from_dict(checked.result)
+    result.quantity.value, result.quantity.confidence_rate
+    fastjson.dumps(LogSummary(count=1, logs=[LogEntry(...)]))
+
+Decode time, memory per result and payload size, old path vs new:
+    python -m gemini_utils.structs
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+from gemini_utils import fastjson
+
+MULTIPACK_FIELDS = ("quantity", "count_of_pieces_per_package", "count_of_packages")
+
+
+@dataclass(slots=True)
+class MultipackField:
+    """One extracted value with the model's confidence and reasoning."""
+
+    value: int
+    confidence_rate: float | None = None
+    reasoning: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MultipackField":
+        return cls(data["value"], data.get("confidence_rate"), data.get("reasoning"))
+
+    def to_dict(self) -> dict:
+        data = {"value": self.value}
+        if self.confidence_rate is not None:
+            data["confidence_rate"] = self.confidence_rate
+        if self.reasoning is not None:
+            data["reasoning"] = self.reasoning
+        return data
+
+
+@dataclass(slots=True)
+class MultipackResult:
+    """A multipack extraction answer; the three fields are set only when `valid`."""
+
+    valid: bool
+    quantity: MultipackField | None = None
+    count_of_pieces_per_package: MultipackField | None = None
+    count_of_packages: MultipackField | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MultipackResult":
+        get = data.get
+        quantity, pieces, packages = get("quantity"), get("count_of_pieces_per_package"), get("count_of_packages")
+        return cls(
+            bool(get("valid")),
+            MultipackField.from_dict(quantity) if quantity else None,
+            MultipackField.from_dict(pieces) if pieces else None,
+            MultipackField.from_dict(packages) if packages else None,
+        )
+
+    @classmethod
+    def from_json(cls, text: str | bytes) -> "MultipackResult":
+        return cls.from_dict(fastjson.loads(text))
+
+    def to_dict(self) -> dict:
+        data = {"valid": self.valid}
+        for name in MULTIPACK_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value.to_dict()
+        return data
+
+
+@dataclass(slots=True)
+class LogEntry:
+    timestamp: str
+    severity: str | None
+    payload_summary: str
+
+
+@dataclass(slots=True)
+class LogSummary:
+    """Recent log entries matching a fetch_cloud_logs query."""
+
+    count: int
+    logs: list[LogEntry] = field(default_factory=list)
+
+
+# --- Benchmark ----------------------------------------------------------------
+
+def _timed(func, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+def _bytes_per_item(build, count: int) -> float:
+    tracemalloc.start()
+    items = [build() for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return size / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON decoding and encoding: dicts + json vs structs + fastjson")
+    parser.add_argument("--repeats", type=int, default=50_000, help="calls per timing")
+    parser.add_argument("--results", type=int, default=20_000, help="parsed results kept for the memory figure")
+    args = parser.parse_args()
+
+    def answer_field(value, confidence):
+        return {"value": value, "confidence_rate": confidence,
+                "reasoning": "Stated explicitly in all product names (e.g. '6x1,5L', '6 x 1.5 L')."}
+
+    answer = json.dumps({
+        "valid": True,
+        "quantity": answer_field(6, 0.98),
+        "count_of_pieces_per_package": answer_field(6, 0.95),
+        "count_of_packages": answer_field(1, 0.9),
+    })
+    entry = {"timestamp": "2026-10-19T08:15:02.123456+00:00", "severity": "INFO",
+             "payload_summary": ("{'context': {'message': {'country': 'DE', 'identifiers': "
+                                 "[{'value': '8004360075199'}], 'is_sellable': True}}, ...")[:200]}
+    logs = {"count": 5, "logs": [dict(entry) for _ in range(5)]}
+    summary = LogSummary(count=5, logs=[LogEntry(**entry) for _ in range(5)])
+
+    print(f"JSON backend: {fastjson.BACKEND}\n")
+    print("Multipack answer decode:")
+    rows = [
+        ("json.loads -> dict", lambda: json.loads(answer)),
+        ("fastjson.loads -> dict", lambda: fastjson.loads(answer)),
+        ("fastjson.loads -> MultipackResult", lambda: MultipackResult.from_json(answer)),
+    ]
+    for label, func in rows:
+        per_item = _bytes_per_item(func, args.results)
+        print(f"  {label:<36} {_timed(func, args.repeats) * 1e6:6.2f} µs, {per_item:7.0f} bytes per kept result")
+
+    print("\nfetch_cloud_logs payload encode:")
+    rows = [
+        ("json.dumps(indent=2)", lambda: json.dumps(logs, indent=2)),
+        ("fastjson.dumps(dict)", lambda: fastjson.dumps(logs)),
+        ("fastjson.dumps(LogSummary)", lambda: fastjson.dumps(summary)),
+    ]
+    for label, func in rows:
+        text = func()
+        print(f"  {label:<36} {_timed(func, args.repeats) * 1e6:6.2f} µs, {len(text):5d} chars "
+              f"(~{len(text) // 4} tokens)")
+
+
+if __name__ == "__main__":
+    main()
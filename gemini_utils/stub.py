@@ -0,0 +1,117 @@
+"""
+Local stub for the google-genai client, for benchmarks and offline runs.
+
+`StubClient` answers `client.models.generate_content` and
+`client.aio.models.generate_content` without any network calls, after a
+simulated latency: usually `latency` seconds, but with probability
+`tail_probability` a slow response of `tail_latency` seconds - the long tail
+that hedging and timeouts are meant to handle.
+
+    client = StubClient(responder=lambda contents: '{"valid": false}')
+    client.models.generate_content(model="gemini-2.5-flash", contents="...").text
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+from google.genai import types
+
+
+def _default_responder(contents) -> str:
+    return f"Stub answer to: {str(contents)[:80]}"
+
+
+def _prompt_chars(contents) -> int:
+    # Text length only; str() of a long Content history would dominate the stub's own cost
+    if isinstance(contents, str):
+        return len(contents)
+    if isinstance(contents, types.Content):
+        return sum(len(part.text or "") for part in contents.parts or [])
+    if isinstance(contents, list):
+        return sum(_prompt_chars(item) for item in contents)
+    return len(str(contents))
+
+
+class _StubModels:
+    def __init__(self, client: "StubClient"):
+        self._client = client
+
+    def generate_content(self, *, model: str, contents, config=None) -> types.GenerateContentResponse:
+        time.sleep(self._client.sample_latency())
+        return self._client.respond(model, contents)
+
+
+class _StubAsyncModels:
+    def __init__(self, client: "StubClient"):
+        self._client = client
+
+    async def generate_content(self, *, model: str, contents, config=None) -> types.GenerateContentResponse:
+        try:
+            await asyncio.sleep(self._client.sample_latency())
+        except asyncio.CancelledError:
+            self._client.count("cancelled")
+            raise
+        return self._client.respond(model, contents)
+
+
+class _StubAio:
+    def __init__(self, client: "StubClient"):
+        self.models = _StubAsyncModels(client)
+
+
+class StubClient:
+    """Drop-in stand-in for `genai.Client` covering generate_content.
+
+    Args:
+        latency: Typical response time in seconds (jittered by ±20%)
+        tail_latency: Response time of a slow request in seconds
+        tail_probability: Share of requests that are slow
+        responder: Function from the request contents to the response text
+        seed: Random seed, for repeatable latency sequences
+    """
+
+    def __init__(self, latency: float = 0.2, tail_latency: float = 3.0, tail_probability: float = 0.03,
+                 responder=_default_responder, seed: int | None = 42):
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_probability = tail_probability
+        self.responder = responder
+        self.models = _StubModels(self)
+        self.aio = _StubAio(self)
+        self._random = random.Random(seed)
+        self._counts = {"calls": 0, "completed": 0, "cancelled": 0}
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        self.count("calls")
+        with self._lock:
+            if self._random.random() < self.tail_probability:
+                return self.tail_latency
+            return self.latency * self._random.uniform(0.8, 1.2)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def respond(self, model: str, contents) -> types.GenerateContentResponse:
+        self.count("completed")
+        text = self.responder(contents)
+        prompt_chars = _prompt_chars(contents)
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text=text)]),
+                finish_reason=types.FinishReason.STOP,
+            )],
+            model_version=model,
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4,
+                candidates_token_count=len(text) // 4,
+                total_token_count=(prompt_chars + len(text)) // 4,
+            ),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,227 @@
+"""
+Precompiled instruction templates for agents that read session state.
+
+A string instruction such as "Edit this draft: {blog_draft}" is scanned with a
+regex and re-substituted against session state on every model call, and it
+injects state values whole: in a pipeline the prompt grows with every output
+passed along. `InstructionTemplate` is an ADK instruction provider that:
+
+- parses the template once into literal segments and placeholder slots, so
+  the state keys it depends on are known up front (`template.keys`)
+- renders with one list copy and one join per call
+- bounds the injected values by a token budget, per key (`budgets`) and/or
+  for all values together (`max_tokens`, shared fairly between them); a value
+  over its share keeps its beginning and end around an
+  "[... N characters omitted ...]" marker
+
+Budget only values the agent condenses (an aggregator, a summarizer). An agent
+that rewrites a value, such as an editor or a refiner writing back to the same
+state key, has to see it whole: the omitted part would be lost from its output.
+
+    Agent(
+        ...,
+        instruction=InstructionTemplate(
+            "Read the provided research findings: {research_findings}",
+            max_tokens=2000,
+        ),
+    )
+
+Placeholders follow ADK's syntax: {key}, {key?} (optional), {app:key},
+{user:key}, {temp:key}; anything else between braces is left as written.
+A callable instruction makes ADK skip its own state injection, so the template
+is the only substitution pass. Artifact placeholders ({artifact.name}) need
+ADK's async loader and are rejected; keep those instructions as strings.
+
+Render time and prompt size against ADK's substitution (no API calls):
+    python -m gemini_utils.templates
+"""
+
+import argparse
+import re
+import time
+
+# Same placeholder syntax as ADK's instruction state injection
+_PLACEHOLDER = re.compile(r"(?<![\$\{\\]){+[^{}]*}+")
+_STATE_PREFIXES = ("app", "user", "temp")
+
+# Rough size of a token in English text (same estimate as gemini_utils/stub.py)
+CHARS_PER_TOKEN = 4
+
+
+def _is_state_key(name: str) -> bool:
+    prefix, _, key = name.rpartition(":")
+    if not prefix:
+        return key.isidentifier()
+    return prefix in _STATE_PREFIXES and key.isidentifier()
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """`text` cut to about `max_chars`, keeping its beginning and end (at word boundaries)."""
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 3 // 4
+    tail = max_chars - head
+    # Prefer cutting between words when there is one near the limit
+    cut = text.rfind(" ", head * 4 // 5, head)
+    if cut > 0:
+        head = cut
+    start = text.find(" ", len(text) - tail, len(text) - tail + tail // 5)
+    start = start + 1 if start >= 0 else len(text) - tail
+    return f"{text[:head]}\n[... {start - head} characters omitted ...]\n{text[start:]}"
+
+
+def _fair_shares(sizes: list[int], budget: int) -> list[int]:
+    """Splits `budget` between values: small values stay whole, the rest share what is left."""
+    shares = [0] * len(sizes)
+    remaining = budget
+    order = sorted(range(len(sizes)), key=sizes.__getitem__)
+    for position, index in enumerate(order):
+        shares[index] = min(sizes[index], remaining // (len(order) - position))
+        remaining -= shares[index]
+    return shares
+
+
+class InstructionTemplate:
+    """Instruction provider that renders a precompiled template from session state.
+
+    Args:
+        template: Instruction text with {state_key} placeholders
+        budgets: Most tokens injected for a given key, e.g. {"research_findings": 2000}
+        max_tokens: Most tokens injected for all placeholders together
+        chars_per_token: Characters counted as one token for the budgets
+    """
+
+    def __init__(self, template: str, budgets: dict[str, int] | None = None,
+                 max_tokens: int | None = None, chars_per_token: int = CHARS_PER_TOKEN):
+        self.template = template
+        self.max_chars = max_tokens * chars_per_token if max_tokens else None
+        self.key_max_chars = {key: tokens * chars_per_token for key, tokens in (budgets or {}).items()}
+        self.renders = 0
+        self.truncated = 0
+
+        # Literal text between placeholders is joined up front; placeholders get their own slot
+        self._segments = []
+        self._slots = []  # (segment index, state key, optional)
+        literal = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(template):
+            literal.append(template[position:match.start()])
+            position = match.end()
+            name = match.group().lstrip("{").rstrip("}").strip()
+            optional = name.endswith("?")
+            name = name.removesuffix("?")
+            if name.startswith("artifact."):
+                raise ValueError(f"Artifact placeholder {match.group()} is not supported by InstructionTemplate")
+            if not _is_state_key(name):
+                literal.append(match.group())
+                continue
+            self._segments.append("".join(literal))
+            literal = []
+            self._slots.append((len(self._segments), name, optional))
+            self._segments.append("")
+        literal.append(template[position:])
+        self._segments.append("".join(literal))
+        self.keys = frozenset(name for _, name, _ in self._slots)
+
+        unknown = set(self.key_max_chars) - self.keys
+        if unknown:
+            raise ValueError(f"Budgets for keys not in the template: {', '.join(sorted(unknown))}")
+
+    def __call__(self, ctx) -> str:
+        """Renders the template for ADK (`ctx` is the agent's ReadonlyContext)."""
+        return self.render(ctx.state, getattr(ctx, "agent_name", ""))
+
+    def render(self, state, agent_name: str = "") -> str:
+        """The instruction for `state` (any mapping of state keys to values)."""
+        parts = self._segments.copy()
+        values = []
+        for index, name, optional in self._slots:
+            value = state.get(name)
+            if value is None:
+                if name not in state and not optional:
+                    raise KeyError(f"Context variable not found: `{name}` in agent '{agent_name}'.")
+                value = ""
+            elif not isinstance(value, str):
+                value = str(value)
+            limit = self.key_max_chars.get(name)
+            if limit is not None and len(value) > limit:
+                value = truncate(value, limit)
+                self.truncated += 1
+            values.append(value)
+
+        if self.max_chars is not None:
+            sizes = [len(value) for value in values]
+            if sum(sizes) > self.max_chars:
+                for position, share in enumerate(_fair_shares(sizes, self.max_chars)):
+                    if share < sizes[position]:
+                        values[position] = truncate(values[position], share)
+                        self.truncated += 1
+
+        for (index, _, _), value in zip(self._slots, values):
+            parts[index] = value
+        self.renders += 1
+        return "".join(parts)
+
+    def __repr__(self) -> str:
+        return f"InstructionTemplate(keys={sorted(self.keys)}, max_chars={self.max_chars})"
+
+
+# --- Benchmark against ADK's state injection --------------------------------
+
+def main() -> None:
+    import asyncio
+    from types import SimpleNamespace
+
+    from google.adk.utils.instructions_utils import inject_session_state
+
+    parser = argparse.ArgumentParser(description="Instruction rendering: ADK regex injection vs InstructionTemplate")
+    parser.add_argument("--renders", type=int, default=20_000, help="renders per measurement")
+    parser.add_argument("--value-chars", type=int, default=40_000, help="size of each injected research report")
+    parser.add_argument("--max-tokens", type=int, default=1500, help="budget for all injected values")
+    args = parser.parse_args()
+
+    template = """Combine these three research findings into a single executive summary:
+
+        **Technology Trends:**
+        {tech_research}
+
+        **Health Breakthroughs:**
+        {health_research}
+
+        **Finance Innovations:**
+        {finance_research}
+
+        Your summary should highlight common themes and the most important key takeaways."""
+    report = ("Finding with a citation [1]. " * (args.value_chars // 29 + 1))[:args.value_chars]
+    state = {"tech_research": report, "health_research": report[:2000], "finance_research": report}
+    ctx = SimpleNamespace(
+        state=state, agent_name="AggregatorAgent",
+        _invocation_context=SimpleNamespace(session=SimpleNamespace(state=state), artifact_service=None),
+    )
+    compiled = InstructionTemplate(template, max_tokens=args.max_tokens)
+    unbounded = InstructionTemplate(template)
+
+    async def adk_render():
+        start = time.perf_counter()
+        for _ in range(args.renders):
+            text = await inject_session_state(template, ctx)
+        return time.perf_counter() - start, text
+
+    def timed(provider):
+        start = time.perf_counter()
+        for _ in range(args.renders):
+            text = provider(ctx)
+        return time.perf_counter() - start, text
+
+    results = [
+        ("ADK state injection", *asyncio.run(adk_render())),
+        ("InstructionTemplate", *timed(unbounded)),
+        (f"  with max_tokens={args.max_tokens}", *timed(compiled)),
+    ]
+    for label, elapsed, text in results:
+        print(f"{label:<28} {elapsed / args.renders * 1e6:7.2f} µs/render, "
+              f"prompt {len(text):>7,} chars (~{len(text) // CHARS_PER_TOKEN:,} tokens)")
+
+
+if __name__ == "__main__":
+    main()
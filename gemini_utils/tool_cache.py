@@ -0,0 +1,249 @@
+"""
+Memoization for tool functions.
+
+Models often call the same tool with the same arguments several times, within
+one turn (parallel calls) or across the turns of a session. For tools that are
+pure or change slowly, `cached_tool` keeps the results for a while:
+
+    @cached_tool(ttl=300, normalize={"method": normalize_text})
+    def get_fee_for_payment_method(method: str) -> dict:
+        ...
+
+    FunctionTool(get_fee_for_payment_method)   # or tools=[get_fee_for_payment_method]
+
+- arguments are bound to the signature (defaults applied) and normalized per
+  parameter to form the key, so "Platinum Credit Card " and "platinum credit
+  card" share an entry; the tool itself is always called with the arguments
+  as given (normalization only decides which calls are the same, so it must
+  not merge arguments the tool would answer differently)
+- each tool has its own TTL and LRU size bound
+- results that look like errors ({"status": "error"}, {"error": ...},
+  "Error ...") are not cached, so transient failures are retried
+- concurrent calls with the same key wait for the first one instead of
+  repeating it
+- no refetch: a hit returns a copy of the cached result (dicts, lists and
+  sets are deep-copied), so a caller changing it can't change the entry
+
+The wrapper keeps the function's name, docstring and signature, which is all
+ADK reads to build the tool declaration. Hit/miss counters per tool come from
+`stats()` (and the agent host's /metrics).
+"""
+
+import asyncio
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+# Every cache created by cached_tool, by tool name
+_caches = {}
+
+
+def normalize_text(value):
+    """Case-folded, trimmed, single-spaced text; other values are returned unchanged."""
+    return " ".join(value.split()).casefold() if isinstance(value, str) else value
+
+
+def normalize_case(value):
+    """Lower-cased text, for tools that ignore case but not spacing; other values are returned unchanged."""
+    return value.lower() if isinstance(value, str) else value
+
+
+def normalize_code(value):
+    """Upper-cased, trimmed code (currency, country); other values are returned unchanged."""
+    return value.strip().upper() if isinstance(value, str) else value
+
+
+def looks_like_error(result) -> bool:
+    if isinstance(result, dict):
+        return result.get("status") == "error" or "error" in result
+    if isinstance(result, str):
+        return result.startswith(("Error", "error"))
+    return False
+
+
+def _copy(result):
+    """What a caller gets for a shared result: containers deep-copied, anything else as is."""
+    return copy.deepcopy(result) if isinstance(result, (dict, list, set)) else result
+
+
+def _freeze(value):
+    """Hashable version of an argument value (lists and dicts from JSON function calls)."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class ToolCache:
+    """TTL + LRU result cache for one tool, with hit statistics.
+
+    Args:
+        name: Tool name (for stats)
+        ttl: Seconds a result stays valid
+        maxsize: Most entries kept; the least recently used are dropped beyond this
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> threading.Lock or asyncio.Future
+        self.hits = self.misses = self.expired = self.evictions = 0
+
+    def get(self, key):
+        """(True, result) for a fresh entry, (False, None) otherwise; expired entries are dropped."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return True, entry[1]
+                del self._entries[key]
+                self.expired += 1
+            return False, None
+
+    def count(self, hit: bool) -> None:
+        """Records one call as a hit (answered without running the tool) or a miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, result) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def cached_tool(ttl: float = 300, maxsize: int = 1024, normalize: dict | None = None,
+                is_error=looks_like_error):
+    """Decorator memoizing a (sync or async) tool function.
+
+    Args:
+        ttl: Seconds a result stays valid
+        maxsize: Most results kept for this tool
+        normalize: Parameter name -> function applied to that argument for the key only
+        is_error: Results for which this returns True are not cached
+    """
+    normalize = normalize or {}
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        # ADK passes tool_context itself; it is not part of the call's identity
+        keyed = [name for name in signature.parameters if name != "tool_context"]
+        cache = _caches[func.__name__] = ToolCache(func.__name__, ttl, maxsize)
+
+        def prepare(args, kwargs):
+            """The arguments as given (what the tool is called with) and the cache key of their normalized values."""
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            key = tuple(
+                _freeze(normalize[name](arguments[name]) if name in normalize else arguments[name])
+                for name in keyed
+            )
+            return arguments, key
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                arguments, key = prepare(args, kwargs)
+                found, result = cache.get(key)
+                pending = cache._inflight.get(key)
+                cache.count(found or pending is not None)
+                if found:
+                    return _copy(result)
+                if pending is not None:
+                    # Same call already running in this loop; share its result
+                    return _copy(await asyncio.shield(pending))
+                pending = cache._inflight[key] = asyncio.get_running_loop().create_future()
+                try:
+                    result = await func(**arguments)
+                except BaseException as e:
+                    pending.set_exception(e)
+                    pending.exception()  # Marked as retrieved when nobody else waits
+                    raise
+                else:
+                    # Waiters and later hits copy from this one, never from what the caller got
+                    shared = _copy(result)
+                    if not is_error(result):
+                        cache.put(key, shared)
+                    pending.set_result(shared)
+                    return result
+                finally:
+                    del cache._inflight[key]
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                arguments, key = prepare(args, kwargs)
+                found, result = cache.get(key)
+                if found:
+                    cache.count(hit=True)
+                    return _copy(result)
+                with cache._lock:
+                    key_lock = cache._inflight.setdefault(key, threading.Lock())
+                with key_lock:
+                    # Another thread may have filled it while we waited
+                    found, result = cache.get(key)
+                    cache.count(found)
+                    if found:
+                        return _copy(result)
+                    try:
+                        result = func(**arguments)
+                        if not is_error(result):
+                            cache.put(key, _copy(result))
+                        return result
+                    finally:
+                        with cache._lock:
+                            cache._inflight.pop(key, None)
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def stats() -> dict:
+    """Hit/miss statistics of every cached tool, by tool name."""
+    return {name: cache.stats() for name, cache in sorted(_caches.items())}
+
+
+def to_prometheus() -> str:
+    lines = []
+    for metric, kind, help_text in (
+        ("hits", "counter", "Tool calls answered from the cache"),
+        ("misses", "counter", "Tool calls that ran the tool"),
+        ("entries", "gauge", "Cached tool results"),
+    ):
+        name = f"genai_tool_cache_{metric}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for tool, values in stats().items():
+            lines.append(f'{name}{{tool="{tool}"}} {values[metric]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,273 @@
+"""
+Token and cost accounting for every Gemini call site.
+
+Usage is aggregated per (script, agent, model) from the `usage_metadata` of
+each response: requests, prompt/cached/output/thinking tokens, latency and an
+estimated cost. Two ways in:
+
+- scripts wrap their client:      client = track_client(client, script="structured-output")
+- ADK agents add the callbacks:   Agent(..., **model_callbacks())  (gemini_utils.callbacks)
+
+Counters can be rendered as Prometheus text (`tracker.to_prometheus()`) or JSON
+(`tracker.to_json()`). Set GENAI_USAGE_EXPORT=usage.json (or usage.prom) to
+write them automatically when the process exits.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+# List prices in USD per 1M tokens (text, <=200k context). Update from the Vertex AI
+# pricing page when they change; unknown models are counted but not priced.
+PRICES_PER_MILLION = {
+    "gemini-2.5-flash": {"input": 0.30, "cached": 0.03, "output": 2.50},
+    "gemini-2.5-flash-lite": {"input": 0.10, "cached": 0.01, "output": 0.40},
+    "gemini-2.5-pro": {"input": 1.25, "cached": 0.125, "output": 10.00},
+}
+
+
+@dataclass
+class UsageTotals:
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    thoughts_tokens: int = 0
+    latency_seconds: float = 0.0
+    max_latency_seconds: float = 0.0
+    cost_usd: float = 0.0
+
+
+def price_for(model: str) -> dict | None:
+    """List prices of `model` (input, cached, output per 1M tokens), or None if unknown."""
+    # "projects/.../models/gemini-2.5-flash" and versioned names map to the base model
+    name = model.rsplit("/", 1)[-1]
+    for known in sorted(PRICES_PER_MILLION, key=len, reverse=True):
+        if name.startswith(known):
+            return PRICES_PER_MILLION[known]
+    return None
+
+
+class UsageTracker:
+    """Thread-safe usage aggregation keyed by (script, agent, model)."""
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, *, script: str, model: str, usage, latency_seconds: float, agent: str = "") -> None:
+        """Adds one response's `usage_metadata` (may be None) to the totals."""
+        prompt = getattr(usage, "prompt_token_count", None) or 0
+        cached = getattr(usage, "cached_content_token_count", None) or 0
+        output = getattr(usage, "candidates_token_count", None) or 0
+        thoughts = getattr(usage, "thoughts_token_count", None) or 0
+
+        cost = 0.0
+        price = price_for(model)
+        if price:
+            # Cached tokens are part of the prompt count but billed at the cached rate
+            cost = (
+                (prompt - cached) * price["input"]
+                + cached * price["cached"]
+                + (output + thoughts) * price["output"]
+            ) / 1_000_000
+
+        with self._lock:
+            totals = self._totals.setdefault((script, agent, model), UsageTotals())
+            totals.requests += 1
+            totals.prompt_tokens += prompt
+            totals.cached_tokens += cached
+            totals.output_tokens += output
+            totals.thoughts_tokens += thoughts
+            totals.latency_seconds += latency_seconds
+            totals.max_latency_seconds = max(totals.max_latency_seconds, latency_seconds)
+            totals.cost_usd += cost
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: UsageTotals(**asdict(totals)) for key, totals in self._totals.items()}
+
+    def to_json(self) -> str:
+        rows = [
+            {"script": script, "agent": agent, "model": model, **asdict(totals)}
+            for (script, agent, model), totals in sorted(self.snapshot().items())
+        ]
+        return json.dumps(rows, indent=2)
+
+    def to_prometheus(self) -> str:
+        metrics = [
+            ("genai_requests_total", "counter", "Model requests", "requests"),
+            ("genai_prompt_tokens_total", "counter", "Prompt tokens, including cached tokens", "prompt_tokens"),
+            ("genai_cached_tokens_total", "counter", "Prompt tokens served from context cache", "cached_tokens"),
+            ("genai_output_tokens_total", "counter", "Candidate (output) tokens", "output_tokens"),
+            ("genai_thoughts_tokens_total", "counter", "Thinking tokens", "thoughts_tokens"),
+            ("genai_latency_seconds_total", "counter", "Sum of request latencies", "latency_seconds"),
+            ("genai_latency_seconds_max", "gauge", "Slowest request", "max_latency_seconds"),
+            ("genai_cost_usd_total", "counter", "Estimated cost at list prices", "cost_usd"),
+        ]
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+        for name, kind, help_text, attr in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (script, agent, model), totals in snapshot:
+                labels = f'script="{_escape(script)}",agent="{_escape(agent)}",model="{_escape(model)}"'
+                lines.append(f"{name}{{{labels}}} {getattr(totals, attr):g}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> None:
+        """Writes Prometheus text for *.prom files, JSON otherwise."""
+        content = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide tracker used by the helpers below
+tracker = UsageTracker()
+
+if os.getenv("GENAI_USAGE_EXPORT"):
+    atexit.register(tracker.export, os.environ["GENAI_USAGE_EXPORT"])
+
+
+def track_client(client, script: str, tracker: UsageTracker = tracker):
+    """Records usage for every generate_content call made through `client`.
+
+    Covers generate_content and generate_content_stream on client.models and
+    client.aio.models, and chats created from the client (chats call the same
+    methods under the hood). A stream is recorded once, when it is exhausted or
+    closed, with the usage of the last chunk that carried any. Returns the client.
+    """
+    sync_generate = client.models.generate_content
+    async_generate = client.aio.models.generate_content
+    sync_stream = client.models.generate_content_stream
+    async_stream = client.aio.models.generate_content_stream
+
+    @functools.wraps(sync_generate)
+    def generate_content(*, model, **kwargs):
+        start = time.perf_counter()
+        response = sync_generate(model=model, **kwargs)
+        tracker.record(script=script, model=model, usage=response.usage_metadata,
+                       latency_seconds=time.perf_counter() - start)
+        return response
+
+    @functools.wraps(async_generate)
+    async def generate_content_async(*, model, **kwargs):
+        start = time.perf_counter()
+        response = await async_generate(model=model, **kwargs)
+        tracker.record(script=script, model=model, usage=response.usage_metadata,
+                       latency_seconds=time.perf_counter() - start)
+        return response
+
+    @functools.wraps(sync_stream)
+    def generate_content_stream(*, model, **kwargs):
+        start = time.perf_counter()
+        usage = None
+        try:
+            for chunk in sync_stream(model=model, **kwargs):
+                usage = chunk.usage_metadata or usage
+                yield chunk
+        finally:
+            tracker.record(script=script, model=model, usage=usage, latency_seconds=time.perf_counter() - start)
+
+    @functools.wraps(async_stream)
+    async def generate_content_stream_async(*, model, **kwargs):
+        start = time.perf_counter()
+        stream = await async_stream(model=model, **kwargs)
+
+        async def chunks():
+            usage = None
+            try:
+                async for chunk in stream:
+                    usage = chunk.usage_metadata or usage
+                    yield chunk
+            finally:
+                tracker.record(script=script, model=model, usage=usage, latency_seconds=time.perf_counter() - start)
+
+        return chunks()
+
+    client.models.generate_content = generate_content
+    client.aio.models.generate_content = generate_content_async
+    client.models.generate_content_stream = generate_content_stream
+    client.aio.models.generate_content_stream = generate_content_stream_async
+    return client
+
+
+# --- ADK model callbacks ---------------------------------------------------
+
+# Requests whose after-callback never came (e.g. the invocation was cancelled) are
+# forgotten after this long, so a long-running process does not accumulate them
+STALE_AFTER_SECONDS = 900
+
+_started = OrderedDict()  # call key -> (start, model), oldest first
+
+# Call key of the model request in progress, for models that make more than one attempt
+_current_call = contextvars.ContextVar("genai_usage_call", default=None)
+
+
+def _call_key(callback_context):
+    return (callback_context.invocation_id, callback_context.agent_name)
+
+
+def before_model_callback(callback_context, llm_request):
+    """ADK before_model_callback: remembers when the request started and for which model."""
+    now = time.perf_counter()
+    while _started:
+        key, (start, _) = next(iter(_started.items()))
+        if now - start < STALE_AFTER_SECONDS:
+            break
+        del _started[key]
+    key = _call_key(callback_context)
+    _started.pop(key, None)  # re-inserted at the end, keeping the oldest-first order
+    _started[key] = (now, llm_request.model or "")
+    _current_call.set(key)
+    return None
+
+
+def record_attempt(model: str, usage, latency_seconds: float) -> None:
+    """Records an attempt a model class discarded within the current ADK request.
+
+    For models that may call a second model in the same turn (RoutedGemini):
+    the discarded attempt is counted against the model it went to, and the
+    after-callback then times only the attempt that produced the response.
+    """
+    key = _current_call.get()
+    tracker.record(script="adk", agent=key[1] if key else "", model=model, usage=usage,
+                   latency_seconds=latency_seconds)
+    if key in _started:
+        _started[key] = (time.perf_counter(), _started[key][1])
+
+
+def on_model_error_callback(callback_context, llm_request, error):
+    """ADK on_model_error_callback: drops the failed request; the error is raised as usual."""
+    _started.pop(_call_key(callback_context), None)
+    return None
+
+
+def after_model_callback(callback_context, llm_response):
+    """ADK after_model_callback: records the response usage under the agent's name.
+
+    The model is the one the response reports, falling back to the requested one
+    (a routing model may have answered with another model than was requested).
+    """
+    if llm_response.partial:
+        # Streaming chunks; usage arrives with the final response
+        return None
+    start, model = _started.pop(_call_key(callback_context), (time.perf_counter(), ""))
+    tracker.record(
+        script="adk",
+        agent=callback_context.agent_name,
+        model=llm_response.model_version or model or "",
+        usage=llm_response.usage_metadata,
+        latency_seconds=time.perf_counter() - start,
+    )
+    return None
@@ -3,8 +3,14 @@ Simple Text Generation with Gemini
 The most basic example - just prompt and response
 """
 
+import os
+
 from google import genai
 
+from gemini_utils.hedging import HedgePolicy, hedge_client
+from gemini_utils.routing import ModelRouter
+from gemini_utils.usage import track_client
+
 # Initialize Genai client with Vertex AI authentication (recommended for GCP)
 # Make sure you've run: gcloud auth application-default login
 client = genai.Client(
@@ -16,15 +22,30 @@ client = genai.Client(
 # Alternative: Use Gemini API with API key 
 # client = genai.Client(api_key="YOUR_API_KEY_HERE")
 
+# Record token usage and latency for every call (export with GENAI_USAGE_EXPORT=usage.json)
+client = track_client(client, script="simple-text-generation")
+
+# Opt-in: the request is read-only, so a response slower than the recent p95 can be
+# raced against a duplicate (at most 5% of requests). Enable with GENAI_HEDGE=1.
+if os.getenv("GENAI_HEDGE"):
+    client = hedge_client(client, HedgePolicy(percentile=95, budget=0.05))
+
 # Create a simple prompt
 prompt = "What is the capital of Germany?"
 
-# Generate response
-response = client.models.generate_content(
-    model="gemini-2.5-flash",
-    contents=prompt
+# Generate response - a short question like this one is answered by flash-lite,
+# an empty answer is retried on gemini-2.5-flash
+router = ModelRouter()
+response, model = router.generate(
+    lambda model: client.models.generate_content(
+        model=model,
+        contents=prompt
+    ),
+    prompt_chars=len(prompt),
+    check=lambda response: None if response.text else "empty",
 )
 
 # Print the result
 print(f"Prompt: {prompt}")
+print(f"Model: {model}")
 print(f"Response: {response.text}")
@@ -4,10 +4,19 @@ Extracting multipack product information from product names in multiple language
 """
 
 import json
+import os
+import time
 import yaml
 from google import genai
 from google.genai import types
 
+from gemini_utils import fastjson
+from gemini_utils.hedging import HedgePolicy, hedge_client
+from gemini_utils.multipack import FIELD_SCHEMA, MultipackValidator
+from gemini_utils.routing import ModelRouter
+from gemini_utils.structs import MultipackResult
+from gemini_utils.usage import price_for, track_client, tracker
+
 # Initialize Genai client with Vertex AI authentication
 # Make sure you've run: gcloud auth application-default login
 client = genai.Client(
@@ -19,6 +28,14 @@ client = genai.Client(
 # Alternative: Use Gemini API with API key 
 # client = genai.Client(api_key="YOUR_API_KEY_HERE")
 
+# Record token usage and latency for every call (export with GENAI_USAGE_EXPORT=usage.json)
+client = track_client(client, script="structured-output")
+
+# Extraction is idempotent: with GENAI_HEDGE=1, a product that takes longer than the
+# recent p95 is sent again and the first answer wins (hedges capped at 5% of requests)
+if os.getenv("GENAI_HEDGE"):
+    client = hedge_client(client, HedgePolicy(percentile=95, budget=0.05))
+
 # Define the response schema for multipack extraction
 RESPONSE_SCHEMA = {
     "type": "object",
@@ -104,58 +121,293 @@ Critical rules:
 5) Ensure Quantity = count_of_packages × count_of_pieces_per_package when valid=true.
 """
 
+MODEL = "gemini-2.5-flash"
+
+# Products are tried on flash-lite first. Answers breaking the rules of SYSTEM_ROLE are
+# repaired locally or by re-asking for the one failing field (gemini_utils.multipack);
+# only what is still not valid JSON, off-schema, inconsistent or below MIN_CONFIDENCE
+# after that is redone on MODEL
+MIN_CONFIDENCE = 0.8
+router = ModelRouter(small_model="gemini-2.5-flash-lite", large_model=MODEL)
+validator = MultipackValidator(min_confidence=MIN_CONFIDENCE)
+
 # Sample product data (hardcoded with multiple language variants)
-sample_product = {
-    'MID': '123456',
-    'GTIN': '03011248060326',
-    'Product Name DE': "Arcoroc Versatile Dessertschalen aus Glas 4cl",
-    'Product Name ES': "Arcoroc Versatile - Set 12 Copas Helado Vidrio 4Cl",
-    'Product Name NL': "Coppa Dessert Versatile Cl 4 H 6 √ò Cm 6,7 Arcoroc Set Da 48",
-    'Brand': 'Arcoroc',
-}
+SAMPLE_PRODUCTS = [
+    {
+        'MID': '123456',
+        'GTIN': '03011248060326',
+        'Product Name DE': "Arcoroc Versatile Dessertschalen aus Glas 4cl",
+        'Product Name ES': "Arcoroc Versatile - Set 12 Copas Helado Vidrio 4Cl",
+        'Product Name NL': "Coppa Dessert Versatile Cl 4 H 6 √ò Cm 6,7 Arcoroc Set Da 48",
+        'Brand': 'Arcoroc',
+    },
+    {
+        'MID': '234567',
+        'GTIN': '05449000214911',
+        'Product Name DE': "Coca-Cola 6 x 1,5 l PET Flasche",
+        'Product Name ES': "Coca-Cola Pack 6 Botellas 1,5L",
+        'Product Name NL': "Coca-Cola 6-pack 1,5 liter fles",
+        'Brand': 'Coca-Cola',
+    },
+    {
+        'MID': '345678',
+        'GTIN': '05000394203921',
+        'Product Name DE': "Duracell Plus AA Batterien 3 x 4er Pack",
+        'Product Name ES': "Duracell Plus AA Pilas, 12 unidades (3 paquetes de 4)",
+        'Product Name NL': "Duracell Plus AA batterijen 12 stuks",
+        'Brand': 'Duracell',
+    },
+]
 
-# Convert product data to YAML format for better readability
-product_yaml = yaml.dump(sample_product, allow_unicode=True, default_flow_style=False)
 
-# Create the prompt
-prompt = f"""Generate a JSON response for the following product data:
-{product_yaml}
+def build_prompt(product):
+    """The per-product part of the prompt. The schema is NOT repeated here:
+    it is already enforced through response_schema in the request config."""
+    # Convert product data to YAML format for better readability
+    product_yaml = yaml.dump(product, allow_unicode=True, default_flow_style=False)
+    return f"""Generate a JSON response for the following product data:
+{product_yaml}"""
 
+
+def build_legacy_prompt(product):
+    """The old prompt (schema pretty-printed into every request), kept only to measure the saving."""
+    return f"""{build_prompt(product)}
 The response should be in JSON which fits to this schema:
 {json.dumps(RESPONSE_SCHEMA, indent=2)}"""
 
-# Generate response with structured output
-response = client.models.generate_content(
-    model="gemini-2.5-flash",
-    contents=prompt,
-    config=types.GenerateContentConfig(
-        response_mime_type="application/json",
-        response_schema=RESPONSE_SCHEMA,
-        system_instruction=SYSTEM_ROLE
+
+# Context cache storage in USD per 1M tokens per hour (2.5 Flash and Flash-Lite)
+CACHE_STORAGE_PER_MILLION_HOURLY = 1.00
+
+
+def create_prefix_cache(model=MODEL):
+    """Registers the static prefix (SYSTEM_ROLE) once as cached content for the whole batch.
+
+    Caches belong to one model, so the router needs one per model it may call.
+    Returns the CachedContent, or None if the prefix can't be cached - then
+    SYSTEM_ROLE is sent inline. The 2.5 Flash models only cache prefixes of at
+    least 1024 tokens; SYSTEM_ROLE alone is shorter, so until it grows the
+    request falls back to inline, where implicit caching applies on its own
+    once a request reaches the minimum.
+    """
+    try:
+        return client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name="multipack-extraction-prefix",
+                system_instruction=SYSTEM_ROLE,
+                ttl="3600s",
+            ),
+        )
+    except Exception as e:
+        print(f"⚠️  Context cache not created for {model}, sending the prefix inline: {e}\n")
+        return None
+
+
+def multipack_config(cache_name=None, schema=RESPONSE_SCHEMA):
+    """Request config for one model, using its prefix cache when there is one."""
+    if cache_name:
+        # The system instruction lives in the cache; it must not be sent again
+        config = types.GenerateContentConfig(
+            cached_content=cache_name,
+            response_mime_type="application/json",
+            response_schema=schema,
+        )
+    else:
+        config = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=schema,
+            system_instruction=SYSTEM_ROLE
+        )
+    return config
+
+
+def extract_multipack(product, cache_names=None):
+    """Runs the multipack extraction for one product, routed through `router`.
+
+    Args:
+        product: Product data with the names in several languages
+        cache_names: Prefix cache name per model (models without one get SYSTEM_ROLE inline)
+
+    Returns:
+        (CheckedResult with the validated/repaired result, model that produced it)
+    """
+    prompt = build_prompt(product)
+    cache_names = cache_names or {}
+
+    def generate(model):
+        # Generate response with structured output
+        response = client.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=multipack_config(cache_names.get(model)),
+        )
+
+        def reask(field, question):
+            # Same product and cached prefix, but only one field to answer
+            answer = client.models.generate_content(
+                model=model,
+                contents=f"{prompt}\n{question}",
+                config=multipack_config(cache_names.get(model), schema=FIELD_SCHEMA),
+            )
+            try:
+                return fastjson.loads(answer.text)
+            except (TypeError, ValueError):
+                return None
+
+        return validator.check(response.text, reask=reask, response=response)
+
+    checked, model = router.generate(
+        generate,
+        prompt_chars=len(SYSTEM_ROLE) + len(prompt),
+        check=lambda checked: checked.reason,
     )
-)
+    return checked, model
+
+
+def print_result(result: MultipackResult):
+    """Displays one extraction result in a readable format."""
+    print(json.dumps(result.to_dict(), indent=2, ensure_ascii=False))
+    print("-" * 60)
+
+    if result.valid:
+        print("✅ Valid multipack product (all names consistent)")
+        for field, label in [
+            (result.quantity, "Total Quantity"),
+            (result.count_of_pieces_per_package, "Pieces per Package"),
+            (result.count_of_packages, "Number of Packages"),
+        ]:
+            print(f"\n{label}: {field.value}")
+            print(f"  Confidence: {field.confidence_rate if field.confidence_rate is not None else 'N/A'}")
+            print(f"  Reasoning: {field.reasoning or 'N/A'}")
+    else:
+        print("❌ Invalid: Product names describe different pack configurations")
+
+
+def legacy_prompt_tokens(product):
+    """Prompt tokens the old request (inline SYSTEM_ROLE + schema echo) would have used."""
+    return client.models.count_tokens(
+        model=MODEL,
+        contents=build_legacy_prompt(product),
+        config=types.CountTokensConfig(system_instruction=SYSTEM_ROLE),
+    ).total_tokens or 0
+
+
+def usage_since(before: dict) -> list[tuple[str, int, int, int]]:
+    """(model, requests, prompt tokens, cached tokens) of this script's calls since the `before` snapshot."""
+    calls = []
+    for (script, _, model), totals in tracker.snapshot().items():
+        if script != "structured-output":
+            continue
+        earlier = before.get((script, "", model))
+        requests = totals.requests - (earlier.requests if earlier else 0)
+        if requests:
+            calls.append((
+                model,
+                requests,
+                totals.prompt_tokens - (earlier.prompt_tokens if earlier else 0),
+                totals.cached_tokens - (earlier.cached_tokens if earlier else 0),
+            ))
+    return calls
+
+
+def prompt_cost(model: str, prompt_tokens: int, cached_tokens: int) -> float:
+    """USD for the prompt side of requests, cached tokens at the cached rate (0 for unpriced models)."""
+    price = price_for(model)
+    if not price:
+        return 0.0
+    return ((prompt_tokens - cached_tokens) * price["input"] + cached_tokens * price["cached"]) / 1_000_000
+
+
+def print_token_report(measurements: list, caches: dict, cache_hours: float) -> None:
+    """Prompt tokens and prompt cost per product: the old single request vs. every call made now.
+
+    "now" covers all calls for the product (escalations and single-field
+    re-asks included); the total adds what storing the prefix caches cost.
+    """
+    legacy_price = price_for(MODEL)["input"]
+    print("=" * 60)
+    print("Prompt tokens and cost per product")
+    print("=" * 60)
+    print(f"{'MID':<10} {'model':<22} {'calls':>5} {'before':>8} {'now':>8} {'cached':>8} {'$ before':>10} {'$ now':>10}")
+    total_before = total_now = 0.0
+    for mid, model, before, calls in measurements:
+        cost_before = before * legacy_price / 1_000_000
+        cost_now = sum(prompt_cost(name, prompt, cached) for name, _, prompt, cached in calls)
+        total_before += cost_before
+        total_now += cost_now
+        print(f"{mid:<10} {model:<22} {sum(c[1] for c in calls):>5} {before:>8} {sum(c[2] for c in calls):>8} "
+              f"{sum(c[3] for c in calls):>8} {cost_before:>10.6f} {cost_now:>10.6f}")
+
+    cached_prefix = sum(getattr(cache.usage_metadata, "total_token_count", None) or 0 for cache in caches.values())
+    storage = cached_prefix * CACHE_STORAGE_PER_MILLION_HOURLY / 1_000_000 * cache_hours
+    total_now += storage
+    print(f"\nCache storage: {cached_prefix} tokens for {cache_hours * 60:.1f} min = ${storage:.6f}")
+    saved = 1 - total_now / total_before if total_before else 0.0
+    print(f"Prompt cost: ${total_before:.6f} before, ${total_now:.6f} now ({saved:.0%} saved)")
+
+
+if __name__ == "__main__":
+    caches = {}
+    for model in (router.small_model, router.large_model):
+        cache = create_prefix_cache(model)
+        if cache:
+            caches[model] = cache
+    cache_names = {model: cache.name for model, cache in caches.items()}
+    cache_created = time.monotonic()
+
+    # With MULTIPACK_TOKEN_REPORT=1, each product is compared with the old prompt, which costs
+    # one extra count_tokens call per product
+    token_report = bool(os.getenv("MULTIPACK_TOKEN_REPORT"))
+    measurements = []
+
+    # With MULTIPACK_PARQUET=<dir>, results are also exported as a date-partitioned
+    # Parquet dataset for analytics (gemini_utils.parquet_sink)
+    sink = None
+    if os.getenv("MULTIPACK_PARQUET"):
+        from gemini_utils.parquet_sink import ParquetSink
+        sink = ParquetSink(os.environ["MULTIPACK_PARQUET"])
+
+    try:
+        for product in SAMPLE_PRODUCTS:
+            print("=" * 60)
+            print(f"Multipack Product Analysis: MID {product['MID']}")
+            print("=" * 60)
+
+            usage_before = tracker.snapshot()
+            checked, model = extract_multipack(product, cache_names)
+            print(f"Model: {model}")
+            if checked.repairs or checked.reasked:
+                print(f"Repaired: {', '.join(checked.repairs) or '-'}; re-asked: {', '.join(checked.reasked) or '-'}")
+            if checked.reason:
+                # Not known to match the schema, so shown as returned
+                print(f"⚠️  Still failing on {model}: {checked.reason}")
+                print(json.dumps(checked.result, indent=2, ensure_ascii=False))
+                result = checked.result or {}
+            else:
+                result = MultipackResult.from_dict(checked.result)
+                print_result(result)
+            if sink:
+                sink.write(product["MID"], product["GTIN"], result, model=model, reason=checked.reason)
+            print()
+
+            if token_report:
+                measurements.append((product["MID"], model, legacy_prompt_tokens(product), usage_since(usage_before)))
+    finally:
+        cache_hours = (time.monotonic() - cache_created) / 3600
+        for cache_name in cache_names.values():
+            client.caches.delete(name=cache_name)
+        if sink:
+            sink.close()
+            print(f"📋 Exported {sink.rows} results to {sink.root} ({len(sink.files)} Parquet file(s))")
+
+    if token_report:
+        print_token_report(measurements, caches, cache_hours)
 
-# Parse and display the JSON response
-result = json.loads(response.text)
-
-print("Multipack Product Analysis:")
-print("=" * 60)
-print(json.dumps(result, indent=2, ensure_ascii=False))
-print("=" * 60)
-
-# Display results in a readable format
-if result.get("valid"):
-    print("\n✅ Valid multipack product (all names consistent)")
-    print(f"\nTotal Quantity: {result['quantity']['value']}")
-    print(f"  Confidence: {result['quantity'].get('confidence_rate', 'N/A')}")
-    print(f"  Reasoning: {result['quantity'].get('reasoning', 'N/A')}")
-    
-    print(f"\nPieces per Package: {result['count_of_pieces_per_package']['value']}")
-    print(f"  Confidence: {result['count_of_pieces_per_package'].get('confidence_rate', 'N/A')}")
-    print(f"  Reasoning: {result['count_of_pieces_per_package'].get('reasoning', 'N/A')}")
-    
-    print(f"\nNumber of Packages: {result['count_of_packages']['value']}")
-    print(f"  Confidence: {result['count_of_packages'].get('confidence_rate', 'N/A')}")
-    print(f"  Reasoning: {result['count_of_packages'].get('reasoning', 'N/A')}")
-else:
-    print("\n❌ Invalid: Product names describe different pack configurations")
+    stats = router.stats()
+    print(f"\nRouting: {stats['first_small']} of {stats['requests']} products tried on {router.small_model}, "
+          f"escalation rate {stats['escalation_rate']:.0%} {stats['escalation_reasons']}")
+    checks = validator.stats()
+    print(f"Validation: {checks['checked']} answers, repaired {checks['repair_rate']:.0%}, "
+          f"single-field re-asks {checks['rerequest_rate']:.0%}, full retries {checks['full_retry_rate']:.0%} "
+          f"{checks['failure_reasons']}")
@@ -3,9 +3,18 @@ URL Grounding with Gemini
 Let the AI fetch and analyze content from websites automatically
 """
 
+import argparse
+import asyncio
+import csv
+import json
+import time
+
 from google import genai
 from google.genai.types import Tool, GenerateContentConfig
 
+from gemini_utils.page_cache import PageFetcher
+from gemini_utils.usage import track_client
+
 # Initialize Genai client with Vertex AI authentication
 # Make sure you've run: gcloud auth application-default login
 client = genai.Client(
@@ -17,111 +26,357 @@ client = genai.Client(
 # Alternative: Use Gemini API with API key 
 # client = genai.Client(api_key="YOUR_API_KEY_HERE")
 
-print("=" * 70)
-print("URL Grounding Demo - AI Fetches Web Content Automatically")
-print("=" * 70)
-print()
+# Record token usage and latency for every call (export with GENAI_USAGE_EXPORT=usage.json)
+client = track_client(client, script="url-grounding")
 
 # Define the URL context tool (allows AI to fetch web content)
 tools = [
     {"url_context": {}},
 ]
 
-# Example 1: Compare recipes from two websites
-print("Example 1: Comparing Two Recipe Websites")
-print("-" * 70)
 
-url1 = "https://www.foodnetwork.com/recipes/ina-garten/perfect-roast-chicken-recipe-1940592"
-url2 = "https://www.allrecipes.com/recipe/21151/simple-whole-roast-chicken/"
+def run_examples():
+    """Runs the four single-URL examples one after another."""
+    print("=" * 70)
+    print("URL Grounding Demo - AI Fetches Web Content Automatically")
+    print("=" * 70)
+    print()
+
+    # Example 1: Compare recipes from two websites
+    print("Example 1: Comparing Two Recipe Websites")
+    print("-" * 70)
 
-response = client.models.generate_content(
-    model="gemini-2.5-flash",
-    contents=f"Compare the ingredients and cooking times from the recipes at {url1} and {url2}",
-    config=GenerateContentConfig(
-        tools=tools,
+    url1 = "https://www.foodnetwork.com/recipes/ina-garten/perfect-roast-chicken-recipe-1940592"
+    url2 = "https://www.allrecipes.com/recipe/21151/simple-whole-roast-chicken/"
+
+    response = client.models.generate_content(
+        model="gemini-2.5-flash",
+        contents=f"Compare the ingredients and cooking times from the recipes at {url1} and {url2}",
+        config=GenerateContentConfig(
+            tools=tools,
+        )
     )
-)
 
-print("Question: Compare ingredients and cooking times from two recipe sites\n")
-for each in response.candidates[0].content.parts:
-    print(each.text)
+    print("Question: Compare ingredients and cooking times from two recipe sites\n")
+    for each in response.candidates[0].content.parts:
+        print(each.text)
 
-# Show which URLs were actually fetched
-print("\n📊 URLs Retrieved by AI:")
-print(response.candidates[0].url_context_metadata)
-print()
+    # Show which URLs were actually fetched
+    print("\n📊 URLs Retrieved by AI:")
+    print(response.candidates[0].url_context_metadata)
+    print()
 
-# Example 2: Analyze product documentation
-print("\nExample 2: Analyzing Technical Documentation")
-print("-" * 70)
+    # Example 2: Analyze product documentation
+    print("\nExample 2: Analyzing Technical Documentation")
+    print("-" * 70)
 
-doc_url = "https://cloud.google.com/vertex-ai/docs/generative-ai/model-reference/gemini"
+    doc_url = "https://cloud.google.com/vertex-ai/docs/generative-ai/model-reference/gemini"
 
-response2 = client.models.generate_content(
-    model="gemini-2.5-flash",
-    contents=f"What are the key features of Gemini models mentioned at {doc_url}? List 5 main points.",
-    config=GenerateContentConfig(
-        tools=tools,
+    response2 = client.models.generate_content(
+        model="gemini-2.5-flash",
+        contents=f"What are the key features of Gemini models mentioned at {doc_url}? List 5 main points.",
+        config=GenerateContentConfig(
+            tools=tools,
+        )
     )
-)
 
-print(f"Question: What are key features from Vertex AI documentation?\n")
-for each in response2.candidates[0].content.parts:
-    print(each.text)
+    print(f"Question: What are key features from Vertex AI documentation?\n")
+    for each in response2.candidates[0].content.parts:
+        print(each.text)
 
-print("\n📊 URLs Retrieved by AI:")
-print(response2.candidates[0].url_context_metadata)
-print()
+    print("\n📊 URLs Retrieved by AI:")
+    print(response2.candidates[0].url_context_metadata)
+    print()
 
-# Example 3: Get current information
-print("\nExample 3: Fetching Current Information")
-print("-" * 70)
+    # Example 3: Get current information
+    print("\nExample 3: Fetching Current Information")
+    print("-" * 70)
 
-news_url = "https://cloud.google.com/blog/products/ai-machine-learning"
+    news_url = "https://cloud.google.com/blog/products/ai-machine-learning"
 
-response3 = client.models.generate_content(
-    model="gemini-2.5-flash",
-    contents=f"Summarize the latest AI/ML updates from {news_url}. What are the 3 most recent announcements?",
-    config=GenerateContentConfig(
-        tools=tools,
+    response3 = client.models.generate_content(
+        model="gemini-2.5-flash",
+        contents=f"Summarize the latest AI/ML updates from {news_url}. What are the 3 most recent announcements?",
+        config=GenerateContentConfig(
+            tools=tools,
+        )
     )
-)
 
-print(f"Question: What are the latest AI/ML announcements?\n")
-for each in response3.candidates[0].content.parts:
-    print(each.text)
+    print(f"Question: What are the latest AI/ML announcements?\n")
+    for each in response3.candidates[0].content.parts:
+        print(each.text)
 
-print("\n📊 URLs Retrieved by AI:")
-print(response3.candidates[0].url_context_metadata)
-print()
+    print("\n📊 URLs Retrieved by AI:")
+    print(response3.candidates[0].url_context_metadata)
+    print()
 
-# Example 4: Extract product price from e-commerce site
-print("\nExample 4: Extracting Product Price from E-commerce")
-print("-" * 70)
+    # Example 4: Extract product price from e-commerce site
+    # (For machine-readable price records at scale, use: --batch JOBS --extract-prices)
+    print("\nExample 4: Extracting Product Price from E-commerce")
+    print("-" * 70)
 
-product_url = "https://www.baur.de/p/AKLBB346296310?sku=3710210237&ref=reco&lmPromo=la,1,hk,detailview,fl,prudsysProducts_16_1_6150__37102102_product_OutputElement0"
+    product_url = "https://www.baur.de/p/AKLBB346296310?sku=3710210237&ref=reco&lmPromo=la,1,hk,detailview,fl,prudsysProducts_16_1_6150__37102102_product_OutputElement0"
 
-response4 = client.models.generate_content(
-    model="gemini-2.5-flash",
-    contents=f"What is the price of the product at {product_url}? Also tell me the product name.",
-    config=GenerateContentConfig(
-        tools=tools,
+    response4 = client.models.generate_content(
+        model="gemini-2.5-flash",
+        contents=f"What is the price of the product at {product_url}? Also tell me the product name.",
+        config=GenerateContentConfig(
+            tools=tools,
+        )
     )
-)
 
-print(f"Question: What is the product price?\n")
-for each in response4.candidates[0].content.parts:
-    print(each.text)
-
-print("\n📊 URLs Retrieved by AI:")
-print(response4.candidates[0].url_context_metadata)
-
-print("\n" + "=" * 70)
-print("Tutorial complete! ✨")
-print("\nKey Takeaway: With URL grounding, the AI can:")
-print("  - Fetch content from any public URL")
-print("  - Compare information across multiple sites")
-print("  - Get real-time/current information")
-print("  - Analyze documentation, articles, recipes, etc.")
-print("  - Extract product prices and details from e-commerce sites")
-print("=" * 70)
+    print(f"Question: What is the product price?\n")
+    for each in response4.candidates[0].content.parts:
+        print(each.text)
+
+    print("\n📊 URLs Retrieved by AI:")
+    print(response4.candidates[0].url_context_metadata)
+
+    print("\n" + "=" * 70)
+    print("Tutorial complete! ✨")
+    print("\nKey Takeaway: With URL grounding, the AI can:")
+    print("  - Fetch content from any public URL")
+    print("  - Compare information across multiple sites")
+    print("  - Get real-time/current information")
+    print("  - Analyze documentation, articles, recipes, etc.")
+    print("  - Extract product prices and details from e-commerce sites")
+    print("=" * 70)
+
+
+# ============================================================================
+# Batch mode: many (url, question) jobs, run concurrently
+# ============================================================================
+
+def load_jobs(path):
+    """Reads jobs from a .jsonl file ({"url": ..., "question": ...} per line) or a CSV with url,question columns.
+
+    The question is optional for --extract-prices jobs.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            jobs = list(csv.DictReader(f))
+        else:
+            jobs = [json.loads(line) for line in f if line.strip()]
+    return [{"url": job["url"], "question": job.get("question") or ""} for job in jobs]
+
+
+class JsonlSink:
+    """Appends records to a JSONL file, writing them in batches of `batch_size`."""
+
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self._buffer = []
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record):
+        self._buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._file.flush()
+            self.written += len(self._buffer)
+            self._buffer.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+async def ground_job(job, semaphore, fetcher=None, model="gemini-2.5-flash"):
+    """Answers one job; errors are returned in the record, not raised.
+
+    Without a fetcher the model reads the page itself through the url_context tool.
+    With a fetcher the page is fetched locally (cached) and only its compact
+    extract - main text, JSON-LD and price microdata - is sent as context.
+    """
+    record = {"url": job["url"], "question": job["question"]}
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            if fetcher:
+                extract = await asyncio.to_thread(fetcher.fetch, job["url"])
+                contents = f"{job['question']}\n\nAnswer using only this page content:\n{extract.to_prompt()}"
+                config = GenerateContentConfig()
+            else:
+                contents = f"{job['question']}\n\nURL: {job['url']}"
+                config = GenerateContentConfig(
+                    tools=tools,
+                )
+
+            response = await client.aio.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config,
+            )
+            candidate = response.candidates[0]
+            record["status"] = "success"
+            record["answer"] = "".join(part.text for part in candidate.content.parts if part.text)
+            record["url_context_metadata"] = (
+                candidate.url_context_metadata.model_dump(mode="json", exclude_none=True)
+                if candidate.url_context_metadata else None
+            )
+            if response.usage_metadata:
+                record["prompt_tokens"] = response.usage_metadata.prompt_token_count
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+        record["latency_seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+# ============================================================================
+# Price extraction mode: structured output straight into a JSONL sink
+# ============================================================================
+
+# Define the response schema for price extraction (same pattern as structured-output.py)
+PRICE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "product_name": {
+            "type": "string",
+            "description": "Name of the product offered on the page."
+        },
+        "price": {
+            "type": "number",
+            "nullable": True,
+            "description": "Current selling price as a plain number (e.g. 499.99), null if the page shows no price."
+        },
+        "currency": {
+            "type": "string",
+            "nullable": True,
+            "description": "ISO 4217 currency code of the price (e.g. EUR), null if there is no price."
+        },
+        "availability": {
+            "type": "string",
+            "enum": ["in_stock", "out_of_stock", "preorder", "unknown"],
+            "description": "Stock status shown on the page."
+        },
+        "gtin": {
+            "type": "string",
+            "nullable": True,
+            "description": "GTIN/EAN of the product (8, 12, 13 or 14 digits) if shown, else null."
+        }
+    },
+    "required": ["product_name", "price", "currency", "availability"]
+}
+
+PRICE_SYSTEM_ROLE = """
+You extract product offers from e-commerce page extracts.
+Use only the provided page content. Prefer JSON-LD and price microdata over free text.
+Never guess: use null when the price, currency or GTIN is not on the page, and "unknown" for unclear availability.
+"""
+
+
+def _valid_gtin(gtin):
+    """GTIN-8/12/13/14 length and check digit."""
+    if not gtin.isdigit() or len(gtin) not in (8, 12, 13, 14):
+        return False
+    digits = [int(d) for d in gtin]
+    total = sum(d * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(digits[:-1])))
+    return (10 - total % 10) % 10 == digits[-1]
+
+
+def validate_price(data):
+    """Returns a list of problems with an extracted price record (empty if it is valid)."""
+    errors = []
+    if not isinstance(data.get("product_name"), str) or not data["product_name"].strip():
+        errors.append("product_name is missing")
+    price = data.get("price")
+    if price is not None and (not isinstance(price, (int, float)) or price < 0):
+        errors.append(f"price is not a non-negative number: {price!r}")
+    currency = data.get("currency")
+    if price is not None and not (isinstance(currency, str) and len(currency) == 3 and currency.isalpha() and currency.isupper()):
+        errors.append(f"currency is not an ISO 4217 code: {currency!r}")
+    if data.get("availability") not in PRICE_SCHEMA["properties"]["availability"]["enum"]:
+        errors.append(f"unknown availability: {data.get('availability')!r}")
+    if data.get("gtin") is not None and not _valid_gtin(str(data["gtin"])):
+        errors.append(f"invalid GTIN: {data['gtin']!r}")
+    return errors
+
+
+async def extract_price_job(job, semaphore, fetcher, model="gemini-2.5-flash"):
+    """Extracts one structured price record from a page.
+
+    The API does not accept a response_schema together with the url_context tool,
+    so the page context comes from the local extract (see --prefetch) instead.
+    """
+    record = {"url": job["url"]}
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            extract = await asyncio.to_thread(fetcher.fetch, job["url"])
+            response = await client.aio.models.generate_content(
+                model=model,
+                contents=f"Extract the product offer from this page:\n{extract.to_prompt()}",
+                config=GenerateContentConfig(
+                    response_mime_type="application/json",
+                    response_schema=PRICE_SCHEMA,
+                    system_instruction=PRICE_SYSTEM_ROLE,
+                )
+            )
+            data = json.loads(response.text)
+            errors = validate_price(data)
+            record["status"] = "invalid" if errors else "success"
+            record.update({key: data.get(key) for key in PRICE_SCHEMA["properties"]})
+            if errors:
+                record["errors"] = errors
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+        record["latency_seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+async def run_batch(jobs, output_path, concurrency=16, fetcher=None, extract_prices=False):
+    """Runs all jobs through the async client, at most `concurrency` at a time.
+
+    Results go to `output_path` (JSONL) through a batching sink as jobs finish,
+    so a long batch can be inspected while it runs.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    if extract_prices:
+        tasks = [asyncio.create_task(extract_price_job(job, semaphore, fetcher)) for job in jobs]
+    else:
+        tasks = [asyncio.create_task(ground_job(job, semaphore, fetcher)) for job in jobs]
+
+    start = time.perf_counter()
+    counts = {}
+    sink = JsonlSink(output_path, batch_size=min(100, concurrency))
+    try:
+        for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+            record = await task
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+            sink.write(record)
+            print(f"[{done}/{len(jobs)}] {record['status']:<7} {record['latency_seconds']:>6.2f}s  {record['url'][:70]}")
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"\n✅ {summary} in {elapsed:.1f}s ({len(jobs) / elapsed:.2f} jobs/s, concurrency={concurrency})")
+    if fetcher:
+        print(f"🗂️  Page cache: {fetcher.stats}")
+    print(f"📄 Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="URL grounding examples, or a concurrent batch of (url, question) jobs")
+    parser.add_argument("--batch", metavar="JOBS", help="jobs file (.jsonl or .csv with url,question columns)")
+    parser.add_argument("--output", default="url_grounding_results.jsonl", help="where to write batch results (JSONL)")
+    parser.add_argument("--concurrency", type=int, default=16, help="maximum number of requests in flight")
+    parser.add_argument("--prefetch", action="store_true", help="fetch pages locally and send a compact extract instead of using url_context")
+    parser.add_argument("--cache-dir", default=".page_cache", help="disk cache for page extracts (with --prefetch)")
+    parser.add_argument("--extract-prices", action="store_true", help="extract structured price records (implies --prefetch)")
+    args = parser.parse_args()
+
+    if args.batch:
+        prefetch = args.prefetch or args.extract_prices
+        fetcher = PageFetcher(args.cache_dir, pool_size=args.concurrency) if prefetch else None
+        asyncio.run(run_batch(load_jobs(args.batch), args.output, args.concurrency, fetcher, args.extract_prices))
+    else:
+        run_examples()